@@ -1,5 +1,6 @@
 import os
 import environ
+from celery.schedules import crontab
 from pathlib import Path
 from django.utils.translation import gettext_lazy as _
 
@@ -117,9 +118,58 @@ SHORT_DATETIME_FORMAT = 'Y-m-d H:i'
 TIME_ZONE = 'UTC'
 USE_TZ = True
 
+# إعدادات الكاش: Redis عند توفر CACHE_REDIS_URL وإلا ذاكرة محلية (للتطوير فقط، راجع academic.checks)
+CACHE_REDIS_URL = env("CACHE_REDIS_URL", default=None)
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # إعدادات Celery
 CELERY_BROKER_URL = env("CELERY_BROKER", default="redis://redis:6379/0")
 
+# المهام الدورية (celery beat)
+CELERY_BEAT_SCHEDULE = {
+    # تصحيح مجموع الساعات المسجلة في كل تسجيل فصلي
+    'sync-semester-credits': {
+        'task': 'universityApps.academic.tasks.sync_semester_credits',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    # انتهاء صلاحية حجوزات المقاعد وتوزيع المقاعد المحررة على قائمة الانتظار
+    'process-seat-queues': {
+        'task': 'universityApps.academic.tasks.process_seat_queues_task',
+        'schedule': 30.0,
+    },
+    # إعادة بناء ترتيب الطلاب احتياطيًا (قبل انتهاء صلاحية اللقطة في الكاش)
+    'refresh-class-ranks': {
+        'task': 'universityApps.users.tasks.refresh_class_ranks',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    # كتابة الإجابات المحفوظة تلقائيًا للامتحانات الجارية والمنتهية حديثًا
+    'flush-exam-autosaves': {
+        'task': 'universityApps.academic.tasks.flush_open_exam_autosaves_task',
+        'schedule': 60.0,
+    },
+}
+
+# إعادة حساب المعدل التراكمي والساعات المكتسبة عبر Celery بعد نجاح المعاملة
+STUDENT_RECOMPUTE_ASYNC = env.bool("STUDENT_RECOMPUTE_ASYNC", default=True)
+STUDENT_RECOMPUTE_BATCH_SIZE = env.int("STUDENT_RECOMPUTE_BATCH_SIZE", default=500)
+# تجميع طلبات تحديث ترتيب الطلاب خلال هذه المدة (بالثواني) في إعادة بناء واحدة
+CLASS_RANK_REFRESH_DELAY = env.int("CLASS_RANK_REFRESH_DELAY", default=60)
+
+# تحديث جداول توزيع الدرجات عبر Celery بعد رصد الدرجات
+GRADE_DISTRIBUTION_ASYNC = env.bool("GRADE_DISTRIBUTION_ASYNC", default=True)
+
 # إعدادات الملفات الثابتة
 STATIC_URL = 'static/'
 MEDIA_URL = 'media/'
@@ -127,9 +177,24 @@ MEDIA_URL = 'media/'
 STATICFILES_DIRS = [BASE_DIR.parent / 'static']
 MEDIA_ROOT = BASE_DIR.parent / 'media'
 
+# إعدادات نظام الدرجات
+# ===================================
+
+# مزامنة فهرس فئات الدرجات بين العمليات عبر الكاش
+GRADE_BANDS_CACHE_SYNC = env.bool("GRADE_BANDS_CACHE_SYNC", default=False)
+
+# الحفظ التلقائي لإجابات الامتحانات: أقصى مدة (بالثواني) تبقى فيها الإجابات في الكاش قبل كتابتها
+EXAM_AUTOSAVE_FLUSH_INTERVAL = env.int("EXAM_AUTOSAVE_FLUSH_INTERVAL", default=15)
+
+# مدة حجز المقعد في المجموعة (بالدقائق) قبل تأكيده
+SEAT_HOLD_MINUTES = env.int("SEAT_HOLD_MINUTES", default=10)
+
 # إعدادات نظام الترقيم
 # ===================================
 
+# مزامنة لقطة إعدادات الترقيم بين العمليات عبر الكاش
+NUMBERING_CONFIG_CACHE_SYNC = env.bool("NUMBERING_CONFIG_CACHE_SYNC", default=False)
+
 # إعدادات ترقيم الكليات
 COLLEGE_NUMBERING_SETTINGS = {
     'min_number': 1,
@@ -12,6 +12,14 @@ DATABASES = {
     }
 }
 
+# كاش مشترك بين جميع العمليات (مطلوب للحفظ التلقائي لإجابات الامتحانات)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': env('CACHE_REDIS_URL'),
+    }
+}
+
 # إعدادات الأمان للإنتاج
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -1,7 +1,12 @@
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
 
 from universityApps.programs.models import AcademicLevel
-from .models import StudyPlan, SemesterPlan, SemesterCourse,AcademicYear, Semester ,LectureBroadcast,Classroom
+from .models import StudyPlan, SemesterPlan, SemesterCourse,AcademicYear, Semester ,LectureBroadcast,Classroom, StudentSemesterSummary, Exam, GradeDistribution
 from django import forms
 class SemesterPlanForm(forms.ModelForm):
     class Meta:
@@ -106,6 +111,63 @@ class SemesterAdmin(admin.ModelAdmin):
     list_select_related = ('academic_year',)
 
 
+@admin.register(StudentSemesterSummary)
+class StudentSemesterSummaryAdmin(admin.ModelAdmin):
+    list_display = ('student', 'semester', 'credits_attempted', 'credits_earned', 'semester_gpa', 'cumulative_gpa')
+    list_filter = ('semester__academic_year', 'semester')
+    search_fields = ('student__student_id',)
+    list_select_related = ('student', 'semester')
+    readonly_fields = [field.name for field in StudentSemesterSummary._meta.fields]
+
+
+@admin.register(GradeDistribution)
+class GradeDistributionAdmin(admin.ModelAdmin):
+    list_display = ('semester_course', 'semester', 'instructor', 'count', 'passed', 'updated_at')
+    list_filter = ('academic_year', 'semester')
+    search_fields = ('course__name', 'course__code')
+    list_select_related = ('semester_course__course', 'semester', 'instructor')
+    readonly_fields = [field.name for field in GradeDistribution._meta.fields]
+
+@admin.register(Exam)
+class ExamAdmin(admin.ModelAdmin):
+    list_display = ('title', 'course', 'scheduled_date', 'duration_minutes', 'item_analysis_link')
+    list_filter = ('scheduled_date',)
+    search_fields = ('title', 'course__course__name')
+    list_select_related = ('course__course',)
+    raw_id_fields = ('course', 'component')
+
+    def get_urls(self):
+        urls = [
+            path(
+                '<int:exam_id>/item-analysis/',
+                self.admin_site.admin_view(self.item_analysis_view),
+                name='academic_exam_item_analysis',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def item_analysis_link(self, obj):
+        url = reverse('admin:academic_exam_item_analysis', args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, "Item analysis")
+    item_analysis_link.short_description = "Item analysis"
+
+    def item_analysis_view(self, request, exam_id):
+        from .item_analysis import get_item_analysis
+        exam = get_object_or_404(Exam, pk=exam_id)
+        # results of every student: only for users allowed to view the exam
+        if not self.has_view_permission(request, exam):
+            raise PermissionDenied
+        refresh = 'refresh' in request.GET and self.has_change_permission(request, exam)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'original': exam,
+            'title': f"Item analysis: {exam.title}",
+            'analysis': get_item_analysis(exam, refresh=refresh),
+        }
+        return TemplateResponse(request, 'admin/academic/exam/item_analysis.html', context)
+
+
 @admin.register(LectureBroadcast)
 class LectureBroadcastAdmin(admin.ModelAdmin):
     list_display = ['schedule', 'status', 'stream_key', 'viewer_count']
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AcademicConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'universityApps.academic'
+
+    def ready(self):
+        import universityApps.academic.checks
+        import universityApps.academic.signals
@@ -0,0 +1,32 @@
+"""System checks of the academic app"""
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+# backends whose entries are only visible to the process that wrote them
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _process_local_cache():
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return "The default cache (%s) is not shared between processes." % backend
+    return None
+
+
+SHARED_CACHE_HINT = "Set CACHE_REDIS_URL: buffered exam answers are written to the database by the Celery workers."
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """The exam autosave buffer lives in the default cache and is flushed by other processes"""
+    message = _process_local_cache()
+    return [Warning(message, hint=SHARED_CACHE_HINT, id='academic.W001')] if message else []
+
+
+@register(deploy=True)
+def check_shared_cache_deploy(app_configs, **kwargs):
+    message = _process_local_cache()
+    return [Error(message, hint=SHARED_CACHE_HINT, id='academic.E001')] if message else []
@@ -0,0 +1,197 @@
+"""
+Prerequisite eligibility with bitsets.
+
+Every course gets a bit position in a shared index. The index also holds the
+prerequisite mask of each course (the bits of its active, direct
+prerequisites, as in Course.get_all_prerequisites), and each student has a
+bitset of the courses they passed. A student may take a course when
+`passed & mask == mask`. The checks run in NumPy over whole plans and groups
+of students.
+
+The index and the per-student bitsets are kept in the cache. The index is
+stored under its version, next to a small key naming the current version;
+each process keeps the index it last loaded and unpickles it again only when
+that version changes. The index is dropped when a course, its prerequisites
+or a grade band changes, and a student's bitset once their recomputation is
+scheduled after a commit (see users.tasks), which covers the bulk grading
+paths as well as single grades. The bitsets are keyed by the index version,
+so a new index never reads bitsets laid out for an older one.
+"""
+import threading
+import uuid
+from dataclasses import dataclass
+
+import numpy as np
+from django.core.cache import cache
+
+from universityApps.courses.models import Course
+
+from .models import SemesterCourse, SemesterPlan, StudentGrade, StudentGroupMembership
+
+PREREQUISITE_VERSION_KEY = 'course_prerequisite_index_version'
+PREREQUISITE_INDEX_KEY = 'course_prerequisite_index:{version}'
+PASSED_COURSES_KEY = 'passed_courses:{version}:{student_id}'
+ELIGIBILITY_TIMEOUT = 60 * 60 * 24
+
+_lock = threading.Lock()
+_index = None
+
+
+@dataclass(frozen=True)
+class PrerequisiteIndex:
+    """Bit positions of the courses and the packed prerequisite mask of each one"""
+    version: str
+    course_ids: np.ndarray
+    masks: np.ndarray
+
+    def positions(self, course_ids):
+        """Bit position of each course id, -1 for unknown courses"""
+        course_ids = np.asarray(course_ids, dtype=np.int64)
+        if not len(self.course_ids):
+            return np.full(len(course_ids), -1, dtype=np.int64)
+        position = np.minimum(np.searchsorted(self.course_ids, course_ids), len(self.course_ids) - 1)
+        return np.where(self.course_ids[position] == course_ids, position, -1)
+
+    def bitset(self, course_ids):
+        bits = np.zeros(len(self.course_ids), dtype=bool)
+        position = self.positions(course_ids)
+        bits[position[position >= 0]] = True
+        return np.packbits(bits)
+
+
+def build_prerequisite_index():
+    """Read every course and prerequisite link (two queries) and pack the masks"""
+    course_ids = np.array(sorted(Course.objects.values_list('id', flat=True)), dtype=np.int64)
+    links = list(Course.prerequisites.through.objects.filter(
+        to_course__is_active=True,
+    ).values_list('from_course_id', 'to_course_id'))
+
+    size = len(course_ids)
+    index = PrerequisiteIndex(uuid.uuid4().hex, course_ids, np.zeros((size, 0), dtype=np.uint8))
+    required = np.zeros((size, size), dtype=bool)
+    if links:
+        rows = index.positions([course for course, _prerequisite in links])
+        columns = index.positions([prerequisite for _course, prerequisite in links])
+        known = (rows >= 0) & (columns >= 0)
+        required[rows[known], columns[known]] = True
+    return PrerequisiteIndex(index.version, course_ids, np.packbits(required, axis=1))
+
+
+def get_prerequisite_index():
+    """The current index: this process's copy while its version is current, else the cached one, else a new one"""
+    global _index
+    version = cache.get(PREREQUISITE_VERSION_KEY)
+    index = _index
+    if index is not None and index.version == version:
+        return index
+
+    index = cache.get(PREREQUISITE_INDEX_KEY.format(version=version)) if version else None
+    if index is None:
+        index = build_prerequisite_index()
+        cache.set(PREREQUISITE_INDEX_KEY.format(version=index.version), index, ELIGIBILITY_TIMEOUT)
+        cache.set(PREREQUISITE_VERSION_KEY, index.version, ELIGIBILITY_TIMEOUT)
+    with _lock:
+        _index = index
+    return index
+
+
+def invalidate_prerequisite_index():
+    """Start a new index version; the bitsets of the old one are no longer read"""
+    version = cache.get(PREREQUISITE_VERSION_KEY)
+    cache.delete(PREREQUISITE_VERSION_KEY)
+    if version:
+        cache.delete(PREREQUISITE_INDEX_KEY.format(version=version))
+
+
+def invalidate_passed_courses(student_ids):
+    version = cache.get(PREREQUISITE_VERSION_KEY)
+    if version is not None:
+        cache.delete_many([
+            PASSED_COURSES_KEY.format(version=version, student_id=student_id) for student_id in student_ids
+        ])
+
+
+def passed_bitsets(student_ids, index=None):
+    """(students, bytes) array of the passed courses, read from the cache or with one query"""
+    index = index or get_prerequisite_index()
+    student_ids = list(student_ids)
+    keys = {
+        student_id: PASSED_COURSES_KEY.format(version=index.version, student_id=student_id)
+        for student_id in student_ids
+    }
+    cached = cache.get_many(keys.values())
+
+    missing = [student_id for student_id in student_ids if keys[student_id] not in cached]
+    if missing:
+        passed = {student_id: [] for student_id in missing}
+        for student_id, course_id in StudentGrade.objects.filter(
+            student_id__in=missing, grade__is_passing=True,
+        ).values_list('student_id', 'semester_course__course_id'):
+            passed[student_id].append(course_id)
+        computed = {keys[student_id]: index.bitset(courses) for student_id, courses in passed.items()}
+        cache.set_many(computed, ELIGIBILITY_TIMEOUT)
+        cached.update(computed)
+
+    width = index.masks.shape[1]
+    if not student_ids:
+        return np.zeros((0, width), dtype=np.uint8)
+    return np.stack([cached[keys[student_id]] for student_id in student_ids])
+
+
+def eligibility_matrix(student_ids, semester_course_ids, exclude_passed=True):
+    """
+    مصفوفة الأهلية: صف لكل طالب وعمود لكل مقرر فصلي.
+    A cell is True when the student passed every prerequisite of the course
+    (and, with exclude_passed, has not passed the course itself).
+    """
+    index = get_prerequisite_index()
+    semester_course_ids = list(semester_course_ids)
+    course_of = dict(SemesterCourse.objects.filter(
+        pk__in=semester_course_ids,
+    ).values_list('id', 'course_id'))
+    positions = index.positions([course_of.get(pk, 0) for pk in semester_course_ids])
+
+    passed = passed_bitsets(student_ids, index)
+    known = positions >= 0
+    masks = np.zeros((len(semester_course_ids), index.masks.shape[1]), dtype=np.uint8)
+    masks[known] = index.masks[positions[known]]
+
+    # only the bytes holding a prerequisite of one of these courses matter
+    relevant = masks.any(axis=0)
+    masks, relevant_passed = masks[:, relevant], passed[:, relevant]
+    # (students, courses, bytes): every prerequisite bit must be set in the passed bitset
+    eligible = ((relevant_passed[:, None, :] & masks[None, :, :]) == masks[None, :, :]).all(axis=2)
+    eligible &= known[None, :]
+    if exclude_passed and len(index.course_ids):
+        bits = np.unpackbits(passed, axis=1, count=len(index.course_ids)).astype(bool)
+        eligible &= ~bits[:, np.where(known, positions, 0)]
+    return eligible
+
+
+def eligible_semester_courses(student, semester_courses, exclude_passed=True):
+    """Ids of the semester courses (ids or a queryset) the student may register for"""
+    semester_course_ids = [getattr(course, 'pk', course) for course in semester_courses]
+    row = eligibility_matrix([getattr(student, 'pk', student)], semester_course_ids, exclude_passed)[0]
+    return [pk for pk, eligible in zip(semester_course_ids, row) if eligible]
+
+
+def level_eligibility(level, semester, exclude_passed=True):
+    """
+    {student_id: [semester_course_id, ...]} for every member of the groups of a level
+    in a semester, over the semester plans of that level and semester type.
+    """
+    student_ids = list(StudentGroupMembership.objects.filter(
+        group__level=level, group__semester=semester,
+    ).values_list('student_id', flat=True))
+    semester_course_ids = list(SemesterCourse.objects.filter(
+        semester_plan__in=SemesterPlan.objects.filter(
+            academic_level=level, semester_type=semester.semester_type,
+        ),
+    ).order_by('order', 'id').values_list('id', flat=True))
+
+    matrix = eligibility_matrix(student_ids, semester_course_ids, exclude_passed)
+    course_ids = np.array(semester_course_ids, dtype=np.int64)
+    return {
+        student_id: course_ids[row].tolist()
+        for student_id, row in zip(student_ids, matrix)
+    }
@@ -0,0 +1,380 @@
+"""Exam services: bulk grading, cached exam papers and buffered answer autosave"""
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Exam, ExamAnswer, ExamQuestion, ExamSection, MCQChoice, StudentExamSubmission
+
+GRADING_CHUNK_SIZE = 2000
+
+
+@dataclass(frozen=True)
+class KeyEntry:
+    """Answer key of one question"""
+    is_mcq: bool
+    max_score: Decimal
+    correct_choices: frozenset
+
+
+def load_answer_key(exam):
+    """Questions of the exam with their max score and correct choices, in two queries"""
+    questions = ExamQuestion.objects.filter(section__exam=exam).values_list('id', 'is_mcq', 'max_score')
+    correct = {}
+    for question_id, choice_id in MCQChoice.objects.filter(
+        question__section__exam=exam, is_correct=True,
+    ).values_list('question_id', 'id'):
+        correct.setdefault(question_id, set()).add(choice_id)
+
+    return {
+        question_id: KeyEntry(is_mcq, max_score, frozenset(correct.get(question_id, ())))
+        for question_id, is_mcq, max_score in questions
+    }
+
+
+def grade_answer(entry, selected_choice_id):
+    """Score of an MCQ answer, or None when it cannot be auto-graded"""
+    if entry is None or not entry.is_mcq or selected_choice_id is None:
+        return None
+    return entry.max_score if selected_choice_id in entry.correct_choices else Decimal('0')
+
+
+def update_total_scores(exam):
+    """Write the total_score of every submission of the exam with one UPDATE"""
+    totals = ExamAnswer.objects.filter(
+        submission=OuterRef('pk'),
+    ).order_by().values('submission').annotate(total=Sum('score')).values('total')
+
+    return StudentExamSubmission.objects.filter(exam=exam).update(
+        total_score=Coalesce(
+            Subquery(totals, output_field=DecimalField(max_digits=6, decimal_places=2)),
+            Value(Decimal('0')),
+        )
+    )
+
+
+def grade_exam(exam):
+    """
+    تصحيح جميع إجابات الاختيار من متعدد لامتحان وتحديث مجموع كل تسليم.
+    The answer key is loaded once; answers are read in chunks and written with bulk_update.
+    Returns the number of answers whose score changed and of submissions updated.
+    """
+    key = load_answer_key(exam)
+    mcq_questions = [question_id for question_id, entry in key.items() if entry.is_mcq]
+
+    answers = ExamAnswer.objects.filter(
+        submission__exam=exam,
+        question_id__in=mcq_questions,
+    ).only('id', 'question_id', 'selected_choice_id', 'score').order_by('id')
+
+    changed = 0
+    with transaction.atomic():
+        batch = []
+        for answer in answers.iterator(chunk_size=GRADING_CHUNK_SIZE):
+            score = grade_answer(key.get(answer.question_id), answer.selected_choice_id)
+            if score is None:
+                score = Decimal('0')
+            if answer.score != score:
+                answer.score = score
+                batch.append(answer)
+            if len(batch) >= GRADING_CHUNK_SIZE:
+                ExamAnswer.objects.bulk_update(batch, ['score'])
+                changed += len(batch)
+                batch = []
+        if batch:
+            ExamAnswer.objects.bulk_update(batch, ['score'])
+            changed += len(batch)
+
+        submissions = update_total_scores(exam)
+
+    return {'answers_graded': changed, 'submissions': submissions}
+
+
+# ---------------------------------------------------------------------------
+# Exam papers
+#
+# The paper of an exam is assembled once (three queries) into plain dicts and
+# kept in the cache until the exam, one of its sections, questions or choices
+# changes (see academic.signals). It is dropped after the commit, so a request
+# running meanwhile cannot cache the paper again from the old rows. Correct answers are never part of it.
+# Each student gets the same paper in an order derived from (exam id, student id),
+# so no per-student state is stored.
+# ---------------------------------------------------------------------------
+
+EXAM_PAPER_KEY = 'exam_paper:{exam_id}'
+EXAM_PAPER_TIMEOUT = 60 * 60 * 24
+
+
+def build_exam_paper(exam_id):
+    """Assemble the paper of an exam, or return None if it does not exist"""
+    exam = Exam.objects.filter(pk=exam_id).values(
+        'id', 'title', 'instructions', 'scheduled_date', 'duration_minutes',
+    ).first()
+    if exam is None:
+        return None
+
+    choices = {}
+    for choice_id, question_id, text in MCQChoice.objects.filter(
+        question__section__exam_id=exam_id,
+    ).order_by('id').values_list('id', 'question_id', 'text'):
+        choices.setdefault(question_id, []).append({'id': choice_id, 'text': text})
+
+    sections = {
+        section_id: {'id': section_id, 'title': title, 'questions': []}
+        for section_id, title in ExamSection.objects.filter(
+            exam_id=exam_id,
+        ).order_by('order', 'id').values_list('id', 'title')
+    }
+    for question in ExamQuestion.objects.filter(
+        section__exam_id=exam_id,
+    ).order_by('order', 'id').values('id', 'section_id', 'question_text', 'is_mcq', 'max_score'):
+        sections[question['section_id']]['questions'].append({
+            'id': question['id'],
+            'text': question['question_text'],
+            'is_mcq': question['is_mcq'],
+            'max_score': str(question['max_score']),
+            'choices': choices.get(question['id'], []),
+        })
+
+    return {**exam, 'sections': list(sections.values())}
+
+
+def get_exam_paper(exam_id):
+    """The cached paper of an exam, built on first use"""
+    key = EXAM_PAPER_KEY.format(exam_id=exam_id)
+    paper = cache.get(key)
+    if paper is None:
+        paper = build_exam_paper(exam_id)
+        if paper is not None:
+            cache.set(key, paper, EXAM_PAPER_TIMEOUT)
+    return paper
+
+
+def invalidate_exam_papers(exam_ids):
+    cache.delete_many([
+        key.format(exam_id=exam_id)
+        for exam_id in exam_ids
+        for key in (EXAM_PAPER_KEY, EXAM_QUESTIONS_KEY)
+    ])
+
+
+def paper_for_student(exam_id, student_id):
+    """
+    ورقة الامتحان بترتيب خاص بالطالب.
+    Questions are shuffled within their section and choices within their question,
+    with a generator seeded by the exam and the student, so reloads give the same order.
+    """
+    paper = get_exam_paper(exam_id)
+    if paper is None:
+        return None
+
+    generator = random.Random(f"{exam_id}:{student_id}")
+    sections = []
+    for section in paper['sections']:
+        questions = []
+        for question in section['questions']:
+            choices = list(question['choices'])
+            generator.shuffle(choices)
+            questions.append({**question, 'choices': choices})
+        generator.shuffle(questions)
+        sections.append({**section, 'questions': questions})
+    return {**paper, 'sections': sections}
+
+
+# ---------------------------------------------------------------------------
+# Answer autosave
+#
+# Each answer is kept in the cache under its own key (one key per submission
+# and question), so concurrent autosaves of a submission never overwrite each
+# other. The buffer is written to the database as a single upsert by the
+# first autosave of every EXAM_AUTOSAVE_FLUSH_INTERVAL seconds, by a periodic
+# sweep of the open and just-closed exams (see academic.tasks) and by the
+# final submit. Writes lock the submission row and skip submissions already
+# submitted, so a late autosave can never overwrite submitted answers.
+# The buffer needs a cache shared by every worker (see academic.checks).
+# ---------------------------------------------------------------------------
+
+AUTOSAVE_ANSWER_KEY = 'exam_autosave:{submission_id}:{question_id}'
+AUTOSAVE_TIMER_KEY = 'exam_autosave_timer:{submission_id}'
+EXAM_QUESTIONS_KEY = 'exam_questions:{exam_id}'
+# buffered answers outlive the end of the sitting by this margin
+AUTOSAVE_GRACE_MINUTES = 60
+
+
+def _flush_interval():
+    return getattr(settings, 'EXAM_AUTOSAVE_FLUSH_INTERVAL', 15)
+
+
+def _buffer_timeout(exam):
+    # keep the buffer for the whole sitting plus a safety margin
+    return (exam.duration_minutes + AUTOSAVE_GRACE_MINUTES) * 60
+
+
+def exam_question_choices(exam_id):
+    """{question_id: set of choice ids} of an exam, cached for the validation of autosaves"""
+    key = EXAM_QUESTIONS_KEY.format(exam_id=exam_id)
+    structure = cache.get(key)
+    if structure is None:
+        paper = get_exam_paper(exam_id) or {'sections': []}
+        structure = {
+            question['id']: {choice['id'] for choice in question['choices']}
+            for section in paper['sections']
+            for question in section['questions']
+        }
+        cache.set(key, structure, EXAM_PAPER_TIMEOUT)
+    return structure
+
+
+def is_exam_open(exam, now=None):
+    now = now or timezone.now()
+    return exam.scheduled_date <= now <= exam.scheduled_date + timedelta(minutes=exam.duration_minutes)
+
+
+def _answer_keys(submission_ids, question_ids):
+    """{cache key: (submission_id, question_id)} of every possible buffered answer"""
+    return {
+        AUTOSAVE_ANSWER_KEY.format(submission_id=submission_id, question_id=question_id): (submission_id, question_id)
+        for submission_id in submission_ids
+        for question_id in question_ids
+    }
+
+
+def buffered_answers(submission):
+    """Answers waiting in the cache: {question_id: {'choice': id or None, 'text': str or None}}"""
+    keys = _answer_keys([submission.pk], exam_question_choices(submission.exam_id))
+    return {keys[key][1]: answer for key, answer in cache.get_many(keys).items()}
+
+
+def autosave_answers(submission, answers):
+    """
+    حفظ تغييرات الإجابات في ذاكرة الكاش الخاصة بالتسليم.
+    `answers` is a list of {'question': id, 'choice': id or None, 'text': str or None}.
+    Raises ValueError for a submitted submission and for questions or choices
+    that do not belong to the exam.
+    Returns True when the buffer was written to the database by this call.
+    """
+    if submission.submitted_at is not None:
+        raise ValueError("This submission has already been submitted")
+
+    structure = exam_question_choices(submission.exam_id)
+    changes = {}
+    for answer in answers:
+        question_id = int(answer['question'])
+        choice_id = answer.get('choice')
+        choice_id = int(choice_id) if choice_id not in (None, '') else None
+        if question_id not in structure:
+            raise ValueError(f"Question {question_id} is not part of this exam")
+        if choice_id is not None and choice_id not in structure[question_id]:
+            raise ValueError(f"Choice {choice_id} does not belong to question {question_id}")
+        changes[AUTOSAVE_ANSWER_KEY.format(submission_id=submission.pk, question_id=question_id)] = {
+            'choice': choice_id, 'text': answer.get('text'),
+        }
+    cache.set_many(changes, _buffer_timeout(submission.exam))
+
+    # cache.add is atomic: only the first save of each interval flushes
+    if cache.add(AUTOSAVE_TIMER_KEY.format(submission_id=submission.pk), 1, _flush_interval()):
+        flush_answers(submission)
+        return True
+    return False
+
+
+def _write_answers(buffers):
+    """Upsert {submission_id: {question_id: answer}} in one statement"""
+    answers = [
+        ExamAnswer(
+            submission_id=submission_id,
+            question_id=question_id,
+            selected_choice_id=answer['choice'],
+            answer_text=answer['text'],
+        )
+        for submission_id, buffer in buffers.items()
+        for question_id, answer in buffer.items()
+    ]
+    if answers:
+        ExamAnswer.objects.bulk_create(
+            answers,
+            update_conflicts=True,
+            unique_fields=['submission', 'question'],
+            update_fields=['selected_choice', 'answer_text'],
+        )
+    return len(answers)
+
+
+def _lock_open_submissions(submissions):
+    """Ids of the submissions of a queryset not submitted yet, locked until the end of the transaction"""
+    return list(submissions.select_for_update().filter(
+        submitted_at__isnull=True,
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def flush_answers(submission):
+    """Write the buffered answers of a submission not submitted yet; returns the number written"""
+    with transaction.atomic():
+        if not _lock_open_submissions(StudentExamSubmission.objects.filter(pk=submission.pk)):
+            return 0
+        # read under the lock, so a flush never writes older answers over a newer one
+        return _write_answers({submission.pk: buffered_answers(submission)})
+
+
+def submit_answers(submission):
+    """
+    Final submit: write the buffer, stamp the submission and drop the cached answers.
+    Returns False when the submission had already been submitted.
+    """
+    with transaction.atomic():
+        if not _lock_open_submissions(StudentExamSubmission.objects.filter(pk=submission.pk)):
+            return False
+        _write_answers({submission.pk: buffered_answers(submission)})
+        submission.submitted_at = timezone.now()
+        StudentExamSubmission.objects.filter(pk=submission.pk).update(submitted_at=submission.submitted_at)
+
+        keys = list(_answer_keys([submission.pk], exam_question_choices(submission.exam_id)))
+        keys.append(AUTOSAVE_TIMER_KEY.format(submission_id=submission.pk))
+        transaction.on_commit(lambda: cache.delete_many(keys))
+    return True
+
+
+def flush_exam_autosaves(exam, chunk_size=200):
+    """Write the buffers of every submission of an exam not submitted yet"""
+    question_ids = list(exam_question_choices(exam.pk))
+    submission_ids = list(StudentExamSubmission.objects.filter(
+        exam=exam, submitted_at__isnull=True,
+    ).order_by('pk').values_list('pk', flat=True))
+
+    flushed = 0
+    for start in range(0, len(submission_ids), chunk_size):
+        with transaction.atomic():
+            locked = _lock_open_submissions(StudentExamSubmission.objects.filter(
+                pk__in=submission_ids[start:start + chunk_size],
+            ))
+            keys = _answer_keys(locked, question_ids)
+            buffers = {}
+            for key, answer in cache.get_many(keys).items():
+                submission_id, question_id = keys[key]
+                buffers.setdefault(submission_id, {})[question_id] = answer
+            flushed += _write_answers(buffers)
+    return flushed
+
+
+def flush_recent_exam_autosaves(now=None):
+    """
+    Periodic sweep: write the buffered answers of every exam that is open, or
+    closed recently enough for its buffers to still be in the cache.
+    """
+    now = now or timezone.now()
+    flushed = 0
+    for exam in Exam.objects.filter(
+        scheduled_date__lte=now,
+        submissions__submitted_at__isnull=True,
+    ).distinct().only('id', 'scheduled_date', 'duration_minutes'):
+        closes = exam.scheduled_date + timedelta(minutes=exam.duration_minutes + AUTOSAVE_GRACE_MINUTES)
+        if closes >= now:
+            flushed += flush_exam_autosaves(exam)
+    return flushed
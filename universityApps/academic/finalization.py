@@ -0,0 +1,203 @@
+"""
+Semester-end grade finalization.
+
+All the component scores of a semester are loaded once into NumPy arrays;
+weighted totals, letter grades and pass/fail are computed for every
+registration at the same time, and the results are written with bulk
+operations instead of calling complete()/fail() registration by registration.
+Totals are kept in integer hundredths so they add up exactly like the stored
+Decimal values.
+"""
+from collections import Counter
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .grade_bands import get_grade_bands
+from .models import (
+    ComponoentScore, CourseRegistration, GradeComponent, StudentGrade,
+)
+
+Status = CourseRegistration.RegistrationStatus
+
+
+def _registrations(semester):
+    rows = CourseRegistration.objects.filter(
+        semester_registration__semester=semester,
+        status=Status.Registered,
+    ).values_list('id', 'semester_registration__student_id', 'semester_course_id')
+    return np.array(list(rows), dtype=np.int64).reshape(-1, 3)
+
+
+def _components(semester_course_ids):
+    rows = list(GradeComponent.objects.filter(
+        semester_course_id__in=semester_course_ids,
+    ).values_list('id', 'semester_course_id', 'weight', 'is_required').order_by('id'))
+    return (
+        np.array([row[0] for row in rows], dtype=np.int64),
+        np.array([row[1] for row in rows], dtype=np.int64),
+        np.array([row[2] for row in rows], dtype=np.float64),
+        np.array([row[3] for row in rows], dtype=bool),
+    )
+
+
+def _cents(value):
+    return int(value.scaleb(2))
+
+
+def _scores(component_ids):
+    rows = list(ComponoentScore.objects.filter(
+        component_id__in=component_ids.tolist(),
+    ).values_list('student_id', 'component_id', 'weighted_score'))
+    students = np.array([row[0] for row in rows], dtype=np.int64)
+    components = np.array([row[1] for row in rows], dtype=np.int64)
+    # the stored weighted scores, already rounded half-up by ComponoentScore.scaled
+    weighted = np.array([_cents(row[2]) for row in rows], dtype=np.int64)
+    return students, components, weighted
+
+
+def compute_semester_results(semester):
+    """
+    حساب النتائج النهائية لكل تسجيلات الفصل دفعة واحدة.
+    Returns the registrations array (id, student_id, semester_course_id), the
+    weighted totals in hundredths, a completeness mask and the matched Grade
+    (or None) per row.
+    """
+    registrations = _registrations(semester)
+    count = len(registrations)
+    totals = np.zeros(count, dtype=np.int64)
+    if not count:
+        return registrations, totals, np.zeros(0, dtype=bool), []
+
+    component_ids, component_courses, weights, required = _components(
+        np.unique(registrations[:, 2]).tolist()
+    )
+
+    # one key per (student, semester course) to match scores to registrations
+    width = int(max(registrations[:, 2].max(), component_courses.max(initial=0))) + 1
+    keys = registrations[:, 1] * width + registrations[:, 2]
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+
+    scored_weight = np.zeros(count)
+    required_scored = np.zeros(count, dtype=np.int64)
+    students, score_components, weighted = _scores(component_ids)
+    if len(weighted):
+        component_index = np.searchsorted(component_ids, score_components)
+        score_keys = students * width + component_courses[component_index]
+        position = np.minimum(np.searchsorted(sorted_keys, score_keys), count - 1)
+        matched = sorted_keys[position] == score_keys
+
+        component_index = component_index[matched]
+        rows = order[position[matched]]
+
+        np.add.at(totals, rows, weighted[matched])
+        np.add.at(scored_weight, rows, weights[component_index])
+        np.add.at(required_scored, rows, required[component_index].astype(np.int64))
+
+    # required components per semester course of every registration
+    courses, course_index = np.unique(component_courses, return_inverse=True)
+    required_per_course = np.bincount(course_index, weights=required, minlength=len(courses))
+    position = np.minimum(np.searchsorted(courses, registrations[:, 2]), max(len(courses) - 1, 0))
+    has_components = (courses[position] == registrations[:, 2]) if len(courses) else np.zeros(count, dtype=bool)
+    required_needed = np.where(has_components, required_per_course[position] if len(courses) else 0, 0)
+
+    complete = has_components & (scored_weight > 0) & (required_scored >= required_needed)
+
+    grades = [None] * count
+    bands = get_grade_bands()
+    if bands is not None and bands.grades:
+        lower = np.array([_cents(value) for value in bands.lower_bounds], dtype=np.int64)
+        upper = np.array([_cents(grade.max_percent) for grade in bands.grades], dtype=np.int64)
+        band = np.searchsorted(lower, totals, side='right') - 1
+        in_band = complete & (band >= 0) & (totals <= upper[np.maximum(band, 0)])
+        for row in np.flatnonzero(in_band):
+            grades[row] = bands.grades[band[row]]
+
+    return registrations, totals, complete, grades
+
+
+def finalize_semester(semester, dry_run=False, graded_by=None):
+    """
+    إغلاق الفصل: كتابة الدرجات النهائية وحالات التسجيل بعمليات جماعية.
+    With dry_run nothing is written; the report describes what would change.
+    """
+    registrations, totals, complete, grades = compute_semester_results(semester)
+
+    report = {
+        'dry_run': dry_run,
+        'registrations': len(registrations),
+        'completed': 0,
+        'failed': 0,
+        'incomplete': 0,
+        'unmatched': 0,
+        'distribution': Counter(),
+    }
+    outcomes = []
+    for row, (registration_id, student_id, semester_course_id) in enumerate(registrations.tolist()):
+        grade = grades[row]
+        if not complete[row]:
+            report['incomplete'] += 1
+            outcomes.append((registration_id, student_id, semester_course_id, Status.incomplete, None, None))
+            continue
+        if grade is None:
+            report['unmatched'] += 1
+            continue
+        status = Status.completed if grade.is_passing else Status.failed
+        report[status] += 1
+        report['distribution'][grade.Letter] += 1
+        outcomes.append((
+            registration_id, student_id, semester_course_id, status, grade,
+            Decimal(int(totals[row])).scaleb(-2),
+        ))
+
+    if dry_run or not outcomes:
+        return report
+
+    existing = {
+        (student_grade.student_id, student_grade.semester_course_id): student_grade
+        for student_grade in StudentGrade.objects.filter(semester=semester)
+    }
+    to_create, to_update, registration_updates = [], [], []
+    now = timezone.now()
+    for registration_id, student_id, semester_course_id, status, grade, numeric_value in outcomes:
+        student_grade = None
+        if grade is not None:
+            student_grade = existing.get((student_id, semester_course_id))
+            if student_grade is None:
+                student_grade = StudentGrade(
+                    student_id=student_id,
+                    semester_course_id=semester_course_id,
+                    semester=semester,
+                    graded_by=graded_by,
+                )
+                to_create.append(student_grade)
+            else:
+                student_grade.last_modified = now
+                to_update.append(student_grade)
+            student_grade.grade = grade
+            student_grade.numeric_value = numeric_value
+            student_grade.grade_points = grade.points
+        registration_updates.append((registration_id, status, student_grade))
+
+    from universityApps.users.tasks import schedule_student_recompute
+    from .tasks import schedule_distribution_refresh
+    with transaction.atomic():
+        StudentGrade.objects.bulk_create(to_create, batch_size=1000)
+        StudentGrade.objects.bulk_update(
+            to_update, ['grade', 'numeric_value', 'grade_points', 'last_modified'], batch_size=1000
+        )
+        registration_objects = []
+        for registration_id, status, student_grade in registration_updates:
+            registration = CourseRegistration(id=registration_id, status=status)
+            registration.grade = student_grade
+            registration_objects.append(registration)
+        CourseRegistration.objects.bulk_update(registration_objects, ['status', 'grade'], batch_size=1000)
+        schedule_student_recompute(*{student_id for _id, student_id, *_rest in outcomes})
+        schedule_distribution_refresh(*{
+            (semester.pk, student_grade.semester_course_id) for student_grade in to_create + to_update
+        })
+
+    return report
@@ -0,0 +1,110 @@
+"""
+Process-wide index of the grade bands of each GradeScale.
+
+The bands of a scale are loaded once, sorted by `min_percent`, and looked up
+with bisect. The index is dropped once a change to a Grade or GradeScale is
+committed (see academic.signals). When GRADE_BANDS_CACHE_SYNC is on, a version stamp
+kept in the cache lets the other processes notice the change as well.
+"""
+import threading
+import uuid
+from bisect import bisect_right
+from dataclasses import dataclass
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_CACHE_KEY = 'academic_grade_bands_version'
+DEFAULT = 'default'
+
+_lock = threading.RLock()
+_index = {}
+_version = None
+
+
+@dataclass(frozen=True)
+class GradeBands:
+    """Grades of one scale sorted by their lower bound"""
+    scale_id: int
+    lower_bounds: tuple
+    grades: tuple
+
+    def lookup(self, value):
+        """Return the grade whose [min_percent, max_percent] contains `value`, or None"""
+        if value is None:
+            return None
+        value = Decimal(str(value)) if not isinstance(value, Decimal) else value
+        position = bisect_right(self.lower_bounds, value) - 1
+        if position < 0:
+            return None
+        grade = self.grades[position]
+        return grade if value <= grade.max_percent else None
+
+    def lookup_many(self, values):
+        return [self.lookup(value) for value in values]
+
+
+def _cache_sync_enabled():
+    return getattr(settings, 'GRADE_BANDS_CACHE_SYNC', False)
+
+
+def _shared_version():
+    if not _cache_sync_enabled():
+        return None
+    return cache.get(VERSION_CACHE_KEY)
+
+
+def _load(scale):
+    from .models import Grade, GradeScale
+    if scale == DEFAULT:
+        scale_id = GradeScale.objects.filter(is_default=True).values_list('pk', flat=True).first()
+        if scale_id is None:
+            return None
+    else:
+        scale_id = getattr(scale, 'pk', scale)
+
+    grades = sorted(Grade.objects.filter(scale_id=scale_id), key=lambda grade: grade.min_percent)
+    return GradeBands(
+        scale_id=scale_id,
+        lower_bounds=tuple(grade.min_percent for grade in grades),
+        grades=tuple(grades),
+    )
+
+
+def get_grade_bands(scale=None):
+    """Return the bands of `scale` (a GradeScale or its id), or of the default scale"""
+    global _version
+    key = DEFAULT if scale is None else getattr(scale, 'pk', scale)
+    version = _shared_version()
+    if _version == version and key in _index:
+        return _index[key]
+
+    with _lock:
+        if _version != version:
+            _index.clear()
+            _version = version
+        if key not in _index:
+            _index[key] = _load(key)
+        return _index[key]
+
+
+def grade_for_value(value, scale=None):
+    bands = get_grade_bands(scale)
+    return bands.lookup(value) if bands is not None else None
+
+
+def grades_for_values(values, scale=None):
+    """Map a whole column of percentages to grades (None where no band matches)"""
+    values = list(values)
+    bands = get_grade_bands(scale)
+    if bands is None:
+        return [None] * len(values)
+    return bands.lookup_many(values)
+
+
+def invalidate_grade_bands():
+    """Drop the index of this process, and of the others when cache sync is enabled"""
+    with _lock:
+        _index.clear()
+    if _cache_sync_enabled():
+        cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
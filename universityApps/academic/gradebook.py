@@ -0,0 +1,178 @@
+"""Bulk gradebook import for a semester course"""
+import csv
+import io
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from .models import (
+    ComponoentScore, CourseRegistration, GradeComponent, StudentGrade,
+)
+
+STUDENT_COLUMN = 'student_id'
+
+
+def read_gradebook(file, filename=None):
+    """
+    قراءة ملف درجات (CSV أو XLSX) وإرجاع العناوين والصفوف.
+    `file` is a path or a binary file object.
+    """
+    filename = filename or (file if isinstance(file, str) else getattr(file, 'name', ''))
+    extension = os.path.splitext(filename)[1].lower()
+
+    if extension == '.xlsx':
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValidationError(_("Reading .xlsx files requires the openpyxl package."))
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        rows = [
+            ['' if value is None else str(value).strip() for value in row]
+            for row in workbook.active.iter_rows(values_only=True)
+        ]
+        workbook.close()
+    elif extension == '.csv':
+        if isinstance(file, str):
+            with open(file, newline='', encoding='utf-8-sig') as handle:
+                rows = [[value.strip() for value in row] for row in csv.reader(handle)]
+        else:
+            text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+            rows = [[value.strip() for value in row] for row in csv.reader(text)]
+    else:
+        raise ValidationError(_("Unsupported gradebook format: %(ext)s"), params={'ext': extension or filename})
+
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        raise ValidationError(_("The gradebook is empty."))
+    return rows[0], rows[1:]
+
+
+def _match_components(semester_course, header):
+    """Map each score column to a GradeComponent by name or id"""
+    components = list(GradeComponent.objects.filter(semester_course=semester_course))
+    by_key = {}
+    for component in components:
+        by_key[str(component.pk)] = component
+        by_key[component.name.strip().lower()] = component
+
+    if not header or header[0].strip().lower() != STUDENT_COLUMN:
+        raise ValidationError(_("The first column must be '%(column)s'."), params={'column': STUDENT_COLUMN})
+
+    columns, errors = [], []
+    for name in header[1:]:
+        component = by_key.get(name.strip().lower())
+        if component is None:
+            errors.append(_("Unknown grade component: %(name)s") % {'name': name})
+        elif component in columns:
+            errors.append(_("Grade component %(name)s appears in more than one column") % {'name': component.name})
+        columns.append(component)
+    if errors:
+        raise ValidationError(errors)
+    return columns
+
+
+def import_gradebook(semester_course, header, rows, graded_by=None, finalize=True):
+    """
+    استيراد مصفوفة درجات (طلاب × مكونات) لمقرر فصلي دفعة واحدة.
+    Everything is validated in memory first; nothing is written if any cell is invalid.
+    Returns a dict with the number of created and updated scores and finalized grades.
+    """
+    columns = _match_components(semester_course, header)
+
+    student_ids = [row[0] for row in rows if row]
+    registered = dict(
+        CourseRegistration.objects.filter(
+            semester_course=semester_course,
+            semester_registration__student__student_id__in=student_ids,
+        ).values_list(
+            'semester_registration__student__student_id', 'semester_registration__student_id'
+        )
+    )
+
+    errors, scores, seen = [], {}, {}
+    for line, row in enumerate(rows, start=2):
+        student_id = row[0] if row else ''
+        if student_id in seen:
+            errors.append(_("Row %(line)s: student %(student)s already appears on row %(first)s") % {
+                'line': line, 'student': student_id, 'first': seen[student_id]})
+            continue
+        seen[student_id] = line
+
+        student_pk = registered.get(student_id)
+        if student_pk is None:
+            errors.append(_("Row %(line)s: student %(student)s is not registered in this course") % {
+                'line': line, 'student': student_id})
+            continue
+
+        for component, cell in zip(columns, row[1:]):
+            if cell == '':
+                continue
+            try:
+                score = Decimal(cell)
+                if not score.is_finite():
+                    # Decimal accepts NaN and Infinity, which cannot be compared or stored
+                    raise InvalidOperation
+            except InvalidOperation:
+                errors.append(_("Row %(line)s: invalid score '%(value)s' for %(component)s") % {
+                    'line': line, 'value': cell, 'component': component.name})
+                continue
+            if score < 0 or score > component.max_score:
+                errors.append(_("Row %(line)s: score %(value)s for %(component)s must be between 0 and %(max)s") % {
+                    'line': line, 'value': cell, 'component': component.name, 'max': component.max_score})
+                continue
+            scores[(student_pk, component.pk)] = (component, score)
+
+    if errors:
+        raise ValidationError(errors)
+
+    existing = {
+        (score.student_id, score.component_id): score
+        for score in ComponoentScore.objects.filter(
+            component__semester_course=semester_course,
+            student_id__in=set(registered.values()),
+        )
+    }
+
+    to_create, to_update = [], []
+    for (student_pk, component_pk), (component, score) in scores.items():
+        precentage, weighted_score = ComponoentScore.scaled(score, component)
+
+        component_score = existing.get((student_pk, component_pk))
+        if component_score is None:
+            to_create.append(ComponoentScore(
+                student_id=student_pk,
+                component=component,
+                score=score,
+                precentage=precentage,
+                weighted_score=weighted_score,
+                graded_by=graded_by,
+            ))
+        else:
+            component_score.score = score
+            component_score.precentage = precentage
+            component_score.weighted_score = weighted_score
+            component_score.graded_by = graded_by
+            to_update.append(component_score)
+
+    with transaction.atomic():
+        # both rebuild the running totals of the course
+        ComponoentScore.objects.bulk_create(to_create, batch_size=1000)
+        ComponoentScore.objects.bulk_update(
+            to_update, ['score', 'precentage', 'weighted_score', 'graded_by'], batch_size=1000
+        )
+        finalized = StudentGrade.finalize_many(semester_course, graded_by=graded_by) if finalize else []
+
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'finalized': len(finalized),
+    }
+
+
+def import_gradebook_file(semester_course, file, filename=None, graded_by=None, finalize=True):
+    """Read a CSV/XLSX gradebook and import it"""
+    header, rows = read_gradebook(file, filename)
+    return import_gradebook(semester_course, header, rows, graded_by=graded_by, finalize=finalize)
@@ -0,0 +1,159 @@
+"""
+Bulk semester registration of a student group, or of every group of a
+program and academic level.
+
+Each member is registered into the required courses of the SemesterPlan of
+their study plan for the semester's level and type. Credit limits come from
+ProgramSettings and are checked in memory. Everything is read with a fixed
+number of queries and written with bulk operations in one transaction,
+whatever the size of the intake.
+"""
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from .models import (
+    CourseRegistration, SemesterCourse, SemesterPlan, SemesterRegistration,
+    StudentEnrollment, StudentGroupMembership,
+)
+from .models.academic_year import SEMESTER_TYPE
+
+
+@dataclass
+class CohortRegistration:
+    """Outcome of register_cohort"""
+    registered: list = field(default_factory=list)
+    skipped: dict = field(default_factory=dict)
+    semester_registrations: int = 0
+    course_registrations: int = 0
+
+
+def _credit_limits(program, semester):
+    settings = getattr(program, 'programsettings', None)
+    if settings is None:
+        return None, None
+    # Semester.semester_type is a CharField holding the SEMESTER_TYPE value ('3')
+    if int(semester.semester_type) == SEMESTER_TYPE.SUMMER:
+        return 0, settings.max_summer_credits
+    return settings.min_credits_per_semester, settings.max_credits_per_semester
+
+
+def register_cohort(semester, group=None, program=None, level=None, status=SemesterRegistration.RegistrationStatus.Draft):
+    """
+    تسجيل دفعة كاملة في المقررات الإجبارية للفصل.
+    Pass a StudentGroup, or a program and an AcademicLevel (all their groups of
+    this semester). Students already registered keep their courses; only the
+    missing required courses are added. Students without an active enrollment or
+    a matching semester plan, or whose credits would break the program limits,
+    are skipped with the reason.
+    """
+    if group is not None:
+        program, level = group.program, group.level
+        memberships = StudentGroupMembership.objects.filter(group=group)
+    elif program is not None and level is not None:
+        memberships = StudentGroupMembership.objects.filter(
+            group__program=program, group__level=level, group__semester=semester,
+        )
+    else:
+        raise ValueError("register_cohort needs a group, or a program and a level")
+
+    result = CohortRegistration()
+    student_ids = list(memberships.values_list('student_id', flat=True))
+    if not student_ids:
+        return result
+
+    study_plans = dict(StudentEnrollment.objects.filter(
+        student_id__in=student_ids,
+        program=program,
+        status=StudentEnrollment.EnrollmentStatus.ACTIVE,
+    ).order_by('enrollment_date', 'id').values_list('student_id', 'study_plan_id'))
+
+    semester_plans = dict(SemesterPlan.objects.filter(
+        study_plan_id__in=set(study_plans.values()),
+        academic_level=level,
+        semester_type=semester.semester_type,
+    ).values_list('study_plan_id', 'id'))
+
+    courses = {}
+    for semester_course_id, semester_plan_id, credits in SemesterCourse.objects.filter(
+        semester_plan_id__in=semester_plans.values(),
+        is_required=True,
+    ).order_by('order', 'id').values_list('id', 'semester_plan_id', 'course__credits'):
+        courses.setdefault(semester_plan_id, []).append((semester_course_id, credits))
+
+    min_credits, max_credits = _credit_limits(program, semester)
+
+    existing = {
+        student_id: (registration_id, total_credits)
+        for registration_id, student_id, total_credits in SemesterRegistration.objects.filter(
+            student_id__in=student_ids,
+            semester=semester,
+            academic_year_id=semester.academic_year_id,
+        ).values_list('id', 'student_id', 'total_credits')
+    }
+    registered_courses = set(CourseRegistration.objects.filter(
+        semester_registration_id__in=[registration_id for registration_id, _total in existing.values()],
+    ).values_list('semester_registration_id', 'semester_course_id'))
+
+    # decide everything in memory first
+    plan = []
+    for student_id in student_ids:
+        study_plan_id = study_plans.get(student_id)
+        if study_plan_id is None:
+            result.skipped[student_id] = "no active enrollment in the program"
+            continue
+        semester_plan_id = semester_plans.get(study_plan_id)
+        if semester_plan_id is None:
+            result.skipped[student_id] = "no semester plan for this level and semester"
+            continue
+
+        registration_id, total_credits = existing.get(student_id, (None, 0))
+        new_courses = [
+            (semester_course_id, credits)
+            for semester_course_id, credits in courses.get(semester_plan_id, [])
+            if (registration_id, semester_course_id) not in registered_courses
+        ]
+        total = total_credits + sum(credits for _course, credits in new_courses)
+        if max_credits is not None and total > max_credits:
+            result.skipped[student_id] = f"{total} credits above the maximum of {max_credits}"
+            continue
+        if min_credits is not None and total < min_credits:
+            result.skipped[student_id] = f"{total} credits below the minimum of {min_credits}"
+            continue
+        plan.append((student_id, registration_id, total, [course for course, _credits in new_courses]))
+
+    from universityApps.users.tasks import schedule_student_recompute
+    with transaction.atomic():
+        new_registrations = SemesterRegistration.objects.bulk_create([
+            SemesterRegistration(
+                student_id=student_id,
+                semester=semester,
+                academic_year_id=semester.academic_year_id,
+                status=status,
+                total_credits=total,
+            )
+            for student_id, registration_id, total, _courses in plan if registration_id is None
+        ], batch_size=1000)
+        created = {registration.student_id: registration.pk for registration in new_registrations}
+
+        SemesterRegistration.objects.bulk_update([
+            SemesterRegistration(pk=registration_id, total_credits=total)
+            for _student, registration_id, total, new_courses in plan
+            if registration_id is not None and new_courses
+        ], ['total_credits'], batch_size=1000)
+
+        course_registrations = CourseRegistration.objects.bulk_create([
+            CourseRegistration(
+                semester_registration_id=registration_id or created[student_id],
+                semester_course_id=semester_course_id,
+            )
+            for student_id, registration_id, _total, new_courses in plan
+            for semester_course_id in new_courses
+        ], batch_size=1000)
+
+        result.registered = [student_id for student_id, *_rest in plan]
+        result.semester_registrations = len(new_registrations)
+        result.course_registrations = len(course_registrations)
+        schedule_student_recompute(*result.registered)
+
+    return result
@@ -0,0 +1,146 @@
+"""
+Item analysis of an exam: difficulty, point-biserial discrimination,
+distractor frequencies and KR-20 reliability, computed with NumPy over the
+answer matrix of all submissions.
+
+Results are cached under a signature of the submission set (number of
+answers and submissions, score sum, last submission time and checksums of
+the selected choices and scores), so they are recomputed only after the
+answers change.
+"""
+import hashlib
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, F, Max, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import ExamAnswer, ExamQuestion, MCQChoice
+
+ITEM_ANALYSIS_KEY = 'exam_item_analysis:{exam_id}:{signature}'
+ITEM_ANALYSIS_TIMEOUT = 60 * 60 * 24
+
+
+def _signature(exam):
+    state = ExamAnswer.objects.filter(submission__exam=exam).aggregate(
+        answers=Count('id'),
+        submissions=Count('submission', distinct=True),
+        scores=Sum('score'),
+        last=Max('submission__submitted_at'),
+        # weighted by the answer id, so changing the choice or score of any one answer changes the sum
+        choices=Sum(F('id') * Coalesce('selected_choice_id', Value(0))),
+        weighted_scores=Sum(
+            F('id') * Coalesce('score', Value(0)),
+            output_field=DecimalField(max_digits=30, decimal_places=2),
+        ),
+    )
+    raw = "|".join(str(state[name]) for name in (
+        'answers', 'submissions', 'scores', 'last', 'choices', 'weighted_scores',
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _correlation(x, y):
+    if len(x) < 2 or x.std() == 0 or y.std() == 0:
+        return None
+    return float(np.corrcoef(x, y)[0, 1])
+
+
+def compute_item_analysis(exam):
+    """Compute the statistics of every question of an exam (no caching)"""
+    questions = list(ExamQuestion.objects.filter(section__exam=exam).order_by(
+        'section__order', 'order', 'id'
+    ).values_list('id', 'order', 'is_mcq', 'max_score'))
+    choices = {}
+    for choice_id, question_id, text, is_correct in MCQChoice.objects.filter(
+        question__section__exam=exam,
+    ).order_by('id').values_list('id', 'question_id', 'text', 'is_correct'):
+        choices.setdefault(question_id, []).append((choice_id, text, is_correct))
+
+    # the answer matrix, in one query
+    rows = list(ExamAnswer.objects.filter(submission__exam=exam).values_list(
+        'submission_id', 'question_id', 'selected_choice_id', 'score'
+    ))
+
+    question_ids = np.array([question[0] for question in questions], dtype=np.int64)
+    max_scores = np.array([float(question[3]) for question in questions])
+    submissions = np.unique(np.array([row[0] for row in rows], dtype=np.int64))
+    n_students, n_items = len(submissions), len(questions)
+
+    scores = np.zeros((n_students, n_items))
+    selected = np.zeros((n_students, n_items), dtype=np.int64)
+    if rows and n_items:
+        answer_submissions = np.array([row[0] for row in rows], dtype=np.int64)
+        answer_questions = np.array([row[1] for row in rows], dtype=np.int64)
+        answer_choices = np.array([row[2] or 0 for row in rows], dtype=np.int64)
+        answer_scores = np.array([float(row[3] or 0) for row in rows])
+
+        order = np.argsort(question_ids)
+        position = np.minimum(np.searchsorted(question_ids[order], answer_questions), n_items - 1)
+        known = question_ids[order][position] == answer_questions
+        row_index = np.searchsorted(submissions, answer_submissions)[known]
+        column_index = order[position][known]
+        scores[row_index, column_index] = answer_scores[known]
+        selected[row_index, column_index] = answer_choices[known]
+
+    safe_max = np.where(max_scores > 0, max_scores, 1)
+    proportion = scores / safe_max
+    correct = (scores >= max_scores) & (max_scores > 0)
+    totals = scores.sum(axis=1)
+
+    items = []
+    for column, (question_id, order, is_mcq, max_score) in enumerate(questions):
+        item = {
+            'question_id': question_id,
+            'order': order,
+            'is_mcq': is_mcq,
+            'difficulty': float(proportion[:, column].mean()) if n_students else None,
+            # corrected point-biserial: the item against the rest of the exam
+            'discrimination': _correlation(
+                correct[:, column].astype(float), totals - scores[:, column]
+            ) if n_students else None,
+            'distractors': [],
+        }
+        if is_mcq:
+            picked = selected[:, column]
+            for choice_id, text, is_correct in choices.get(question_id, []):
+                count = int((picked == choice_id).sum())
+                item['distractors'].append({
+                    'choice_id': choice_id,
+                    'text': text,
+                    'is_correct': is_correct,
+                    'count': count,
+                    'ratio': count / n_students if n_students else 0.0,
+                })
+            omitted = int((picked == 0).sum())
+            item['omitted'] = omitted
+        items.append(item)
+
+    # KR-20 over the dichotomously scored (MCQ) items
+    mcq_columns = [column for column, question in enumerate(questions) if question[2]]
+    kr20 = None
+    if len(mcq_columns) > 1 and n_students > 1:
+        dichotomous = correct[:, mcq_columns].astype(float)
+        p = dichotomous.mean(axis=0)
+        variance = dichotomous.sum(axis=1).var()
+        if variance > 0:
+            k = len(mcq_columns)
+            kr20 = float(k / (k - 1) * (1 - (p * (1 - p)).sum() / variance))
+
+    return {
+        'exam_id': exam.pk,
+        'submissions': n_students,
+        'mean_score': float(totals.mean()) if n_students else None,
+        'kr20': kr20,
+        'items': items,
+    }
+
+
+def get_item_analysis(exam, refresh=False):
+    """Cached item analysis of an exam, recomputed when its answers change"""
+    key = ITEM_ANALYSIS_KEY.format(exam_id=exam.pk, signature=_signature(exam))
+    analysis = None if refresh else cache.get(key)
+    if analysis is None:
+        analysis = compute_item_analysis(exam)
+        cache.set(key, analysis, ITEM_ANALYSIS_TIMEOUT)
+    return analysis
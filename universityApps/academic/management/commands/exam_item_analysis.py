@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from universityApps.academic.item_analysis import get_item_analysis
+from universityApps.academic.models import Exam
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.3f}"
+
+
+class Command(BaseCommand):
+    help = "Print the item analysis (difficulty, discrimination, distractors, KR-20) of an exam"
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam', type=int, help="Exam id")
+        parser.add_argument('--refresh', action='store_true', help="Ignore the cached analysis")
+
+    def handle(self, *args, **options):
+        try:
+            exam = Exam.objects.get(pk=options['exam'])
+        except Exam.DoesNotExist:
+            raise CommandError(f"Exam {options['exam']} does not exist")
+
+        analysis = get_item_analysis(exam, refresh=options['refresh'])
+        self.stdout.write(
+            f"{exam.title}: {analysis['submissions']} submissions, "
+            f"mean score {_fmt(analysis['mean_score'])}, KR-20 {_fmt(analysis['kr20'])}"
+        )
+        for item in analysis['items']:
+            self.stdout.write(
+                f"Q{item['order']} (#{item['question_id']}): "
+                f"difficulty {_fmt(item['difficulty'])}, discrimination {_fmt(item['discrimination'])}"
+            )
+            for choice in item['distractors']:
+                marker = "*" if choice['is_correct'] else " "
+                self.stdout.write(f"   {marker} {choice['text']}: {choice['count']} ({choice['ratio']:.0%})")
+            if item['is_mcq']:
+                self.stdout.write(f"     omitted: {item['omitted']}")
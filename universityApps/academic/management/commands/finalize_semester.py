@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from universityApps.academic.finalization import finalize_semester
+from universityApps.academic.models import Semester
+
+
+class Command(BaseCommand):
+    help = "Compute the final grades of every registration of a semester and close them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('semester', type=int, help="Semester id")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would change")
+
+    def handle(self, *args, **options):
+        try:
+            semester = Semester.objects.get(pk=options['semester'])
+        except Semester.DoesNotExist:
+            raise CommandError(f"Semester {options['semester']} does not exist")
+
+        report = finalize_semester(semester, dry_run=options['dry_run'])
+
+        prefix = "[dry run] " if report['dry_run'] else ""
+        self.stdout.write(
+            f"{prefix}{report['registrations']} registrations: "
+            f"{report['completed']} completed, {report['failed']} failed, "
+            f"{report['incomplete']} incomplete, {report['unmatched']} without a matching grade"
+        )
+        for letter, count in sorted(report['distribution'].items()):
+            self.stdout.write(f"  {letter}: {count}")
@@ -0,0 +1,43 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from universityApps.academic.gradebook import import_gradebook_file
+from universityApps.academic.models import SemesterCourse
+from universityApps.users.models import FacultyMember
+
+
+class Command(BaseCommand):
+    help = "Import a CSV/XLSX gradebook (students x grade components) for a semester course"
+
+    def add_arguments(self, parser):
+        parser.add_argument('semester_course', type=int, help="SemesterCourse id")
+        parser.add_argument('path', help="Path to the .csv or .xlsx gradebook")
+        parser.add_argument('--graded-by', type=int, help="FacultyMember id recorded as the grader")
+        parser.add_argument('--no-finalize', action='store_true', help="Only store the scores, do not write final grades")
+
+    def handle(self, *args, **options):
+        try:
+            semester_course = SemesterCourse.objects.get(pk=options['semester_course'])
+        except SemesterCourse.DoesNotExist:
+            raise CommandError(f"SemesterCourse {options['semester_course']} does not exist")
+
+        graded_by = None
+        if options['graded_by']:
+            graded_by = FacultyMember.objects.filter(pk=options['graded_by']).first()
+            if graded_by is None:
+                raise CommandError(f"FacultyMember {options['graded_by']} does not exist")
+
+        try:
+            result = import_gradebook_file(
+                semester_course,
+                options['path'],
+                graded_by=graded_by,
+                finalize=not options['no_finalize'],
+            )
+        except ValidationError as error:
+            raise CommandError("\n".join(str(message) for message in error.messages))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['created']} scores created, {result['updated']} updated, "
+            f"{result['finalized']} final grades written"
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from universityApps.academic.models import AcademicYear, StudentSemesterSummary
+
+
+class Command(BaseCommand):
+    help = "Regenerate the StudentSemesterSummary table for an academic year, or for every year"
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument('--academic-year', type=int, help="AcademicYear id")
+        group.add_argument('--all', action='store_true', help="Rebuild the summaries of every student")
+
+    def handle(self, *args, **options):
+        academic_year = None
+        if options['academic_year'] is not None:
+            try:
+                academic_year = AcademicYear.objects.get(pk=options['academic_year'])
+            except AcademicYear.DoesNotExist:
+                raise CommandError(f"AcademicYear {options['academic_year']} does not exist")
+
+        summaries = StudentSemesterSummary.rebuild(academic_year=academic_year)
+        self.stdout.write(self.style.SUCCESS(f"{len(summaries)} semester summaries rebuilt"))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from universityApps.academic.group_registration import register_cohort
+from universityApps.academic.models import Semester, SemesterRegistration, StudentGroup
+from universityApps.programs.models import AcademicLevel, AcademicProgram
+
+
+class Command(BaseCommand):
+    help = "Register a student group, or every group of a program and level, into the required courses of a semester"
+
+    def add_arguments(self, parser):
+        parser.add_argument('semester', type=int, help="Semester id")
+        parser.add_argument('--group', type=int, help="StudentGroup id")
+        parser.add_argument('--program', type=int, help="AcademicProgram id (with --level)")
+        parser.add_argument('--level', type=int, help="AcademicLevel id (with --program)")
+        parser.add_argument(
+            '--status',
+            choices=SemesterRegistration.RegistrationStatus.values,
+            default=SemesterRegistration.RegistrationStatus.Draft,
+            help="Status of the new semester registrations",
+        )
+
+    def _get(self, model, pk):
+        try:
+            return model.objects.get(pk=pk)
+        except model.DoesNotExist:
+            raise CommandError(f"{model.__name__} {pk} does not exist")
+
+    def handle(self, *args, **options):
+        semester = self._get(Semester, options['semester'])
+        if options['group']:
+            scope = {'group': self._get(StudentGroup, options['group'])}
+        elif options['program'] and options['level']:
+            scope = {
+                'program': self._get(AcademicProgram, options['program']),
+                'level': self._get(AcademicLevel, options['level']),
+            }
+        else:
+            raise CommandError("Pass --group, or both --program and --level")
+
+        result = register_cohort(semester, status=options['status'], **scope)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(result.registered)} students registered: {result.semester_registrations} semester "
+            f"registrations and {result.course_registrations} course registrations created"
+        ))
+        for student_id, reason in result.skipped.items():
+            self.stdout.write(self.style.WARNING(f"  student {student_id} skipped: {reason}"))
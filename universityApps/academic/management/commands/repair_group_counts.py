@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from universityApps.academic.models import StudentGroup
+
+
+class Command(BaseCommand):
+    help = "Recount the member_count and reserved_seats of every StudentGroup"
+
+    def handle(self, *args, **options):
+        members = StudentGroup.sync_member_counts()
+        seats = StudentGroup.sync_reserved_seats()
+        self.stdout.write(self.style.SUCCESS(
+            f"member_count fixed for {members} groups, reserved_seats fixed for {seats} groups"
+        ))
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0009_alter_lecturebroadcast_status'),
+        ('users', '0002_alter_student_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseScoreTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weighted_total', models.DecimalField(decimal_places=2, default=0, max_digits=6, verbose_name='Weighted Total')),
+                ('scored_weight', models.DecimalField(decimal_places=2, default=0, max_digits=6, verbose_name='Scored Weight')),
+                ('required_scored', models.PositiveSmallIntegerField(default=0, verbose_name='Scored Required Components')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('semester_course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_totals', to='academic.semestercourse', verbose_name='Semester Course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_score_totals', to='users.student', verbose_name='Student')),
+            ],
+            options={
+                'verbose_name': 'Course Score Total',
+                'verbose_name_plural': 'Course Score Totals',
+                'unique_together': {('student', 'semester_course')},
+            },
+        ),
+    ]
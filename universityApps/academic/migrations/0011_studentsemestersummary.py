@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0010_coursescoretotal'),
+        ('users', '0002_alter_student_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSemesterSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('credits_attempted', models.PositiveSmallIntegerField(default=0, verbose_name='Credits Attempted')),
+                ('credits_earned', models.PositiveSmallIntegerField(default=0, verbose_name='Credits Earned')),
+                ('gpa_credits', models.PositiveSmallIntegerField(default=0, verbose_name='GPA Credits')),
+                ('quality_points', models.DecimalField(decimal_places=2, default=0, max_digits=8, verbose_name='Quality Points')),
+                ('semester_gpa', models.DecimalField(decimal_places=2, default=0, max_digits=4, verbose_name='Semester GPA')),
+                ('cumulative_credits_earned', models.PositiveIntegerField(default=0, verbose_name='Cumulative Credits Earned')),
+                ('cumulative_gpa', models.DecimalField(decimal_places=2, default=0, max_digits=4, verbose_name='Cumulative GPA')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_summaries', to='academic.semester', verbose_name='Semester')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='semester_summaries', to='users.student', verbose_name='Student')),
+            ],
+            options={
+                'verbose_name': 'Student Semester Summary',
+                'verbose_name_plural': 'Student Semester Summaries',
+                'ordering': ['student', 'semester__start_date'],
+                'indexes': [models.Index(fields=['semester'], name='semester_summary_semester_idx')],
+                'unique_together': {('student', 'semester')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0011_studentsemestersummary'),
+        ('courses', '0002_initial'),
+        ('users', '0002_alter_student_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeDistribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Count')),
+                ('passed', models.PositiveIntegerField(default=0, verbose_name='Passed')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Total')),
+                ('total_squares', models.DecimalField(decimal_places=4, default=0, max_digits=16, verbose_name='Total of Squares')),
+                ('letters', models.JSONField(default=dict, verbose_name='Letter Counts')),
+                ('histogram', models.JSONField(default=dict, verbose_name='Histogram')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('academic_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_distributions', to='academic.academicyear', verbose_name='Academic Year')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_distributions', to='courses.course', verbose_name='Course')),
+                ('instructor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='grade_distributions', to='users.facultymember', verbose_name='Instructor')),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_distributions', to='academic.semester', verbose_name='Semester')),
+                ('semester_course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_distributions', to='academic.semestercourse', verbose_name='Semester Course')),
+            ],
+            options={
+                'verbose_name': 'Grade Distribution',
+                'verbose_name_plural': 'Grade Distributions',
+                'indexes': [models.Index(fields=['semester_course', 'semester'], name='grade_dist_offering_idx'), models.Index(fields=['course', 'academic_year'], name='grade_dist_course_idx'), models.Index(fields=['instructor', 'academic_year'], name='grade_dist_instructor_idx'), models.Index(fields=['academic_year'], name='grade_dist_year_idx')],
+                'unique_together': {('semester', 'semester_course', 'instructor')},
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_reserved_seats(apps, schema_editor):
+    # every member already holds a seat; there are no holds yet
+    StudentGroup = apps.get_model('academic', 'StudentGroup')
+    StudentGroupMembership = apps.get_model('academic', 'StudentGroupMembership')
+
+    members = StudentGroupMembership.objects.filter(
+        group=OuterRef('pk'),
+    ).order_by().values('group').annotate(total=Count('id')).values('total')
+    StudentGroup.objects.update(
+        reserved_seats=Coalesce(Subquery(members, output_field=IntegerField()), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0012_gradedistribution'),
+        ('users', '0002_alter_student_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentgroup',
+            name='reserved_seats',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Reserved Seats'),
+        ),
+        migrations.CreateModel(
+            name='SeatReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('held', 'Held'), ('confirmed', 'Confirmed'), ('released', 'Released'), ('expired', 'Expired')], default='queued', max_length=10, verbose_name='Status')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Expires At')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_reservations', to='academic.studentgroup', verbose_name='Group')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_reservations', to='users.student', verbose_name='Student')),
+            ],
+            options={
+                'verbose_name': 'Seat Reservation',
+                'verbose_name_plural': 'Seat Reservations',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['group', 'status', 'created_at'], name='seat_reservation_queue_idx'), models.Index(fields=['status', 'expires_at'], name='seat_reservation_expiry_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'held'])), fields=('group', 'student'), name='seat_reservation_open_unique')],
+            },
+        ),
+        migrations.RunPython(count_reserved_seats, migrations.RunPython.noop),
+    ]
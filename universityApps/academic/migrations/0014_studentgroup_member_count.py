@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:19
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_members(apps, schema_editor):
+    StudentGroup = apps.get_model('academic', 'StudentGroup')
+    StudentGroupMembership = apps.get_model('academic', 'StudentGroupMembership')
+    SeatReservation = apps.get_model('academic', 'SeatReservation')
+
+    members = StudentGroupMembership.objects.filter(
+        group=OuterRef('pk'),
+    ).order_by().values('group').annotate(total=Count('id')).values('total')
+    holds = SeatReservation.objects.filter(
+        group=OuterRef('pk'), status='held',
+    ).order_by().values('group').annotate(total=Count('id')).values('total')
+    member_count = Coalesce(Subquery(members, output_field=IntegerField()), Value(0))
+    StudentGroup.objects.update(
+        member_count=member_count,
+        reserved_seats=member_count + Coalesce(Subquery(holds, output_field=IntegerField()), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0013_seatreservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentgroup',
+            name='member_count',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Member Count'),
+        ),
+        migrations.RunPython(count_members, migrations.RunPython.noop),
+    ]
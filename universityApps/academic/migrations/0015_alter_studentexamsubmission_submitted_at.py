@@ -0,0 +1,43 @@
+import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def clear_unfinished_submissions(apps, schema_editor):
+    # submitted_at used to be stamped when the sitting started, so it does not tell
+    # a finished submission from one in progress. Only the submissions of exams that
+    # have ended keep it; the others are reopened, otherwise their students are locked out.
+    Exam = apps.get_model('academic', 'Exam')
+    StudentExamSubmission = apps.get_model('academic', 'StudentExamSubmission')
+
+    now = timezone.now()
+    open_exams = [
+        pk for pk, scheduled_date, duration_minutes in Exam.objects.filter(
+            scheduled_date__lte=now,
+        ).values_list('pk', 'scheduled_date', 'duration_minutes').iterator()
+        if scheduled_date + datetime.timedelta(minutes=duration_minutes) > now
+    ]
+    open_exams += Exam.objects.filter(scheduled_date__gt=now).values_list('pk', flat=True)
+    StudentExamSubmission.objects.filter(exam_id__in=open_exams).update(submitted_at=None)
+
+
+def stamp_unfinished_submissions(apps, schema_editor):
+    StudentExamSubmission = apps.get_model('academic', 'StudentExamSubmission')
+    StudentExamSubmission.objects.filter(submitted_at__isnull=True).update(submitted_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0014_studentgroup_member_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentexamsubmission',
+            name='submitted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(clear_unfinished_submissions, stamp_unfinished_submissions),
+    ]
@@ -13,11 +13,15 @@ from .enrollments import (
 
 from .grading import (
     GradeScale , Grade, StudentGrade,
-      ComponoentScore, GradeComponent,
+      ComponoentScore, GradeComponent, CourseScoreTotal,
       Exam,ExamAnswer,ExamQuestion,ExamSection,
       MCQChoice,StudentExamSubmission,
       )
 
+from .summaries import StudentSemesterSummary
+from .distributions import GradeDistribution
+from .reservations import SeatReservation
+
 from .broadcast import (
     LectureBroadcast,Classroom,LiveAttendanceLog,
     )
@@ -26,8 +30,9 @@ __all__ = [
     'AcademicYear', 'Semester',
     'StudyPlan', 'SemesterPlan', 'SemesterCourse',
     'StudentEnrollment','CourseRegistration','SemesterRegistration',
-    'StudentGroup','StudentGroupMembership', 'GroupSchedule',
-    'GradeScale', 'Grade', 'StudentGrade', 'ComponoentScore', 'GradeComponent',
+    'StudentGroup','StudentGroupMembership', 'GroupSchedule', 'SeatReservation',
+    'GradeScale', 'Grade', 'StudentGrade', 'ComponoentScore', 'GradeComponent', 'CourseScoreTotal',
     'Exam','ExamAnswer','ExamQuestion','ExamSection','MCQChoice','StudentExamSubmission',
+    'StudentSemesterSummary', 'GradeDistribution',
     'LectureBroadcast' ,'Classroom','LiveAttendanceLog'
     ]
\ No newline at end of file
@@ -0,0 +1,219 @@
+"""Precomputed grade distributions"""
+import math
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.translation import gettext_lazy as _
+
+
+def _merge(rows):
+    """Combine the rows of a slice into one distribution"""
+    count = passed = 0
+    total = total_squares = Decimal('0')
+    letters, histogram = Counter(), Counter()
+    for row in rows:
+        count += row.count
+        passed += row.passed
+        total += row.total
+        total_squares += row.total_squares
+        letters.update(row.letters)
+        histogram.update({Decimal(value): number for value, number in row.histogram.items()})
+
+    result = {
+        'count': count,
+        'letters': dict(letters),
+        'mean': None,
+        'median': None,
+        'std_dev': None,
+        'pass_rate': None,
+    }
+    if not count:
+        return result
+
+    mean = total / count
+    variance = max(total_squares / count - mean * mean, Decimal('0'))
+    result.update({
+        'mean': round(mean, 2),
+        'median': _median(histogram, count),
+        'std_dev': round(Decimal(math.sqrt(variance)), 2),
+        'pass_rate': round(Decimal(passed) / count, 4),
+    })
+    return result
+
+
+def _median(histogram, count):
+    # middle value(s) from the cumulative counts of the sorted scores
+    middle = [(count - 1) // 2, count // 2]
+    found, seen = [], 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        while middle and middle[0] < seen:
+            found.append(value)
+            middle.pop(0)
+        if not middle:
+            break
+    return round(sum(found) / 2, 2)
+
+
+class GradeDistribution(models.Model):
+    """
+    توزيع الدرجات لمقرر في فصل دراسي، لكل مدرس.
+    One row per (semester, semester course, instructor) holding the letter counts,
+    a histogram of the numeric values and their running sums; any coarser slice
+    (course across semesters, instructor, academic year) is read with one indexed
+    query and merged in Python.
+    """
+    semester = models.ForeignKey('academic.Semester', on_delete=models.CASCADE, related_name='grade_distributions', verbose_name=_("Semester"))
+    academic_year = models.ForeignKey('academic.AcademicYear', on_delete=models.CASCADE, related_name='grade_distributions', verbose_name=_("Academic Year"))
+    semester_course = models.ForeignKey('academic.SemesterCourse', on_delete=models.CASCADE, related_name='grade_distributions', verbose_name=_("Semester Course"))
+    course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, related_name='grade_distributions', verbose_name=_("Course"))
+    instructor = models.ForeignKey('users.FacultyMember', on_delete=models.CASCADE, null=True, blank=True, related_name='grade_distributions', verbose_name=_("Instructor"))
+    count = models.PositiveIntegerField(default=0, verbose_name=_("Count"))
+    passed = models.PositiveIntegerField(default=0, verbose_name=_("Passed"))
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name=_("Total"))
+    total_squares = models.DecimalField(max_digits=16, decimal_places=4, default=0, verbose_name=_("Total of Squares"))
+    letters = models.JSONField(default=dict, verbose_name=_("Letter Counts"))
+    histogram = models.JSONField(default=dict, verbose_name=_("Histogram"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        verbose_name = _("Grade Distribution")
+        verbose_name_plural = _("Grade Distributions")
+        unique_together = ['semester', 'semester_course', 'instructor']
+        indexes = [
+            models.Index(fields=['semester_course', 'semester'], name='grade_dist_offering_idx'),
+            models.Index(fields=['course', 'academic_year'], name='grade_dist_course_idx'),
+            models.Index(fields=['instructor', 'academic_year'], name='grade_dist_instructor_idx'),
+            models.Index(fields=['academic_year'], name='grade_dist_year_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.semester_course_id} - {self.semester_id} ({self.instructor_id}): {self.count}"
+
+    @classmethod
+    def _slice(cls, semester_course=None, semester=None, course=None, instructor=None, academic_year=None):
+        filters = {
+            'semester_course': semester_course,
+            'semester': semester,
+            'course': course,
+            'instructor': instructor,
+            'academic_year': academic_year,
+        }
+        return cls.objects.filter(**{name: value for name, value in filters.items() if value is not None})
+
+    @classmethod
+    def distribution(cls, **slice):
+        """
+        the distribution of a slice: any combination of semester_course, semester,
+        course, instructor and academic_year.
+        Returns count, letters, mean, median, std_dev and pass_rate.
+        """
+        return _merge(cls._slice(**slice).only(
+            'count', 'passed', 'total', 'total_squares', 'letters', 'histogram',
+        ))
+
+    @classmethod
+    def compare_years(cls, **slice):
+        """ the distribution of a slice for each academic year, oldest first """
+        by_year = defaultdict(list)
+        names = {}
+        for row in cls._slice(**slice).select_related('academic_year').only(
+            'count', 'passed', 'total', 'total_squares', 'letters', 'histogram',
+            'academic_year__name', 'academic_year__start_date',
+        ):
+            by_year[row.academic_year_id].append(row)
+            names[row.academic_year_id] = row.academic_year
+
+        return [
+            {'academic_year': names[year_id], **_merge(rows)}
+            for year_id, rows in sorted(by_year.items(), key=lambda item: names[item[0]].start_date)
+        ]
+
+    @classmethod
+    def _with_instructor(cls, grades):
+        """
+        annotate each grade with the instructor who taught the student's section:
+        the instructor of the GroupSchedule of the course for the student's group
+        in that semester, else the grader (bulk finalization leaves it empty).
+        """
+        from .enrollments import GroupSchedule
+
+        schedules = GroupSchedule.objects.filter(
+            semester_course=OuterRef('semester_course'),
+            group__semester=OuterRef('semester'),
+            group__members__student=OuterRef('student'),
+            instructor__isnull=False,
+        ).order_by('id').values('instructor')[:1]
+        return grades.annotate(section_instructor=Coalesce(
+            Subquery(schedules), 'graded_by', output_field=models.BigIntegerField(),
+        ))
+
+    @classmethod
+    def _build(cls, grades):
+        """ one unsaved row per (semester, semester course, instructor) of a StudentGrade queryset """
+        slices = {}
+        for semester_id, academic_year_id, semester_course_id, course_id, instructor_id, letter, is_passing, value in (
+            cls._with_instructor(grades).values_list(
+                'semester_id', 'semester__academic_year_id', 'semester_course_id',
+                'semester_course__course_id', 'section_instructor', 'grade__Letter',
+                'grade__is_passing', 'numeric_value',
+            ).order_by()
+        ):
+            key = (semester_id, semester_course_id, instructor_id)
+            row = slices.get(key)
+            if row is None:
+                row = slices[key] = cls(
+                    semester_id=semester_id,
+                    academic_year_id=academic_year_id,
+                    semester_course_id=semester_course_id,
+                    course_id=course_id,
+                    instructor_id=instructor_id,
+                    total=Decimal('0'),
+                    total_squares=Decimal('0'),
+                    letters={},
+                    histogram={},
+                )
+            row.count += 1
+            row.passed += int(is_passing)
+            row.total += value
+            row.total_squares += value * value
+            row.letters[letter] = row.letters.get(letter, 0) + 1
+            row.histogram[str(value)] = row.histogram.get(str(value), 0) + 1
+        return list(slices.values())
+
+    @classmethod
+    def _replace(cls, stale, rows):
+        with transaction.atomic():
+            stale.delete()
+            cls.objects.bulk_create(rows, batch_size=1000)
+        return rows
+
+    @classmethod
+    def refresh(cls, offerings):
+        """
+        rebuild the rows of the given (semester_id, semester_course_id) pairs
+        from their StudentGrade records, with one query.
+        """
+        from .grading import StudentGrade
+
+        offerings = set(offerings)
+        if not offerings:
+            return []
+        condition = Q()
+        for semester_id, semester_course_id in offerings:
+            condition |= Q(semester_id=semester_id, semester_course_id=semester_course_id)
+        return cls._replace(cls.objects.filter(condition), cls._build(StudentGrade.objects.filter(condition)))
+
+    @classmethod
+    def rebuild(cls, academic_year=None):
+        """ regenerate every row, or the rows of one academic year """
+        from .grading import StudentGrade
+
+        grades, stale = StudentGrade.objects.all(), cls.objects.all()
+        if academic_year is not None:
+            grades = grades.filter(semester__academic_year=academic_year)
+            stale = stale.filter(academic_year=academic_year)
+        return cls._replace(stale, cls._build(grades))
@@ -1,8 +1,14 @@
-from django.db import models
+import logging
+from collections import Counter
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+logger = logging.getLogger(__name__)
+
 
 class StudentEnrollment(models.Model):
     class EnrollmentStatus(models.TextChoices):
@@ -171,19 +177,33 @@ class SemesterRegistration(models.Model):
     def calculate_total_credits(self):
         """ Calculate the total credits for the registration """
         total=self.course_registrations.filter(
-            status__in=[
-                CourseRegistration.RegistrationStatus.Registered,
-                CourseRegistration.RegistrationStatus.completed
-            ]
+            status__in=CourseRegistration.CREDIT_STATUSES
         ).aggregate(total=models.Sum('semester_course__course__credits'))['total'] or 0
         self.total_credits = total
         self.save(update_fields=['total_credits'])
         return total
+
+    @classmethod
+    def sync_total_credits(cls, queryset=None):
+        """
+        تصحيح total_credits للتسجيلات التي انحرفت عن مجموع ساعات مقرراتها.
+        One UPDATE over the drifted rows; returns how many were fixed.
+        """
+        totals = CourseRegistration.objects.filter(
+            semester_registration=OuterRef('pk'),
+            status__in=CourseRegistration.CREDIT_STATUSES,
+        ).order_by().values('semester_registration').annotate(
+            total=Sum('semester_course__course__credits')
+        ).values('total')
+        actual = Coalesce(Subquery(totals, output_field=models.PositiveIntegerField()), Value(0))
+
+        queryset = cls.objects.all() if queryset is None else queryset
+        drifted = queryset.annotate(actual_credits=actual).exclude(total_credits=F('actual_credits'))
+        return cls.objects.filter(pk__in=drifted.values('pk')).update(total_credits=actual)
     
     def validate_registration(self):
         """ Validate the registration """
-        
-        self.calculate_total_credits()
+        # total_credits is kept up to date by CourseRegistration.save / delete
         program_settings=self.student.program.programsettings
 
         min_credits=program_settings.min_credits_per_semester
@@ -205,6 +225,46 @@ class SemesterRegistration(models.Model):
     
 
 
+class CourseRegistrationQuerySet(models.QuerySet):
+    """ keeps SemesterRegistration.total_credits in step on the paths that skip save() and delete() """
+
+    def _semester_registrations(self, registration_ids):
+        return SemesterRegistration.objects.filter(course_registrations__in=registration_ids).distinct()
+
+    def _recount(self, semester_registration_ids):
+        SemesterRegistration.sync_total_credits(SemesterRegistration.objects.filter(pk__in=semester_registration_ids))
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic():
+            objs = super().bulk_create(objs, *args, **kwargs)
+            self._recount({obj.semester_registration_id for obj in objs})
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if 'status' not in fields and 'semester_course' not in fields:
+            return super().bulk_update(objs, fields, *args, **kwargs)
+        with transaction.atomic():
+            updated = super().bulk_update(objs, fields, *args, **kwargs)
+            self._recount(self._semester_registrations([obj.pk for obj in objs]).values('pk'))
+        return updated
+
+    def update(self, **kwargs):
+        if not {'status', 'semester_course', 'semester_course_id'} & set(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic():
+            semester_registration_ids = set(self.values_list('semester_registration_id', flat=True))
+            updated = super().update(**kwargs)
+            self._recount(semester_registration_ids)
+        return updated
+
+    def delete(self):
+        with transaction.atomic():
+            semester_registration_ids = set(self.values_list('semester_registration_id', flat=True))
+            result = super().delete()
+            self._recount(semester_registration_ids)
+        return result
+
+
 class CourseRegistration(models.Model):
     class RegistrationStatus(models.TextChoices):
         Registered = 'registered', _('Registered')
@@ -213,6 +273,9 @@ class CourseRegistration(models.Model):
         completed = 'completed', _('Completed')
         failed = 'failed', _('Failed')
         incomplete = 'incomplete', _('Incomplete')
+
+    # statuses whose credits count in SemesterRegistration.total_credits
+    CREDIT_STATUSES = (RegistrationStatus.Registered, RegistrationStatus.completed)
     
     semester_registration = models.ForeignKey(
         'academic.SemesterRegistration', 
@@ -240,6 +303,8 @@ class CourseRegistration(models.Model):
 
     notes = models.TextField(null=True, blank=True, verbose_name=_("Notes"))
 
+    objects = CourseRegistrationQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Course Registration")
         verbose_name_plural = _("Course Registrations")
@@ -252,6 +317,67 @@ class CourseRegistration(models.Model):
         ]
     def __str__(self):
         return f"{self.semester_registration.student.user.get_full_name()} - {self.semester_course.course.name}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # None when the status was deferred: save() and delete() then recount
+        instance._stored_counts_credits = (
+            instance.__dict__['status'] in cls.CREDIT_STATUSES if 'status' in instance.__dict__ else None
+        )
+        return instance
+
+    def _counts_credits(self):
+        return self.status in self.CREDIT_STATUSES
+
+    def _shift_total_credits(self, direction):
+        """ add (1) or remove (-1) the credits of this course with one UPDATE """
+        from .study_plan import SemesterCourse
+
+        credits = Subquery(
+            SemesterCourse.objects.filter(pk=self.semester_course_id).values('course__credits')[:1]
+        )
+        registrations = SemesterRegistration.objects.filter(pk=self.semester_registration_id)
+        if direction < 0:
+            # a total smaller than the credits removed has drifted: recount it instead
+            registrations = registrations.filter(total_credits__gte=credits)
+        if not registrations.update(total_credits=F('total_credits') + direction * credits):
+            logger.warning(
+                "total_credits of semester registration %s drifted, recounting", self.semester_registration_id
+            )
+            SemesterRegistration.sync_total_credits(
+                SemesterRegistration.objects.filter(pk=self.semester_registration_id)
+            )
+        if CourseRegistration.semester_registration.is_cached(self):
+            self.semester_registration.refresh_from_db(fields=['total_credits'])
+
+    def save(self, *args, **kwargs):
+        was_counted = False if self._state.adding else getattr(self, '_stored_counts_credits', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            counted = self._counts_credits()
+            if was_counted is None:
+                # loaded without its status: fall back to a recount
+                SemesterRegistration.sync_total_credits(
+                    SemesterRegistration.objects.filter(pk=self.semester_registration_id)
+                )
+            elif counted != was_counted:
+                self._shift_total_credits(1 if counted else -1)
+        self._stored_counts_credits = counted
+
+    def delete(self, *args, **kwargs):
+        was_counted = getattr(self, '_stored_counts_credits', None)
+        semester_registration_id = self.semester_registration_id
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if was_counted:
+                # after the delete, so a drifted total is recounted without this course
+                self._shift_total_credits(-1)
+            elif was_counted is None:
+                SemesterRegistration.sync_total_credits(
+                    SemesterRegistration.objects.filter(pk=semester_registration_id)
+                )
+        return result
     
     def drop(self, reason=None):
         """drop the course (during add/drop period)"""
@@ -260,7 +386,6 @@ class CourseRegistration(models.Model):
             if reason:
                 self.notes = f"{self.notes}\n[{timezone.now().date()}] Dropped: {reason}"
             self.save()
-            self.semester_registration.calculate_total_credits()
             return True
         return False
     
@@ -274,54 +399,48 @@ class CourseRegistration(models.Model):
             return True
         return False
     
-    def complete(self, grade_value=None):
+    def _record_grade(self, grade_value, graded_by=None):
+        """create or update the student grade of this registration"""
+        from universityApps.academic.models import StudentGrade, Grade
+
+        #Find the suitable grade
+        grade=Grade.get_grade_for_value(grade_value)
+        if grade is None:
+            raise ValidationError(_("No grade matches the value %(value)s") % {'value': grade_value})
+
+        student_grade, _created = StudentGrade.objects.update_or_create(
+            student=self.semester_registration.student,
+            semester_course=self.semester_course,
+            semester=self.semester_registration.semester,
+            defaults={
+                'grade': grade,
+                'numeric_value': grade_value,
+                'graded_by': graded_by,
+            },
+        )
+        return student_grade
+
+    def complete(self, grade_value=None, graded_by=None):
         """successfully complete the course """
         if self.status == CourseRegistration.RegistrationStatus.Registered:
             self.status = CourseRegistration.RegistrationStatus.completed
             
             # if grade is assigned ,create grade record for the student
             if grade_value is not None:
-                from universityApps.academic.models import StudentGrade, Grade 
-
-                #Find the suitable grade
-                grade=Grade.objects.get_grade_for_value(grade_value)
-
-
-                #create student grade record
-                student_grade = StudentGrade.objects.create(
-                    student=self.semester_registration.student,
-                    course=self.semester_course.course,
-                    grade=grade,
-                    numeric_value=grade_value,
-                    semester=self.semester_registration.semester,
-                )
-                self.grade = student_grade
+                self.grade = self._record_grade(grade_value, graded_by)
 
             self.save()
             return True
         return False
     
-    def fail(self, grade_value=None):
+    def fail(self, grade_value=None, graded_by=None):
         """student fails the course"""
         if self.status == CourseRegistration.RegistrationStatus.Registered:
             self.status = CourseRegistration.RegistrationStatus.failed
 
             # if grade is assigned ,create grade record for the student
             if grade_value is not None:
-                from universityApps.academic.models import StudentGrade, Grade 
-
-                #Find the suitable grade
-                grade=Grade.objects.get_grade_for_value(grade_value)
-
-                #create student grade record
-                student_grade = StudentGrade.objects.create(
-                    student=self.semester_registration.student,
-                    course=self.semester_course.course,
-                    grade=grade,
-                    numeric_value=grade_value,
-                    semester=self.semester_registration.semester,
-                )
-                self.grade = student_grade
+                self.grade = self._record_grade(grade_value, graded_by)
 
             self.save()
             return True
@@ -338,12 +457,29 @@ class CourseRegistration(models.Model):
         return False
     
 
+class StudentGroupQuerySet(models.QuerySet):
+    def with_capacity(self):
+        """ annotate the free places and whether each group is full, from the maintained counters """
+        return self.annotate(
+            available_places=Greatest(F('max_students') - F('member_count'), Value(0)),
+            available_seats=Greatest(F('max_students') - F('reserved_seats'), Value(0)),
+            at_capacity=models.ExpressionWrapper(
+                models.Q(member_count__gte=F('max_students')), output_field=models.BooleanField()
+            ),
+        )
+
+
 class StudentGroup(models.Model):
     name = models.CharField(max_length=50, verbose_name=_("Name"))
     semester = models.ForeignKey('academic.Semester', on_delete=models.CASCADE, verbose_name=_("Semester"))
     program = models.ForeignKey('programs.AcademicProgram', on_delete=models.CASCADE, verbose_name=_("Program"))
     level = models.ForeignKey('programs.AcademicLevel', on_delete=models.CASCADE, verbose_name=_("Level"))
     max_students = models.PositiveSmallIntegerField(verbose_name=_("Max Students"), default=25)
+    member_count = models.PositiveSmallIntegerField(verbose_name=_("Member Count"), default=0, editable=False)
+    # members plus unexpired seat holds, see academic.seats
+    reserved_seats = models.PositiveSmallIntegerField(verbose_name=_("Reserved Seats"), default=0, editable=False)
+
+    objects = StudentGroupQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("Student Group")
@@ -354,16 +490,98 @@ class StudentGroup(models.Model):
         return f"{self.level.name} {self.program.department.name} {self.name}"
     
     def current_size(self):
-        return self.members.count()
+        return self.member_count
     
     def is_full(self):
         return self.current_size() >= self.max_students
+
+    @classmethod
+    def add_members(cls, changes, seats=True):
+        """
+        apply {group_id: delta} to member_count, and to reserved_seats unless the seats
+        were already taken by a hold; one UPDATE per group, under the row lock.
+        """
+        for group_id, delta in changes.items():
+            if not delta:
+                continue
+            values = {'member_count': Greatest(F('member_count') + delta, Value(0))}
+            if seats:
+                values['reserved_seats'] = Greatest(F('reserved_seats') + delta, Value(0))
+            cls.objects.filter(pk=group_id).update(**values)
+
+    @classmethod
+    def sync_member_counts(cls, queryset=None):
+        """ recount member_count of the drifted groups with one UPDATE """
+        members = StudentGroupMembership.objects.filter(
+            group=OuterRef('pk'),
+        ).order_by().values('group').annotate(total=models.Count('id')).values('total')
+        actual = Coalesce(Subquery(members, output_field=models.IntegerField()), Value(0))
+
+        queryset = cls.objects.all() if queryset is None else queryset
+        drifted = queryset.annotate(actual_members=actual).exclude(member_count=F('actual_members'))
+        return cls.objects.filter(pk__in=drifted.values('pk')).update(member_count=actual)
+
+    @classmethod
+    def sync_reserved_seats(cls, queryset=None):
+        """ recount reserved_seats (members and active holds) of the drifted groups with one UPDATE """
+        from .reservations import SeatReservation
+
+        members = StudentGroupMembership.objects.filter(
+            group=OuterRef('pk'),
+        ).order_by().values('group').annotate(total=models.Count('id')).values('total')
+        holds = SeatReservation.objects.filter(
+            group=OuterRef('pk'), status=SeatReservation.Status.Held,
+        ).order_by().values('group').annotate(total=models.Count('id')).values('total')
+        actual = (
+            Coalesce(Subquery(members, output_field=models.IntegerField()), Value(0))
+            + Coalesce(Subquery(holds, output_field=models.IntegerField()), Value(0))
+        )
+
+        queryset = cls.objects.all() if queryset is None else queryset
+        drifted = queryset.annotate(actual_seats=actual).exclude(reserved_seats=F('actual_seats'))
+        return cls.objects.filter(pk__in=drifted.values('pk')).update(reserved_seats=actual)
     
 
+class StudentGroupMembershipQuerySet(models.QuerySet):
+    """ keeps the group counters in step on the paths that send no signals """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+            # the inserted rows are unknown: recount the groups concerned
+            objs = super().bulk_create(objs, *args, **kwargs)
+            groups = StudentGroup.objects.filter(pk__in={obj.group_id for obj in objs})
+            StudentGroup.sync_member_counts(groups)
+            StudentGroup.sync_reserved_seats(groups)
+            return objs
+        with transaction.atomic():
+            objs = super().bulk_create(objs, *args, **kwargs)
+            StudentGroup.add_members(Counter(obj.group_id for obj in objs))
+        return objs
+
+    def update(self, **kwargs):
+        if 'group' not in kwargs and 'group_id' not in kwargs:
+            return super().update(**kwargs)
+        with transaction.atomic():
+            moved = Counter(self.values_list('group_id', flat=True))
+            updated = super().update(**kwargs)
+            target = kwargs.get('group_id', getattr(kwargs.get('group'), 'pk', kwargs.get('group')))
+            StudentGroup.add_members({group_id: -count for group_id, count in moved.items()})
+            StudentGroup.add_members({target: sum(moved.values())})
+        return updated
+
+
 class StudentGroupMembership(models.Model):
     group = models.ForeignKey('academic.StudentGroup', on_delete=models.CASCADE, verbose_name=_("Group") , related_name='members')
     student = models.OneToOneField('users.Student', on_delete=models.CASCADE, verbose_name=_("Student") , related_name='group')
 
+    objects = StudentGroupMembershipQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the group the row was loaded with, to move the seat when it changes
+        instance._stored_group_id = instance.__dict__.get('group_id')
+        return instance
 
 
 class GroupSchedule(models.Model):
@@ -1,5 +1,9 @@
 """Evaluations Models and Student Grading"""
-from django.db import models
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 
@@ -85,19 +89,14 @@ class Grade(models.Model):
     @classmethod
     def get_grade_for_value(cls, numeric_value, scale=None):
         """Get the grade for a given numeric value """
-        if scale is None:
-            scale = GradeScale.get_default()
-            if scale is None:
-                return None
-        
-        try:
-            return cls.objects.get(
-                scale=scale,
-                min_percent__lte=numeric_value,
-                max_percent__gte=numeric_value,
-            )
-        except cls.DoesNotExist:
-            return None
+        from universityApps.academic.grade_bands import grade_for_value
+        return grade_for_value(numeric_value, scale)
+
+    @classmethod
+    def grades_for_values(cls, numeric_values, scale=None):
+        """Get the grades for a list of numeric values, in the same order """
+        from universityApps.academic.grade_bands import grades_for_values
+        return grades_for_values(numeric_values, scale)
 
 class GradeComponent(models.Model):
     """Grade Component Model"""
@@ -138,7 +137,7 @@ class GradeComponent(models.Model):
         # make sure the weight is between 0 and 100
         total_weight = GradeComponent.objects.filter(
             semester_course=self.semester_course
-        ).exclude(id=self.id).aaggregate(
+        ).exclude(id=self.id).aggregate(
             total=models.Sum('weight')
         )['total'] or 0
 
@@ -149,9 +148,38 @@ class GradeComponent(models.Model):
                 })
         
     
+    # fields the stored scores and running totals of the component depend on
+    SCORING_FIELDS = ('semester_course_id', 'weight', 'max_score', 'is_required')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_scoring = instance._scoring()
+        return instance
+
+    def _scoring(self):
+        return {name: self.__dict__.get(name) for name in self.SCORING_FIELDS}
+
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        stored = getattr(self, '_stored_scoring', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if not adding and stored != self._scoring():
+                self.rescore(previous_semester_course_id=(stored or {}).get('semester_course_id'))
+        self._stored_scoring = self._scoring()
+
+    def rescore(self, previous_semester_course_id=None):
+        """ recompute the stored scores of the component and the running totals of its course """
+        scores = list(ComponoentScore.objects.filter(component=self).only('id', 'score', 'component'))
+        for score in scores:
+            score.precentage, score.weighted_score = ComponoentScore.scaled(score.score, self)
+        # bulk_update rebuilds the running totals of the course
+        ComponoentScore.objects.bulk_update(scores, ['precentage', 'weighted_score'], batch_size=1000)
+        if previous_semester_course_id not in (None, self.semester_course_id):
+            CourseScoreTotal.rebuild(previous_semester_course_id)
+        return len(scores)
 
 
 class StudentGrade(models.Model):
@@ -176,11 +204,124 @@ class StudentGrade(models.Model):
         return f"{self.student.user.get_full_name()} - {self.semester_course.course.name} - {self.grade.letter}"
     
     def save(self, *args, **kwargs):
+        from universityApps.users.tasks import schedule_student_recompute
         self.grade_points = self.grade.points
         super().save(*args, **kwargs)
 
-        self.student.upadate_cgpa()
+        schedule_student_recompute(self.student_id)
     
+    @classmethod
+    def finalize(cls, student_id, semester_course_id, numeric_value, graded_by=None):
+        """ create or update the final grade of a student in a semester course """
+        from .enrollments import CourseRegistration
+
+        grade = Grade.get_grade_for_value(numeric_value)
+        if grade is None:
+            return None
+
+        # the semester comes from the student's registration in this course
+        semester_id = CourseRegistration.objects.filter(
+            semester_registration__student_id=student_id,
+            semester_course_id=semester_course_id,
+        ).order_by('-registration_date', '-id').values_list(
+            'semester_registration__semester_id', flat=True
+        ).first()
+        if semester_id is None:
+            return None
+
+        student_grade, _created = cls.objects.update_or_create(
+            student_id=student_id,
+            semester_course_id=semester_course_id,
+            semester_id=semester_id,
+            defaults={
+                'grade': grade,
+                'numeric_value': numeric_value,
+                'graded_by': graded_by,
+                'grade_points': grade.points,
+            }
+        )
+        return student_grade
+
+    @classmethod
+    def finalize_many(cls, semester_course, graded_by=None):
+        """ finalize the grades of every fully scored student of a semester course in one pass """
+        from universityApps.users.tasks import schedule_student_recompute
+        from ..tasks import schedule_distribution_refresh
+        from .enrollments import CourseRegistration
+
+        required_count = GradeComponent.objects.filter(
+            semester_course=semester_course, is_required=True,
+        ).count()
+        totals = list(CourseScoreTotal.objects.filter(
+            semester_course=semester_course,
+            required_scored__gte=required_count,
+            scored_weight__gt=0,
+        ).values_list('student_id', 'weighted_total'))
+        grades = Grade.grades_for_values(total for _student, total in totals)
+
+        semesters = dict(
+            CourseRegistration.objects.filter(
+                semester_course=semester_course,
+            ).order_by('registration_date', 'id').values_list(
+                'semester_registration__student_id', 'semester_registration__semester_id'
+            )
+        )
+        existing = {
+            (grade.student_id, grade.semester_id): grade
+            for grade in cls.objects.filter(semester_course=semester_course)
+        }
+
+        to_create, to_update = [], []
+        for (student_id, numeric_value), grade in zip(totals, grades):
+            semester_id = semesters.get(student_id)
+            if semester_id is None or grade is None:
+                continue
+
+            student_grade = existing.get((student_id, semester_id))
+            if student_grade is None:
+                to_create.append(cls(
+                    student_id=student_id,
+                    semester_course=semester_course,
+                    semester_id=semester_id,
+                    grade=grade,
+                    numeric_value=numeric_value,
+                    grade_points=grade.points,
+                    graded_by=graded_by,
+                ))
+            else:
+                student_grade.grade = grade
+                student_grade.numeric_value = numeric_value
+                student_grade.grade_points = grade.points
+                student_grade.graded_by = graded_by
+                student_grade.last_modified = timezone.now()
+                to_update.append(student_grade)
+
+        with transaction.atomic():
+            cls.objects.bulk_create(to_create)
+            cls.objects.bulk_update(
+                to_update,
+                ['grade', 'numeric_value', 'grade_points', 'graded_by', 'last_modified']
+            )
+            schedule_student_recompute(*(grade.student_id for grade in to_create + to_update))
+            schedule_distribution_refresh(*{
+                (grade.semester_id, grade.semester_course_id) for grade in to_create + to_update
+            })
+        return to_create + to_update
+
+    @staticmethod
+    def _quality_points():
+        """ grade points weighted by the course credits """
+        return models.ExpressionWrapper(
+            F('grade_points') * F('semester_course__course__credits'),
+            output_field=models.DecimalField(max_digits=9, decimal_places=2),
+        )
+
+    @staticmethod
+    def _gpa(points, credits):
+        if not credits:
+            return 0.00
+        return round(float(points or 0) / credits, 2)
+
     @classmethod
     def claculate_gpa(cls, student, semester=None):
         """ calculate the gpa of a student in a semester """
@@ -192,20 +333,176 @@ class StudentGrade(models.Model):
         if semester:
             grades_query = grades_query.filter(semester=semester)
 
-        total_points = 0
-        total_credits = 0
-
-        for grade in grades_query:
-            credits = grade.semester_course.course.credits
-            total_points += float(grade.grade_points) * credits
-            total_credits += credits
+        totals = grades_query.aggregate(
+            points=models.Sum(cls._quality_points()),
+            credits=models.Sum('semester_course__course__credits'),
+        )
+        return cls._gpa(totals['points'], totals['credits'])
 
-        if total_credits == 0:
-            return 0.00
-        
-        return round(total_points / total_credits, 2)
+    @classmethod
+    def calculate_gpas(cls, semester=None, program=None, department=None, students=None):
+        """
+        calculate the semester gpa and the cgpa of many students with one grouped query.
+        With a semester, only its students are included and the cgpa stops at that semester.
+        Without one, 'gpa' and 'cgpa' both cover the whole transcript.
+        Returns {student_id: {'gpa': ..., 'cgpa': ..., 'credits': ...}}
+        """
+        grades_query = cls.objects.filter(is_included_in_gpa=True)
+        if students is not None:
+            grades_query = grades_query.filter(student__in=students)
+        if program is not None:
+            grades_query = grades_query.filter(student__program=program)
+        if department is not None:
+            grades_query = grades_query.filter(student__department=department)
+
+        in_semester = models.Q()
+        if semester is not None:
+            grades_query = grades_query.filter(
+                student__in=cls.objects.filter(semester=semester).values('student_id'),
+                semester__start_date__lte=semester.start_date,
+            )
+            in_semester = models.Q(semester=semester)
+
+        rows = grades_query.values('student_id').annotate(
+            points=models.Sum(cls._quality_points()),
+            credits=models.Sum('semester_course__course__credits'),
+            semester_points=models.Sum(cls._quality_points(), filter=in_semester),
+            semester_credits=models.Sum('semester_course__course__credits', filter=in_semester),
+        ).order_by()
+
+        return {
+            row['student_id']: {
+                'gpa': cls._gpa(row['semester_points'], row['semester_credits']),
+                'cgpa': cls._gpa(row['points'], row['credits']),
+                'credits': row['credits'] or 0,
+            }
+            for row in rows
+        }
     
 
+class CourseScoreTotal(models.Model):
+    """ running weighted score of a student in a semester course """
+    student = models.ForeignKey('users.Student', on_delete=models.CASCADE, verbose_name=_("Student"), related_name='course_score_totals')
+    semester_course = models.ForeignKey('academic.SemesterCourse', on_delete=models.CASCADE, verbose_name=_("Semester Course"), related_name='score_totals')
+    weighted_total = models.DecimalField(verbose_name=_("Weighted Total"), max_digits=6, decimal_places=2, default=0)
+    scored_weight = models.DecimalField(verbose_name=_("Scored Weight"), max_digits=6, decimal_places=2, default=0)
+    required_scored = models.PositiveSmallIntegerField(verbose_name=_("Scored Required Components"), default=0)
+    updated_at = models.DateTimeField(verbose_name=_("Updated At"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Course Score Total")
+        verbose_name_plural = _("Course Score Totals")
+        unique_together = ['student', 'semester_course']
+
+    def __str__(self):
+        return f"{self.student_id} - {self.semester_course_id}: {self.weighted_total}"
+
+    @classmethod
+    def apply(cls, student_id, semester_course_id, weighted=0, weight=0, required=0):
+        """ add the given deltas to the running row and return it """
+        lookup = {'student_id': student_id, 'semester_course_id': semester_course_id}
+        changes = {
+            'weighted_total': F('weighted_total') + weighted,
+            'scored_weight': F('scored_weight') + weight,
+            'required_scored': F('required_scored') + required,
+        }
+        with transaction.atomic():
+            if not cls.objects.filter(**lookup).update(**changes):
+                try:
+                    with transaction.atomic():
+                        return cls.objects.create(
+                            weighted_total=weighted,
+                            scored_weight=weight,
+                            required_scored=required,
+                            **lookup
+                        )
+                except IntegrityError:
+                    cls.objects.filter(**lookup).update(**changes)
+            return cls.objects.get(**lookup)
+
+    @classmethod
+    def rebuild(cls, semester_course):
+        """ recompute the running rows of a semester course (or its id) from its scores in one query """
+        semester_course_id = getattr(semester_course, 'pk', semester_course)
+        rows = ComponoentScore.objects.filter(
+            component__semester_course_id=semester_course_id
+        ).values('student_id').annotate(
+            total=models.Sum('weighted_score'),
+            weight=models.Sum('component__weight'),
+            required=models.Count('id', filter=models.Q(component__is_required=True)),
+        )
+        totals = [
+            cls(
+                student_id=row['student_id'],
+                semester_course_id=semester_course_id,
+                weighted_total=row['total'] or 0,
+                scored_weight=row['weight'] or 0,
+                required_scored=row['required'],
+            )
+            for row in rows
+        ]
+        with transaction.atomic():
+            cls.objects.filter(semester_course_id=semester_course_id).delete()
+            cls.objects.bulk_create(totals)
+        return totals
+
+
+class ComponentScoreQuerySet(models.QuerySet):
+    """ rebuilds the running totals on the paths that skip save() and delete() """
+
+    # fields a running total depends on
+    TOTAL_FIELDS = {'student', 'student_id', 'component', 'component_id', 'weighted_score'}
+
+    def _semester_course_ids(self):
+        return set(self.order_by().values_list('component__semester_course_id', flat=True).distinct())
+
+    @staticmethod
+    def _rebuild(semester_course_ids=(), component_ids=()):
+        semester_course_ids = set(semester_course_ids)
+        if component_ids:
+            semester_course_ids.update(GradeComponent.objects.filter(
+                pk__in=set(component_ids),
+            ).values_list('semester_course_id', flat=True))
+        for semester_course_id in semester_course_ids:
+            CourseScoreTotal.rebuild(semester_course_id)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic():
+            objs = super().bulk_create(objs, *args, **kwargs)
+            self._rebuild(component_ids=[obj.component_id for obj in objs])
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if not self.TOTAL_FIELDS.intersection(fields):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+        with transaction.atomic():
+            semester_course_ids = ComponoentScore.objects.filter(
+                pk__in=[obj.pk for obj in objs],
+            )._semester_course_ids()
+            # a plain queryset, so the batches do not rebuild the totals one by one
+            updated = models.QuerySet(self.model, using=self.db).bulk_update(objs, fields, *args, **kwargs)
+            self._rebuild(semester_course_ids, [obj.component_id for obj in objs])
+        return updated
+
+    def update(self, **kwargs):
+        if not self.TOTAL_FIELDS.intersection(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic():
+            semester_course_ids = self._semester_course_ids()
+            updated = super().update(**kwargs)
+            component = kwargs.get('component_id', kwargs.get('component'))
+            self._rebuild(semester_course_ids, [getattr(component, 'pk', component)] if component is not None else ())
+        return updated
+
+    def delete(self):
+        with transaction.atomic():
+            semester_course_ids = self._semester_course_ids()
+            result = super().delete()
+            self._rebuild(semester_course_ids)
+        return result
+
+
 class ComponoentScore(models.Model):
     """ grade component score """
     student = models.ForeignKey('users.Student', on_delete=models.PROTECT, verbose_name=_("Student"), related_name='component_scores')
@@ -218,6 +515,8 @@ class ComponoentScore(models.Model):
     graded_date = models.DateField(verbose_name=_("Graded Date"), auto_now_add=True,db_index=True)
     feedback = models.TextField(verbose_name=_("Feedback"), blank=True, null=True)
 
+    objects = ComponentScoreQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Component Score")
         verbose_name_plural = _("Component Scores")
@@ -226,63 +525,113 @@ class ComponoentScore(models.Model):
     def __str__(self):
         return f"{self.student.user.get_full_name()} - {self.component.name}: {self.score}/{self.component.max_score}"
 
-    def save(self, *args, **kwargs):
-        """calculate the precentage"""
-        if self.component.max_score > 0:
-            self.precentage = (self.score / self.component.max_score) * 100
+    @staticmethod
+    def scaled(score, component):
+        """ (percentage, weighted score) of a score, both rounded to 2 places as they are stored """
+        two_places = Decimal('0.01')
+        if component.max_score > 0:
+            precentage = (Decimal(score) / component.max_score * 100).quantize(two_places, ROUND_HALF_UP)
         else:
-            self.precentage = 0
+            precentage = Decimal('0')
+        return precentage, (precentage / 100 * component.weight).quantize(two_places, ROUND_HALF_UP)
 
-        # calculate the weighted score
-        self.weighted_score = (self.precentage / 100) * self.component.weight
-        super().save(*args, **kwargs)
+    def _locked_stored(self):
+        """ the stored score of the row, read under a row lock: (weighted_score, course, weight, required) """
+        if self.pk is None:
+            return None
+        return ComponoentScore.objects.select_for_update(of=('self',)).filter(pk=self.pk).values_list(
+            'weighted_score', 'component__semester_course_id', 'component__weight', 'component__is_required',
+        ).first()
 
-        self.calculate_course_grade()
-    
-    def calculate_course_grade(self):
-        """ calculate the course grade """
-        #get all component scores for the student in this course
-        semester_course = self.component.semester_course
-        components = ComponoentScore.objects.filter(semester_course=semester_course)
-
-        total_weighted_score = 0
-        total_weight = 0
-
-        for component in components:
-            try:
-                score = ComponoentScore.objects.filter(
-                    student=self.student,
-                    component=component
+    def save(self, *args, **kwargs):
+        """calculate the precentage and the weighted score"""
+        component = self.component
+        self.precentage, self.weighted_score = self.scaled(self.score, component)
+        required = 1 if component.is_required else 0
+
+        with transaction.atomic():
+            # the delta is taken against the stored row, so concurrent edits add up
+            stored = None if self._state.adding else self._locked_stored()
+            super().save(*args, **kwargs)
+
+            if stored is None:
+                total = CourseScoreTotal.apply(
+                    self.student_id,
+                    component.semester_course_id,
+                    weighted=self.weighted_score,
+                    weight=component.weight,
+                    required=required,
                 )
+            else:
+                previous, previous_course_id, previous_weight, previous_required = stored
+                if previous_course_id == component.semester_course_id:
+                    total = CourseScoreTotal.apply(
+                        self.student_id,
+                        component.semester_course_id,
+                        weighted=self.weighted_score - previous,
+                        weight=component.weight - previous_weight,
+                        required=required - int(previous_required),
+                    )
+                else:
+                    # moved to a component of another course
+                    CourseScoreTotal.apply(
+                        self.student_id,
+                        previous_course_id,
+                        weighted=-previous,
+                        weight=-previous_weight,
+                        required=-int(previous_required),
+                    )
+                    total = CourseScoreTotal.apply(
+                        self.student_id,
+                        component.semester_course_id,
+                        weighted=self.weighted_score,
+                        weight=component.weight,
+                        required=required,
+                    )
+            self.calculate_course_grade(total)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            stored = self._locked_stored()
+            result = super().delete(*args, **kwargs)
+            if stored is not None:
+                previous, semester_course_id, weight, is_required = stored
+                CourseScoreTotal.apply(
+                    self.student_id,
+                    semester_course_id,
+                    weighted=-previous,
+                    weight=-weight,
+                    required=-1 if is_required else 0,
+                )
+        return result
+
+    def calculate_course_grade(self, total=None):
+        """ finalize the course grade once every required component is scored """
+        semester_course_id = self.component.semester_course_id
+        if total is None:
+            total = CourseScoreTotal.objects.filter(
+                student_id=self.student_id,
+                semester_course_id=semester_course_id,
+            ).first()
+            if total is None:
+                return None
 
-                total_weighted_score += score.weighted_score
-                total_weight += component.component.weight
-            except ComponoentScore.DoesNotExist:
-                pass
+        if total.scored_weight <= 0:
+            return None
 
-        required_components = components.filter(is_required=True )
-        scored_required = ComponoentScore.objects.filter(
-            student=self.student,
-            component__in=required_components
+        required_count = GradeComponent.objects.filter(
+            semester_course_id=semester_course_id,
+            is_required=True,
         ).count()
+        if total.required_scored < required_count:
+            return None
 
-        if scored_required == required_components.count() and total_weight > 0:
-             final_Score = total_weighted_score 
-
-             grade = Grade.objects.get_grade_for_value(final_Score)
-
-             if grade :
-                 StudentGrade.objects.update_or_create(
-                     student=self.student,
-                     course=semester_course.course,
-                     semester=semester_course.semesterplan.semestertype,
-                     defaults={
-                         'grade':grade,
-                         'numeric_value':final_Score,
-                         'graded_by':self.graded_by,
-                         'grade_points':grade.points
-                     }
-                 )
+        return StudentGrade.finalize(
+            student_id=self.student_id,
+            semester_course_id=semester_course_id,
+            numeric_value=total.weighted_total,
+            graded_by=self.graded_by,
+        )
 
 
 class Exam(models.Model):
@@ -304,6 +653,11 @@ class Exam(models.Model):
     def __str__(self):
         return f"{self.title} ({self.course})"
 
+    def grade_submissions(self):
+        """ auto-grade the MCQ answers of every submission and update their totals """
+        from universityApps.academic.exams import grade_exam
+        return grade_exam(self)
+
 class ExamSection(models.Model):
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='sections')
     title = models.CharField(max_length=255)
@@ -347,7 +701,8 @@ class MCQChoice(models.Model):
 class StudentExamSubmission(models.Model):
     student = models.ForeignKey('users.Student', on_delete=models.CASCADE, related_name='exam_submissions')
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='submissions')
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    # empty while the sitting is in progress, stamped by the final submit
+    submitted_at = models.DateTimeField(null=True, blank=True)
     total_score = models.DecimalField(max_digits=6, decimal_places=2, default=0)
 
     class Meta:
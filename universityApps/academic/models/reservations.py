@@ -0,0 +1,46 @@
+"""Registration-day seat reservations"""
+from django.db import models
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+
+class SeatReservation(models.Model):
+    """
+    طلب مقعد في مجموعة طلابية.
+    A request is either holding a seat until `expires_at`, or waiting in the
+    FIFO queue of its group (ordered by creation) for a seat to free up.
+    """
+    class Status(models.TextChoices):
+        Queued = 'queued', _('Queued')
+        Held = 'held', _('Held')
+        Confirmed = 'confirmed', _('Confirmed')
+        Released = 'released', _('Released')
+        Expired = 'expired', _('Expired')
+
+    OPEN_STATUSES = (Status.Queued, Status.Held)
+
+    group = models.ForeignKey('academic.StudentGroup', on_delete=models.CASCADE, related_name='seat_reservations', verbose_name=_("Group"))
+    student = models.ForeignKey('users.Student', on_delete=models.CASCADE, related_name='seat_reservations', verbose_name=_("Student"))
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.Queued, verbose_name=_("Status"))
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Expires At"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        verbose_name = _("Seat Reservation")
+        verbose_name_plural = _("Seat Reservations")
+        ordering = ['created_at', 'id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['group', 'student'],
+                condition=Q(status__in=['queued', 'held']),
+                name='seat_reservation_open_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['group', 'status', 'created_at'], name='seat_reservation_queue_idx'),
+            models.Index(fields=['status', 'expires_at'], name='seat_reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.group_id}: {self.status}"
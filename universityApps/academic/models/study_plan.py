@@ -241,7 +241,9 @@ class SemesterCourse(models.Model):
         super().save(*args, **kwargs)
         if self.id:
          if not self.code:
-            self.code = f"{self.course.subject.code}{self.semester_plan.academic_level.level_number}{self.semester_plan.semester_type}{self.order}"
+            # the code takes the rank at creation, not the sparse order, and is kept when the course is moved
+            position = self._meta.get_field('order').position(self)
+            self.code = f"{self.course.subject.code}{self.semester_plan.academic_level.level_number}{self.semester_plan.semester_type}{position}"
             super().save(update_fields=['code'])
 
     def get_actual_semester(self, academic_year):
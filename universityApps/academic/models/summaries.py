@@ -0,0 +1,138 @@
+"""Materialized per-semester academic records"""
+from collections import defaultdict
+from django.db import models, transaction
+from django.db.models import F, Q, Sum
+from django.utils.translation import gettext_lazy as _
+
+
+class StudentSemesterSummary(models.Model):
+    """ credits and gpa of a student in one semester, with the cumulative values up to it """
+    student = models.ForeignKey('users.Student', on_delete=models.CASCADE, related_name='semester_summaries', verbose_name=_("Student"))
+    semester = models.ForeignKey('academic.Semester', on_delete=models.CASCADE, related_name='student_summaries', verbose_name=_("Semester"))
+    credits_attempted = models.PositiveSmallIntegerField(default=0, verbose_name=_("Credits Attempted"))
+    credits_earned = models.PositiveSmallIntegerField(default=0, verbose_name=_("Credits Earned"))
+    gpa_credits = models.PositiveSmallIntegerField(default=0, verbose_name=_("GPA Credits"))
+    quality_points = models.DecimalField(max_digits=8, decimal_places=2, default=0, verbose_name=_("Quality Points"))
+    semester_gpa = models.DecimalField(max_digits=4, decimal_places=2, default=0, verbose_name=_("Semester GPA"))
+    cumulative_credits_earned = models.PositiveIntegerField(default=0, verbose_name=_("Cumulative Credits Earned"))
+    cumulative_gpa = models.DecimalField(max_digits=4, decimal_places=2, default=0, verbose_name=_("Cumulative GPA"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        verbose_name = _("Student Semester Summary")
+        verbose_name_plural = _("Student Semester Summaries")
+        unique_together = ['student', 'semester']
+        ordering = ['student', 'semester__start_date']
+        indexes = [
+            models.Index(fields=['semester'], name='semester_summary_semester_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.semester_id}: {self.semester_gpa} / {self.cumulative_gpa}"
+
+    @classmethod
+    def transcript(cls, student):
+        """ the summaries of a student, one row per semester in chronological order """
+        return cls.objects.filter(student=student).select_related('semester').order_by('semester__start_date')
+
+    @classmethod
+    def rebuild(cls, students=None, academic_year=None):
+        """
+        regenerate the summaries of the given students (all their semesters),
+        or of every student of an academic year (the semesters of that year only).
+        Each source table is read with one grouped query.
+        """
+        from .academic_year import Semester
+        from .enrollments import CourseRegistration
+        from .grading import StudentGrade
+
+        registrations = CourseRegistration.objects.all()
+        grades = StudentGrade.objects.all()
+        semesters = Semester.objects.all()
+
+        if students is not None:
+            registrations = registrations.filter(semester_registration__student__in=students)
+            grades = grades.filter(student__in=students)
+        if academic_year is not None:
+            year_semesters = set(
+                Semester.objects.filter(academic_year=academic_year).values_list('pk', flat=True)
+            )
+            year_students = CourseRegistration.objects.filter(
+                semester_registration__semester__academic_year=academic_year
+            ).values('semester_registration__student_id')
+            registrations = registrations.filter(semester_registration__semester__academic_year=academic_year)
+            # the cumulative values also need the grades of the earlier years
+            grades = grades.filter(student__in=year_students)
+
+        start_dates = dict(semesters.values_list('pk', 'start_date'))
+
+        attempted = {
+            (row['semester_registration__student_id'], row['semester_registration__semester_id']): row['total'] or 0
+            for row in registrations.exclude(
+                status__in=[
+                    CourseRegistration.RegistrationStatus.dropped,
+                    CourseRegistration.RegistrationStatus.withdrawn,
+                ]
+            ).values(
+                'semester_registration__student_id', 'semester_registration__semester_id'
+            ).annotate(total=Sum('semester_course__course__credits')).order_by()
+        }
+
+        included = Q(is_included_in_gpa=True)
+        earned = defaultdict(dict)
+        for row in grades.values('student_id', 'semester_id').annotate(
+            earned=Sum('semester_course__course__credits', filter=Q(grade__is_passing=True)),
+            gpa_credits=Sum('semester_course__course__credits', filter=included),
+            points=Sum(
+                models.ExpressionWrapper(
+                    F('grade_points') * F('semester_course__course__credits'),
+                    output_field=models.DecimalField(max_digits=9, decimal_places=2),
+                ),
+                filter=included,
+            ),
+        ).order_by():
+            earned[row['student_id']][row['semester_id']] = row
+
+        keys = set(attempted) | {
+            (student_id, semester_id)
+            for student_id, rows in earned.items() for semester_id in rows
+        }
+        by_student = defaultdict(set)
+        for student_id, semester_id in keys:
+            by_student[student_id].add(semester_id)
+
+        summaries = []
+        for student_id, semester_ids in by_student.items():
+            cumulative_earned = cumulative_credits = 0
+            cumulative_points = 0
+            for semester_id in sorted(semester_ids, key=lambda pk: (start_dates.get(pk) is None, start_dates.get(pk), pk)):
+                row = earned[student_id].get(semester_id, {})
+                gpa_credits = row.get('gpa_credits') or 0
+                points = row.get('points') or 0
+                cumulative_earned += row.get('earned') or 0
+                cumulative_credits += gpa_credits
+                cumulative_points += points
+
+                if academic_year is not None and semester_id not in year_semesters:
+                    continue
+                summaries.append(cls(
+                    student_id=student_id,
+                    semester_id=semester_id,
+                    credits_attempted=attempted.get((student_id, semester_id), 0),
+                    credits_earned=row.get('earned') or 0,
+                    gpa_credits=gpa_credits,
+                    quality_points=points,
+                    semester_gpa=round(points / gpa_credits, 2) if gpa_credits else 0,
+                    cumulative_credits_earned=cumulative_earned,
+                    cumulative_gpa=round(cumulative_points / cumulative_credits, 2) if cumulative_credits else 0,
+                ))
+
+        stale = cls.objects.all()
+        if students is not None:
+            stale = stale.filter(student__in=students)
+        if academic_year is not None:
+            stale = stale.filter(semester__academic_year=academic_year)
+        with transaction.atomic():
+            stale.delete()
+            cls.objects.bulk_create(summaries, batch_size=1000)
+        return summaries
@@ -0,0 +1,199 @@
+"""
+Registration-day seat reservation for student groups.
+
+`StudentGroup.reserved_seats` counts the members of a group plus its unexpired
+holds. A seat is taken with one conditional UPDATE
+(`reserved_seats < max_students`), so concurrent requests can never oversell
+a group. A held seat is kept for SEAT_HOLD_MINUTES. In that time it must be
+confirmed, which turns it into a membership, or it is released or expires.
+
+Requests that find the group full, or find other requests already waiting,
+join the group's FIFO queue. Workers hand out freed seats in arrival order
+(see academic.tasks), so a burst costs a constant amount of work per request.
+"""
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import SeatReservation, StudentGroup, StudentGroupMembership
+
+logger = logging.getLogger(__name__)
+
+Status = SeatReservation.Status
+
+
+def _hold_expiry(now=None):
+    return (now or timezone.now()) + timedelta(minutes=getattr(settings, 'SEAT_HOLD_MINUTES', 10))
+
+
+def take_seats(group_id, count=1):
+    """Atomically take `count` seats of a group; False when they are not all free"""
+    return StudentGroup.objects.filter(
+        pk=group_id,
+        reserved_seats__lte=F('max_students') - count,
+    ).update(reserved_seats=F('reserved_seats') + count) == 1
+
+
+def free_seats(group_id, count=1):
+    StudentGroup.objects.filter(pk=group_id).update(
+        reserved_seats=Greatest(F('reserved_seats') - count, Value(0))
+    )
+
+
+def schedule_seat_queue(group_id):
+    """Let a worker serve the queue of a group, or serve it inline when the broker is down"""
+    from .tasks import process_seat_queue_task
+    try:
+        process_seat_queue_task.delay(group_id)
+    except Exception:
+        logger.exception("Could not queue the seat queue of group %s, processing it inline", group_id)
+        process_seat_queue(group_id)
+
+
+def reserve_seat(student, group):
+    """
+    حجز مقعد في المجموعة أثناء فترة التسجيل.
+    Returns the student's open reservation of the group: Held when a seat was
+    taken, Queued when the request waits in the group's queue.
+    Raises ValueError when registration is not open or the student is already a member.
+    """
+    if not group.semester.is_registration_open():
+        raise ValueError("Registration is not open for this semester")
+    # a member's seat is already counted; a hold would take a second one
+    if StudentGroupMembership.objects.filter(group=group, student=student).exists():
+        raise ValueError("The student is already a member of this group")
+
+    open_reservations = SeatReservation.objects.filter(
+        group=group, student=student, status__in=SeatReservation.OPEN_STATUSES,
+    )
+    existing = open_reservations.first()
+    if existing is not None:
+        return existing
+
+    try:
+        with transaction.atomic():
+            # requests already waiting go first
+            waiting = SeatReservation.objects.filter(group=group, status=Status.Queued).exists()
+            if not waiting and take_seats(group.pk):
+                return SeatReservation.objects.create(
+                    group=group, student=student, status=Status.Held, expires_at=_hold_expiry(),
+                )
+            reservation = SeatReservation.objects.create(group=group, student=student, status=Status.Queued)
+    except IntegrityError:
+        # a concurrent request of the same student won
+        return open_reservations.get()
+
+    transaction.on_commit(lambda: schedule_seat_queue(group.pk))
+    return reservation
+
+
+def queue_position(reservation):
+    """1-based place of a queued request in its group's queue, None when it is not queued"""
+    if reservation.status != Status.Queued:
+        return None
+    return SeatReservation.objects.filter(
+        group_id=reservation.group_id,
+        status=Status.Queued,
+        id__lte=reservation.id,
+    ).count()
+
+
+def confirm_seat(reservation):
+    """Turn an unexpired hold into the student's group membership; False otherwise"""
+    with transaction.atomic():
+        reservation = SeatReservation.objects.select_for_update().get(pk=reservation.pk)
+        if reservation.status != Status.Held or reservation.expires_at <= timezone.now():
+            return False
+
+        membership = StudentGroupMembership.objects.filter(student_id=reservation.student_id).first()
+        if membership is None:
+            membership = StudentGroupMembership(student_id=reservation.student_id)
+        if membership.group_id != reservation.group_id:
+            membership.group_id = reservation.group_id
+            # the hold already counts in reserved_seats (see signals)
+            membership._seat_reserved = True
+            membership.save()
+        else:
+            # joined by other means since the hold: its seat is counted twice
+            free_seats(reservation.group_id)
+            transaction.on_commit(lambda: schedule_seat_queue(reservation.group_id))
+
+        reservation.status = Status.Confirmed
+        reservation.save(update_fields=['status', 'updated_at'])
+    return True
+
+
+def release_seat(reservation):
+    """Cancel a hold or leave the queue; a freed seat goes to the next in line"""
+    with transaction.atomic():
+        reservation = SeatReservation.objects.select_for_update().get(pk=reservation.pk)
+        if reservation.status not in SeatReservation.OPEN_STATUSES:
+            return False
+        held = reservation.status == Status.Held
+        reservation.status = Status.Released
+        reservation.save(update_fields=['status', 'updated_at'])
+        if held:
+            free_seats(reservation.group_id)
+            transaction.on_commit(lambda: schedule_seat_queue(reservation.group_id))
+    return True
+
+
+def expire_holds(now=None):
+    """Expire the overdue holds and free their seats; returns the ids of the groups concerned"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        overdue = list(SeatReservation.objects.select_for_update(skip_locked=True).filter(
+            status=Status.Held, expires_at__lte=now,
+        ).values_list('id', 'group_id'))
+        if not overdue:
+            return []
+        SeatReservation.objects.filter(pk__in=[pk for pk, _group in overdue]).update(
+            status=Status.Expired, updated_at=now,
+        )
+        freed = Counter(group_id for _pk, group_id in overdue)
+        for group_id, count in freed.items():
+            free_seats(group_id, count)
+    return list(freed)
+
+
+def process_seat_queue(group_id, now=None):
+    """
+    Give the free seats of a group to the oldest queued requests.
+    Seats are taken for the whole batch with one conditional UPDATE; returns the number granted.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        free = StudentGroup.objects.filter(pk=group_id).values_list(
+            F('max_students') - F('reserved_seats'), flat=True,
+        ).first() or 0
+        if free <= 0:
+            return 0
+        batch = list(SeatReservation.objects.select_for_update(skip_locked=True).filter(
+            group_id=group_id, status=Status.Queued,
+        ).order_by('created_at', 'id').values_list('id', flat=True)[:free])
+        # another request may have taken a seat since it was read
+        while batch and not take_seats(group_id, len(batch)):
+            batch.pop()
+        if not batch:
+            return 0
+        SeatReservation.objects.filter(pk__in=batch).update(
+            status=Status.Held, expires_at=_hold_expiry(now), updated_at=now,
+        )
+    return len(batch)
+
+
+def process_seat_queues(now=None):
+    """Worker sweep: expire overdue holds, then serve the queue of every group with waiting requests"""
+    expire_holds(now)
+    granted = 0
+    for group_id in SeatReservation.objects.filter(
+        status=Status.Queued,
+    ).order_by().values_list('group_id', flat=True).distinct():
+        granted += process_seat_queue(group_id, now)
+    return granted
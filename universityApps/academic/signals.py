@@ -1,8 +1,114 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
-from .models import GroupSchedule, LectureBroadcast
+from universityApps.core.transactions import defer_until_commit
+from universityApps.courses.models import Course
+from .eligibility import invalidate_prerequisite_index
+from .exams import invalidate_exam_papers
+from .grade_bands import invalidate_grade_bands
+from .models import (
+    GroupSchedule, LectureBroadcast, Grade, GradeScale, StudentGroup,
+    CourseRegistration, SemesterRegistration, StudentGrade, StudentGroupMembership,
+    Exam, ExamSection, ExamQuestion, MCQChoice,
+)
 
 @receiver(post_save, sender=GroupSchedule)
 def auto_create_broadcast(sender, instance, created, **kwargs):
     if created and instance.is_online:
         LectureBroadcast.objects.get_or_create(schedule=instance)
+
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+@receiver(post_save, sender=GradeScale)
+@receiver(post_delete, sender=GradeScale)
+def refresh_grade_bands(sender, instance, **kwargs):
+    # after commit, so a concurrent reader cannot re-cache the bands from pre-commit rows
+    transaction.on_commit(invalidate_grade_bands)
+
+
+@receiver(post_save, sender=CourseRegistration)
+@receiver(post_delete, sender=CourseRegistration)
+@receiver(post_delete, sender=StudentGrade)
+def refresh_student_records(sender, instance, **kwargs):
+    from universityApps.users.tasks import schedule_student_recompute
+    if sender is StudentGrade:
+        student_id = instance.student_id
+    else:
+        student_id = SemesterRegistration.objects.filter(
+            pk=instance.semester_registration_id
+        ).values_list('student_id', flat=True).first()
+    if student_id:
+        schedule_student_recompute(student_id)
+
+
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+@receiver(post_save, sender=ExamSection)
+@receiver(post_delete, sender=ExamSection)
+@receiver(post_save, sender=ExamQuestion)
+@receiver(post_delete, sender=ExamQuestion)
+@receiver(post_save, sender=MCQChoice)
+@receiver(post_delete, sender=MCQChoice)
+def refresh_exam_paper(sender, instance, **kwargs):
+    if sender is Exam:
+        exam_id = instance.pk
+    elif sender is ExamSection:
+        exam_id = instance.exam_id
+    elif sender is ExamQuestion:
+        exam_id = ExamSection.objects.filter(pk=instance.section_id).values_list('exam_id', flat=True).first()
+    else:
+        exam_id = ExamQuestion.objects.filter(pk=instance.question_id).values_list('section__exam_id', flat=True).first()
+    if exam_id:
+        # once per exam and transaction, after the commit
+        defer_until_commit('exam_papers', [exam_id], invalidate_exam_papers)
+
+
+@receiver(post_save, sender=GroupSchedule)
+@receiver(post_delete, sender=GroupSchedule)
+def refresh_section_distribution(sender, instance, **kwargs):
+    # the instructor of a section is credited with its grades
+    from .tasks import schedule_distribution_refresh
+    semester_id = StudentGroup.objects.filter(pk=instance.group_id).values_list('semester_id', flat=True).first()
+    if semester_id:
+        schedule_distribution_refresh((semester_id, instance.semester_course_id))
+
+
+@receiver(post_save, sender=StudentGrade)
+@receiver(post_delete, sender=StudentGrade)
+def refresh_grade_distribution(sender, instance, **kwargs):
+    from .tasks import schedule_distribution_refresh
+    schedule_distribution_refresh((instance.semester_id, instance.semester_course_id))
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(m2m_changed, sender=Course.prerequisites.through)
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+def refresh_prerequisite_index(sender, **kwargs):
+    # a grade band deciding what counts as passed drops every passed-course bitset with the index
+    transaction.on_commit(invalidate_prerequisite_index)
+
+
+@receiver(post_save, sender=StudentGroupMembership)
+def take_group_seat(sender, instance, created, **kwargs):
+    from .seats import schedule_seat_queue
+    previous_group_id = None if created else getattr(instance, '_stored_group_id', instance.group_id)
+    if previous_group_id == instance.group_id:
+        return
+    if previous_group_id is not None:
+        StudentGroup.add_members({previous_group_id: -1})
+        transaction.on_commit(lambda: schedule_seat_queue(previous_group_id))
+    # a confirmed hold already counts in reserved_seats; other additions
+    # (e.g. by staff) take a seat even over capacity
+    StudentGroup.add_members({instance.group_id: 1}, seats=not getattr(instance, '_seat_reserved', False))
+    instance._stored_group_id = instance.group_id
+    instance._seat_reserved = False
+
+
+@receiver(post_delete, sender=StudentGroupMembership)
+def free_group_seat(sender, instance, **kwargs):
+    from .seats import schedule_seat_queue
+    StudentGroup.add_members({instance.group_id: -1})
+    transaction.on_commit(lambda: schedule_seat_queue(instance.group_id))
@@ -0,0 +1,73 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+from universityApps.core.transactions import defer_until_commit
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_exam_autosaves_task(exam_id):
+    """Write every buffered answer of an exam, e.g. scheduled for the end of the sitting"""
+    from .exams import flush_exam_autosaves
+    from .models import Exam
+    exam = Exam.objects.filter(pk=exam_id).first()
+    if exam is None:
+        return 0
+    return flush_exam_autosaves(exam)
+
+
+@shared_task
+def flush_open_exam_autosaves_task():
+    """Periodic: write the buffered answers of every open or just-closed exam"""
+    from .exams import flush_recent_exam_autosaves
+    return flush_recent_exam_autosaves()
+
+
+@shared_task
+def refresh_grade_distributions(offerings):
+    """Rebuild the grade distributions of a list of (semester_id, semester_course_id) pairs"""
+    from .models import GradeDistribution
+    GradeDistribution.refresh(tuple(offering) for offering in offerings)
+
+
+def _flush_distributions(offerings):
+    if not getattr(settings, 'GRADE_DISTRIBUTION_ASYNC', True):
+        refresh_grade_distributions(offerings)
+        return
+    try:
+        refresh_grade_distributions.delay(offerings)
+    except Exception:
+        logger.exception("Could not queue the refresh of %s grade distributions, running it inline", len(offerings))
+        refresh_grade_distributions(offerings)
+
+
+def schedule_distribution_refresh(*offerings):
+    """
+    جدولة تحديث توزيع الدرجات بعد نجاح المعاملة.
+    `offerings` are (semester_id, semester_course_id) pairs; each is refreshed once per transaction.
+    """
+    defer_until_commit('grade_distributions', offerings, _flush_distributions)
+
+
+@shared_task
+def sync_semester_credits():
+    """Periodic sweep fixing SemesterRegistration.total_credits drift"""
+    from .models import SemesterRegistration
+    return SemesterRegistration.sync_total_credits()
+
+
+@shared_task
+def process_seat_queue_task(group_id):
+    """Hand the free seats of a group to its oldest queued requests"""
+    from .seats import process_seat_queue
+    return process_seat_queue(group_id)
+
+
+@shared_task
+def process_seat_queues_task():
+    """Periodic sweep: expire overdue seat holds and serve every waiting queue"""
+    from .seats import process_seat_queues
+    return process_seat_queues()
@@ -1,3 +1,814 @@
-from django.test import TestCase
+import datetime
+import io
+import itertools
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from universityApps.colleges.models import College
+from universityApps.core.models import University
+from universityApps.courses.models import Course, Subject
+from universityApps.departments.models import Department
+from universityApps.programs.models import AcademicLevel, AcademicProgram
+from universityApps.users.models import FacultyMember, Student, User
+
+from .eligibility import PREREQUISITE_VERSION_KEY, eligible_semester_courses, get_prerequisite_index
+from .exams import (
+    AUTOSAVE_ANSWER_KEY, autosave_answers, buffered_answers, exam_question_choices, flush_answers,
+    flush_recent_exam_autosaves, get_exam_paper, submit_answers,
+)
+from .finalization import compute_semester_results, finalize_semester
+from .grade_bands import invalidate_grade_bands
+from .gradebook import import_gradebook
+from .group_registration import register_cohort
+from .item_analysis import get_item_analysis
+from .models import (
+    AcademicYear, ComponoentScore, CourseRegistration, CourseScoreTotal, Exam, ExamAnswer, ExamQuestion,
+    ExamSection, Grade, GradeComponent, GradeDistribution, GradeScale, GroupSchedule, MCQChoice,
+    SeatReservation, Semester, SemesterCourse, SemesterPlan, SemesterRegistration, StudentEnrollment,
+    StudentExamSubmission, StudentGrade, StudentGroup, StudentGroupMembership, StudentSemesterSummary, StudyPlan,
+)
+from .models.academic_year import SEMESTER_TYPE
+from .seats import confirm_seat, expire_holds, process_seat_queue, queue_position, release_seat, reserve_seat
+
+_sequence = itertools.count(1)
+
+
+@override_settings(STUDENT_RECOMPUTE_ASYNC=False, GRADE_DISTRIBUTION_ASYNC=False)
+class AcademicTestCase(TestCase):
+    """ a program with its levels, an academic year with an open semester, and helpers for the rest """
+
+    @classmethod
+    def setUpTestData(cls):
+        university = University.objects.create(name='University')
+        college = College.objects.create(university=university, name='Faculty of Science')
+        department = Department.objects.create(name='Computer Science', type='academic', college=college)
+        cls.program = AcademicProgram.objects.create(name='Computer Science', department=department)
+        cls.level = AcademicLevel.objects.filter(program=cls.program).order_by('level_number').first()
+        cls.study_plan = StudyPlan.objects.create(
+            program=cls.program, version=2, effective_from=timezone.now().date(),
+        )
+        cls.subject = Subject.objects.create(name='Computing', code='CMP')
+
+        today = timezone.now().date()
+        # dated rows are inserted directly: their save() only accepts future dates
+        cls.academic_year, = AcademicYear.objects.bulk_create([AcademicYear(
+            name='2025-2026',
+            start_date=today - datetime.timedelta(days=30),
+            end_date=today + datetime.timedelta(days=300),
+        )])
+        cls.semester = cls.make_semester('1')
+
+    @classmethod
+    def make_semester(cls, semester_type, registration_open=True):
+        today = timezone.now().date()
+        registration_start = today - datetime.timedelta(days=1 if registration_open else 20)
+        semester, = Semester.objects.bulk_create([Semester(
+            academic_year=cls.academic_year,
+            semester_type=semester_type,
+            start_date=today,
+            end_date=today + datetime.timedelta(days=100),
+            registration_start_date=registration_start,
+            registration_end_date=registration_start + datetime.timedelta(days=2 if registration_open else 5),
+            final_exams_start_date=today + datetime.timedelta(days=90),
+            final_exams_end_date=today + datetime.timedelta(days=95),
+            grades_due_date=today + datetime.timedelta(days=99),
+        )])
+        return semester
+
+    @classmethod
+    def make_student(cls):
+        number = next(_sequence)
+        user = User.objects.create(username=f'student{number}', email=f'student{number}@example.com', phone_number=f'0{number}')
+        return Student.objects.create(user=user, student_id=f'S{number:05d}')
+
+    @classmethod
+    def make_semester_plan(cls, semester_type=1, study_plan=None):
+        return SemesterPlan.objects.create(
+            study_plan=study_plan or cls.study_plan,
+            name=f'Plan {next(_sequence)}',
+            semester_type=semester_type,
+            order=next(_sequence),
+            academic_level=cls.level,
+        )
+
+    @classmethod
+    def make_semester_course(cls, credits=3, semester_plan=None, is_required=True):
+        course = Course.objects.create(subject=cls.subject, name=f'Course {next(_sequence)}', credits=credits)
+        return SemesterCourse.objects.create(
+            semester_plan=semester_plan or cls.make_semester_plan(),
+            course=course,
+            is_required=is_required,
+        )
+
+    @classmethod
+    def register(cls, student, *semester_courses, semester=None):
+        semester = semester or cls.semester
+        registration, _created = SemesterRegistration.objects.get_or_create(
+            student=student, semester=semester, academic_year=semester.academic_year,
+        )
+        for semester_course in semester_courses:
+            CourseRegistration.objects.create(semester_registration=registration, semester_course=semester_course)
+        return registration
+
+
+class CourseScoreTotalTests(AcademicTestCase):
+    def setUp(self):
+        self.student = self.make_student()
+        self.semester_course = self.make_semester_course()
+        self.quiz = GradeComponent.objects.create(
+            semester_course=self.semester_course, name='Quiz', type='Quiz', weight=Decimal('40'), max_score=Decimal('20'),
+        )
+        self.final = GradeComponent.objects.create(
+            semester_course=self.semester_course, name='Final', type='Final', weight=Decimal('60'), max_score=Decimal('100'),
+        )
+
+    def total(self):
+        return CourseScoreTotal.objects.filter(
+            student=self.student, semester_course=self.semester_course,
+        ).values_list('weighted_total', 'scored_weight', 'required_scored').first()
+
+    def score(self, component, value):
+        return ComponoentScore.objects.create(student=self.student, component=component, score=Decimal(value))
+
+    def test_scores_add_up(self):
+        self.score(self.quiz, '15')
+        self.score(self.final, '80')
+        self.assertEqual(self.total(), (Decimal('78.00'), Decimal('100.00'), 2))
+
+    def test_stale_instances_do_not_lose_updates(self):
+        score = self.score(self.quiz, '10')
+        first = ComponoentScore.objects.get(pk=score.pk)
+        second = ComponoentScore.objects.get(pk=score.pk)
+        first.score = Decimal('20')
+        first.save()
+        second.score = Decimal('5')
+        second.save()
+        self.assertEqual(self.total(), (Decimal('10.00'), Decimal('40.00'), 1))
+
+    def test_component_changes_rescore_the_totals(self):
+        score = self.score(self.quiz, '10')
+        self.score(self.final, '50')
+        self.quiz.weight = Decimal('30')
+        self.quiz.max_score = Decimal('10')
+        self.quiz.save()
+
+        score.refresh_from_db()
+        self.assertEqual((score.precentage, score.weighted_score), (Decimal('100.00'), Decimal('30.00')))
+        self.assertEqual(self.total(), (Decimal('60.00'), Decimal('90.00'), 2))
+
+        self.quiz.is_required = False
+        self.quiz.save()
+        self.assertEqual(self.total()[2], 1)
+
+    def test_queryset_delete_and_update_rebuild_the_totals(self):
+        self.score(self.quiz, '10')
+        final = self.score(self.final, '50')
+        ComponoentScore.objects.filter(component=self.quiz).delete()
+        self.assertEqual(self.total(), (Decimal('30.00'), Decimal('60.00'), 1))
+
+        ComponoentScore.objects.filter(pk=final.pk).update(weighted_score=Decimal('45'))
+        self.assertEqual(self.total()[0], Decimal('45.00'))
+
+    def test_instance_delete(self):
+        quiz = self.score(self.quiz, '10')
+        self.score(self.final, '50')
+        quiz.delete()
+        self.assertEqual(self.total(), (Decimal('30.00'), Decimal('60.00'), 1))
+
+
+class OrderFieldTests(AcademicTestCase):
+    field = SemesterCourse._meta.get_field('order')
+
+    def setUp(self):
+        self.semester_plan = self.make_semester_plan()
+        self.first, self.second, self.third = (
+            self.make_semester_course(semester_plan=self.semester_plan) for _ in range(3)
+        )
+
+    def orders(self):
+        return list(
+            SemesterCourse.objects.filter(semester_plan=self.semester_plan)
+            .order_by('order').values_list('pk', 'order')
+        )
+
+    def test_codes_use_the_position_not_the_order(self):
+        prefix = f"CMP{self.level.level_number}{self.semester_plan.semester_type}"
+        self.assertEqual([self.first.order, self.second.order, self.third.order], [1024, 2048, 3072])
+        self.assertEqual([self.first.code, self.second.code, self.third.code], [f"{prefix}1", f"{prefix}2", f"{prefix}3"])
+
+    def test_assign_orders_continues_each_scope(self):
+        other_plan = self.make_semester_plan(semester_type=2)
+        courses = [
+            SemesterCourse(semester_plan=plan, course=Course.objects.create(subject=self.subject, name=f'Course {next(_sequence)}', credits=3))
+            for plan in (self.semester_plan, other_plan, self.semester_plan)
+        ]
+        with self.assertNumQueries(1):
+            self.field.assign_orders(courses)
+        self.assertEqual([course.order for course in courses], [4096, 1024, 5120])
+
+    def test_bulk_reorder_keeps_the_codes(self):
+        codes = {course.pk: course.code for course in (self.first, self.second, self.third)}
+        self.field.bulk_reorder({'semester_plan': self.semester_plan}, [self.third.pk, self.first.pk, self.second.pk])
+        self.assertEqual(self.orders(), [(self.third.pk, 1024), (self.first.pk, 2048), (self.second.pk, 3072)])
+        self.assertEqual(dict(SemesterCourse.objects.filter(pk__in=codes).values_list('pk', 'code')), codes)
+
+    def test_move_takes_the_gap_between_neighbours(self):
+        self.field.move(self.third, after=self.first)
+        self.assertEqual(self.orders(), [(self.first.pk, 1024), (self.third.pk, 1536), (self.second.pk, 2048)])
+        self.field.move(self.second)
+        self.assertEqual(self.orders()[0], (self.second.pk, 512))
+        self.assertEqual(SemesterCourse.objects.get(pk=self.second.pk).code, self.second.code)
+
+    def test_move_respaces_when_there_is_no_gap(self):
+        for order, course in enumerate((self.first, self.second, self.third), start=1):
+            SemesterCourse.objects.filter(pk=course.pk).update(order=order)
+            course.order = order
+        self.field.move(self.third, after=self.first)
+        self.assertEqual(self.orders(), [(self.first.pk, 1024), (self.third.pk, 2048), (self.second.pk, 3072)])
+        self.assertEqual(self.third.order, 2048)
+
+
+class GradebookImportTests(AcademicTestCase):
+    def setUp(self):
+        self.semester_course = self.make_semester_course()
+        self.quiz = GradeComponent.objects.create(
+            semester_course=self.semester_course, name='Quiz', type='Quiz', weight=Decimal('40'), max_score=Decimal('20'),
+        )
+        self.students = [self.make_student() for _ in range(2)]
+        for student in self.students:
+            self.register(student, self.semester_course)
+
+    def test_import(self):
+        rows = [[student.student_id, '10'] for student in self.students]
+        result = import_gradebook(self.semester_course, ['student_id', 'Quiz'], rows, finalize=False)
+        self.assertEqual((result['created'], result['updated']), (2, 0))
+        self.assertEqual(CourseScoreTotal.objects.filter(semester_course=self.semester_course).count(), 2)
+
+    def test_duplicate_students_are_rejected(self):
+        first, second = self.students
+        rows = [[first.student_id, '10'], [second.student_id, '12'], [first.student_id, '18']]
+        with self.assertRaises(ValidationError) as raised:
+            import_gradebook(self.semester_course, ['student_id', 'Quiz'], rows, finalize=False)
+        self.assertIn(f"Row 4: student {first.student_id} already appears on row 2", raised.exception.messages)
+        self.assertFalse(ComponoentScore.objects.exists())
+
+    def test_duplicate_columns_are_rejected(self):
+        rows = [[self.students[0].student_id, '10', '12']]
+        with self.assertRaises(ValidationError):
+            import_gradebook(self.semester_course, ['student_id', 'Quiz', str(self.quiz.pk)], rows, finalize=False)
+        self.assertFalse(ComponoentScore.objects.exists())
+
+    def test_non_finite_scores_are_rejected(self):
+        first, second = self.students
+        rows = [[first.student_id, 'NaN'], [second.student_id, '-Infinity']]
+        with self.assertRaises(ValidationError) as raised:
+            import_gradebook(self.semester_course, ['student_id', 'Quiz'], rows, finalize=False)
+        self.assertEqual(raised.exception.messages, [
+            "Row 2: invalid score 'NaN' for Quiz",
+            "Row 3: invalid score '-Infinity' for Quiz",
+        ])
+        self.assertFalse(ComponoentScore.objects.exists())
+
+
+class GradeBandsTests(TestCase):
+    def setUp(self):
+        # the index is process-wide and outlives the rolled back test transactions
+        invalidate_grade_bands()
+
+    def test_bands_are_dropped_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            scale = GradeScale.objects.create(name='Default', is_default=True)
+            Grade.objects.create(scale=scale, Letter='A', description='A', points=4, min_percent=90, max_percent=100)
+            Grade.objects.create(scale=scale, Letter='B', description='B', points=3, min_percent=60, max_percent=Decimal('89.99'))
+        self.assertEqual(Grade.get_grade_for_value(92).Letter, 'A')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.filter(Letter='A').update(min_percent=95)
+            Grade.objects.filter(Letter='B').update(max_percent=Decimal('94.99'))
+            Grade.objects.get(Letter='A').save()
+            # the committed index is kept until the transaction ends
+            self.assertEqual(Grade.get_grade_for_value(92).Letter, 'A')
+        self.assertEqual(Grade.get_grade_for_value(92).Letter, 'B')
+
+
+class ExamTests(AcademicTestCase):
+    def setUp(self):
+        cache.clear()
+        semester_course = self.make_semester_course()
+        component = GradeComponent.objects.create(
+            semester_course=semester_course, name='Final', type='Final', weight=Decimal('60'), max_score=Decimal('100'),
+        )
+        # committed, so its paper can be cached
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exam = Exam.objects.create(
+                course=semester_course, title='Final', component=component,
+                scheduled_date=timezone.now() - datetime.timedelta(minutes=10), duration_minutes=60,
+            )
+            section = ExamSection.objects.create(exam=self.exam, title='MCQ')
+            self.questions = [
+                ExamQuestion.objects.create(section=section, question_text=f'Q{order}', is_mcq=True, max_score=Decimal('1'))
+                for order in range(2)
+            ]
+            self.choices = [
+                [MCQChoice.objects.create(question=question, text=text) for text in 'ab']
+                for question in self.questions
+            ]
+        self.submission = StudentExamSubmission.objects.create(student=self.make_student(), exam=self.exam)
+
+    def answer(self, index, choice):
+        return {'question': self.questions[index].pk, 'choice': self.choices[index][choice].pk}
+
+    def stored(self):
+        return dict(ExamAnswer.objects.filter(submission=self.submission).values_list('question_id', 'selected_choice_id'))
+
+    def test_first_save_of_an_interval_flushes(self):
+        self.assertTrue(autosave_answers(self.submission, [self.answer(0, 0)]))
+        self.assertFalse(autosave_answers(self.submission, [self.answer(0, 1)]))
+        self.assertEqual(self.stored(), {self.questions[0].pk: self.choices[0][0].pk})
+
+    def test_saves_of_different_questions_are_kept(self):
+        # two requests that both read the buffer before either wrote it
+        autosave_answers(self.submission, [self.answer(0, 1)])
+        autosave_answers(self.submission, [self.answer(1, 0)])
+        self.assertEqual(set(buffered_answers(self.submission)), {question.pk for question in self.questions})
+
+    def test_foreign_choices_are_rejected(self):
+        with self.assertRaises(ValueError):
+            autosave_answers(self.submission, [{'question': self.questions[0].pk, 'choice': self.choices[1][0].pk}])
+
+    def test_submit_writes_the_buffer_once(self):
+        autosave_answers(self.submission, [self.answer(0, 0)])
+        autosave_answers(self.submission, [self.answer(0, 1), self.answer(1, 1)])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(submit_answers(self.submission))
+        self.assertEqual(self.stored(), {
+            self.questions[0].pk: self.choices[0][1].pk, self.questions[1].pk: self.choices[1][1].pk,
+        })
+        self.assertEqual(buffered_answers(self.submission), {})
+
+        submitted = StudentExamSubmission.objects.get(pk=self.submission.pk)
+        self.assertIsNotNone(submitted.submitted_at)
+        self.assertFalse(submit_answers(submitted))
+        with self.assertRaises(ValueError):
+            autosave_answers(submitted, [self.answer(0, 0)])
+
+    def test_late_flushes_skip_submitted_answers(self):
+        stale = StudentExamSubmission.objects.get(pk=self.submission.pk)
+        autosave_answers(self.submission, [self.answer(0, 0)])
+        with self.captureOnCommitCallbacks(execute=True):
+            submit_answers(self.submission)
+        # an autosave that passed its check before the submit
+        cache.set(AUTOSAVE_ANSWER_KEY.format(submission_id=stale.pk, question_id=self.questions[0].pk), {
+            'choice': self.choices[0][1].pk, 'text': None,
+        })
+        self.assertEqual(flush_answers(stale), 0)
+        self.assertEqual(flush_recent_exam_autosaves(), 0)
+        self.assertEqual(self.stored(), {self.questions[0].pk: self.choices[0][0].pk})
+
+    def test_periodic_sweep_flushes_open_and_just_closed_exams(self):
+        autosave_answers(self.submission, [self.answer(0, 0)])
+        autosave_answers(self.submission, [self.answer(0, 1)])
+        just_closed = self.exam.scheduled_date + datetime.timedelta(minutes=90)
+        self.assertEqual(flush_recent_exam_autosaves(now=just_closed), 1)
+        self.assertEqual(self.stored(), {self.questions[0].pk: self.choices[0][1].pk})
+
+        autosave_answers(self.submission, [self.answer(0, 0)])
+        long_closed = self.exam.scheduled_date + datetime.timedelta(minutes=200)
+        self.assertEqual(flush_recent_exam_autosaves(now=long_closed), 0)
+
+    def test_paper_is_dropped_after_commit(self):
+        self.assertEqual(len(get_exam_paper(self.exam.pk)['sections'][0]['questions']), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            ExamQuestion.objects.create(section=self.questions[0].section, question_text='Q2', is_mcq=False, max_score=Decimal('5'))
+            # readers keep the committed paper until the transaction ends
+            self.assertEqual(len(get_exam_paper(self.exam.pk)['sections'][0]['questions']), 2)
+        self.assertEqual(len(get_exam_paper(self.exam.pk)['sections'][0]['questions']), 3)
+        self.assertEqual(len(exam_question_choices(self.exam.pk)), 3)
+
+    def test_item_analysis_follows_choice_changes(self):
+        answer = ExamAnswer.objects.create(
+            submission=self.submission, question=self.questions[0], selected_choice=self.choices[0][0],
+        )
+        picked = lambda analysis: [choice['count'] for choice in analysis['items'][0]['distractors']]
+        self.assertEqual(picked(get_item_analysis(self.exam)), [1, 0])
+        # same number of answers and same (empty) score
+        ExamAnswer.objects.filter(pk=answer.pk).update(selected_choice=self.choices[0][1])
+        self.assertEqual(picked(get_item_analysis(self.exam)), [0, 1])
+
+    def test_item_analysis_needs_the_view_permission(self):
+        user = User.objects.create(username='staff', email='staff@example.com', phone_number='0999', is_staff=True)
+        request = RequestFactory().get('/')
+        request.user = user
+        exam_admin = admin.site._registry[Exam]
+        with self.assertRaises(PermissionDenied):
+            exam_admin.item_analysis_view(request, self.exam.pk)
+
+        user.user_permissions.add(Permission.objects.get(codename='view_exam', content_type__app_label='academic'))
+        request.user = User.objects.get(pk=user.pk)
+        self.assertEqual(exam_admin.item_analysis_view(request, self.exam.pk).status_code, 200)
+
+
+class GradeDistributionTests(AcademicTestCase):
+    def setUp(self):
+        invalidate_grade_bands()
+        scale = GradeScale.objects.create(name='Default', is_default=True)
+        self.passing = Grade.objects.create(scale=scale, Letter='A', description='A', points=4, min_percent=50, max_percent=100)
+        self.semester_course = self.make_semester_course()
+        self.group = StudentGroup.objects.create(name='A', semester=self.semester, program=self.program, level=self.level)
+        user = User.objects.create(username='instructor', email='instructor@example.com', phone_number='0888')
+        self.instructor = FacultyMember.objects.create(user=user, Faculty_id='F001')
+
+    def grade(self, student):
+        return StudentGrade.objects.create(
+            student=student, semester_course=self.semester_course, semester=self.semester,
+            grade=self.passing, numeric_value=Decimal('80'), grade_points=Decimal('4'),
+        )
+
+    def instructors(self):
+        return dict(GradeDistribution.objects.filter(
+            semester_course=self.semester_course,
+        ).values_list('instructor_id', 'count'))
+
+    def test_grades_are_credited_to_the_section_instructor(self):
+        student, outsider = self.make_student(), self.make_student()
+        StudentGroupMembership.objects.create(group=self.group, student=student)
+        with self.captureOnCommitCallbacks(execute=True):
+            GroupSchedule.objects.create(
+                group=self.group, semester_course=self.semester_course, instructor=self.instructor,
+                day='sunday', start_time=datetime.time(8), end_time=datetime.time(10),
+            )
+            # finalized in bulk, without a grader
+            self.grade(student)
+            self.grade(outsider)
+        self.assertEqual(self.instructors(), {self.instructor.pk: 1, None: 1})
+
+    def test_instructor_changes_refresh_the_distribution(self):
+        student = self.make_student()
+        StudentGroupMembership.objects.create(group=self.group, student=student)
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule = GroupSchedule.objects.create(
+                group=self.group, semester_course=self.semester_course,
+                day='sunday', start_time=datetime.time(8), end_time=datetime.time(10),
+            )
+            self.grade(student)
+        self.assertEqual(self.instructors(), {None: 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.instructor = self.instructor
+            schedule.save()
+        self.assertEqual(self.instructors(), {self.instructor.pk: 1})
+
+
+class CreditCounterTests(AcademicTestCase):
+    Status = CourseRegistration.RegistrationStatus
+
+    def setUp(self):
+        self.student = self.make_student()
+        plan = self.make_semester_plan()
+        self.courses = [self.make_semester_course(credits=credits, semester_plan=plan) for credits in (3, 2)]
+        self.registration = self.register(self.student, *self.courses)
+
+    def total(self):
+        return SemesterRegistration.objects.get(pk=self.registration.pk).total_credits
+
+    def course_registration(self, index=0):
+        return CourseRegistration.objects.get(semester_registration=self.registration, semester_course=self.courses[index])
+
+    def test_saves_follow_the_status(self):
+        self.assertEqual(self.total(), 5)
+        registration = self.course_registration()
+        registration.status = self.Status.dropped
+        registration.save()
+        self.assertEqual(self.total(), 2)
+        registration.status = self.Status.Registered
+        registration.save()
+        self.assertEqual(self.total(), 5)
+        self.course_registration(1).delete()
+        self.assertEqual(self.total(), 3)
+
+    def test_deferred_status_is_recounted(self):
+        registration = CourseRegistration.objects.only('id', 'semester_registration', 'semester_course').get(
+            pk=self.course_registration().pk,
+        )
+        CourseRegistration.objects.filter(pk=registration.pk).update(status=self.Status.withdrawn)
+        registration.save(update_fields=['semester_course'])
+        self.assertEqual(self.total(), 2)
+
+    def test_drift_is_recounted_not_clamped(self):
+        SemesterRegistration.objects.filter(pk=self.registration.pk).update(total_credits=1)
+        with self.assertLogs('universityApps.academic.models.enrollments', 'WARNING'):
+            self.course_registration(1).delete()
+        self.assertEqual(self.total(), 3)
+
+    def test_bulk_paths_recount(self):
+        CourseRegistration.objects.bulk_update([
+            CourseRegistration(pk=self.course_registration().pk, status=self.Status.failed),
+        ], ['status'])
+        self.assertEqual(self.total(), 2)
+        CourseRegistration.objects.filter(semester_registration=self.registration).update(status=self.Status.completed)
+        self.assertEqual(self.total(), 5)
+        CourseRegistration.objects.filter(semester_course=self.courses[1]).delete()
+        self.assertEqual(self.total(), 3)
+
+    def test_finalize_semester_drops_failed_credits(self):
+        invalidate_grade_bands()
+        scale = GradeScale.objects.create(name='Default', is_default=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.create(scale=scale, Letter='A', description='A', points=4, min_percent=50, max_percent=100)
+            Grade.objects.create(scale=scale, Letter='F', description='F', points=0, min_percent=0,
+                                 max_percent=Decimal('49.99'), is_passing=False)
+        for semester_course, score in zip(self.courses, ('90', '20')):
+            component = GradeComponent.objects.create(
+                semester_course=semester_course, name='Final', type='Final', weight=Decimal('100'), max_score=Decimal('100'),
+            )
+            ComponoentScore.objects.create(student=self.student, component=component, score=Decimal(score))
+
+        report = finalize_semester(self.semester)
+        self.assertEqual((report['completed'], report['failed']), (1, 1))
+        self.assertEqual(self.total(), 3)
+
+    def test_complete_and_fail_record_the_grade(self):
+        invalidate_grade_bands()
+        scale = GradeScale.objects.create(name='Default', is_default=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.create(scale=scale, Letter='A', description='A', points=4, min_percent=50, max_percent=100)
+            Grade.objects.create(scale=scale, Letter='F', description='F', points=0, min_percent=0,
+                                 max_percent=Decimal('49.99'), is_passing=False)
+
+        passed, failed = self.course_registration(0), self.course_registration(1)
+        self.assertTrue(passed.complete(Decimal('75')))
+        self.assertTrue(failed.fail(Decimal('30')))
+        self.assertFalse(failed.fail(Decimal('30')))
+
+        grades = StudentGrade.objects.filter(student=self.student, semester=self.semester)
+        self.assertEqual(
+            sorted(grades.values_list('semester_course_id', 'grade__Letter', 'numeric_value', 'grade_points')),
+            sorted([
+                (self.courses[0].pk, 'A', Decimal('75.00'), Decimal('4.00')),
+                (self.courses[1].pk, 'F', Decimal('30.00'), Decimal('0.00')),
+            ]),
+        )
+        self.assertEqual(self.course_registration(0).grade, grades.get(semester_course=self.courses[0]))
+        self.assertEqual(self.course_registration(1).status, self.Status.failed)
+        self.assertEqual(self.total(), 3)
+
+
+class SemesterSummaryTests(AcademicTestCase):
+    def setUp(self):
+        invalidate_grade_bands()
+        scale = GradeScale.objects.create(name='Default', is_default=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grades = {
+                letter: Grade.objects.create(scale=scale, Letter=letter, description=letter, points=points,
+                                             min_percent=low, max_percent=high, is_passing=points > 0)
+                for letter, points, low, high in (
+                    ('A', 4, 90, 100), ('B', 3, 70, Decimal('89.99')), ('F', 0, 0, Decimal('69.99')),
+                )
+            }
+        self.second_semester = self.make_semester('2')
+        Semester.objects.filter(pk=self.second_semester.pk).update(
+            start_date=self.semester.start_date + datetime.timedelta(days=120),
+        )
+        self.second_semester.refresh_from_db()
+
+        plan = self.make_semester_plan()
+        self.students = [self.make_student() for _ in range(2)]
+        # (credits, letter per student) for each semester
+        self.take(self.semester, plan, [(3, 'A', 'B'), (2, 'F', 'A')])
+        self.take(self.second_semester, plan, [(3, 'B', 'F'), (2, 'A', 'A')])
+
+    def take(self, semester, plan, courses):
+        for credits, *letters in courses:
+            semester_course = self.make_semester_course(credits=credits, semester_plan=plan)
+            for student, letter in zip(self.students, letters):
+                self.register(student, semester_course, semester=semester)
+                StudentGrade.objects.create(
+                    student=student, semester_course=semester_course, semester=semester,
+                    grade=self.grades[letter], numeric_value=95,
+                )
+
+    def assertMatchesGpas(self, summaries):
+        self.assertEqual(len(summaries), 4)
+        for semester in (self.semester, self.second_semester):
+            expected = StudentGrade.calculate_gpas(semester=semester)
+            for student in self.students:
+                summary = summaries[(student.pk, semester.pk)]
+                self.assertEqual(float(summary.semester_gpa), expected[student.pk]['gpa'])
+                self.assertEqual(float(summary.cumulative_gpa), expected[student.pk]['cgpa'])
+                self.assertEqual(summary.credits_attempted, 5)
+
+    def stored(self):
+        return {(row.student_id, row.semester_id): row for row in StudentSemesterSummary.objects.all()}
+
+    def test_rebuild_matches_calculate_gpas(self):
+        StudentSemesterSummary.rebuild(students=self.students)
+        summaries = self.stored()
+        self.assertMatchesGpas(summaries)
+
+        first = summaries[(self.students[0].pk, self.semester.pk)]
+        self.assertEqual((first.credits_earned, first.gpa_credits, first.quality_points), (3, 5, Decimal('12.00')))
+        last = summaries[(self.students[1].pk, self.second_semester.pk)]
+        self.assertEqual((last.credits_earned, last.cumulative_credits_earned), (2, 7))
+
+    def test_rebuild_replaces_stale_rows(self):
+        StudentSemesterSummary.rebuild(students=self.students[:1])
+        StudentGrade.objects.filter(student=self.students[0], grade__Letter='F').update(
+            grade=self.grades['B'], grade_points=3,
+        )
+        StudentSemesterSummary.rebuild(students=self.students[:1])
+        summary = StudentSemesterSummary.objects.get(student=self.students[0], semester=self.semester)
+        self.assertEqual(summary.semester_gpa, Decimal('3.60'))
+        self.assertEqual(StudentSemesterSummary.objects.count(), 2)
+
+    def test_command(self):
+        with self.assertRaises(CommandError):
+            call_command('rebuild_semester_summaries', academic_year=0, stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('rebuild_semester_summaries', academic_year=self.academic_year.pk, stdout=out)
+        self.assertIn('4 semester summaries rebuilt', out.getvalue())
+        self.assertMatchesGpas(self.stored())
+
+
+class FinalizationTests(AcademicTestCase):
+    def setUp(self):
+        invalidate_grade_bands()
+        scale = GradeScale.objects.create(name='Default', is_default=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.passing = Grade.objects.create(scale=scale, Letter='A', description='A', points=4, min_percent=50, max_percent=100)
+            Grade.objects.create(scale=scale, Letter='F', description='F', points=0, min_percent=0,
+                                 max_percent=Decimal('49.99'), is_passing=False)
+        self.student = self.make_student()
+        self.semester_course = self.make_semester_course()
+        self.register(self.student, self.semester_course)
+        for weight, max_score, score in (('25', '40', '19.99'), ('75', '100', '50')):
+            component = GradeComponent.objects.create(
+                semester_course=self.semester_course, name=f'Part {weight}', type='Final',
+                weight=Decimal(weight), max_score=Decimal(max_score),
+            )
+            ComponoentScore.objects.create(student=self.student, component=component, score=Decimal(score))
+
+    def test_totals_match_the_stored_grade(self):
+        # 19.99/40 at weight 25 is 12.495, stored half-up as 12.50; a float rounding gives 12.49 and an F
+        finalized = StudentGrade.objects.get(student=self.student, semester_course=self.semester_course)
+        self.assertEqual((finalized.numeric_value, finalized.grade), (Decimal('50.00'), self.passing))
+
+        _registrations, totals, complete, grades = compute_semester_results(self.semester)
+        self.assertEqual(totals.tolist(), [5000])
+        self.assertEqual((complete.tolist(), grades), ([True], [self.passing]))
+
+        finalized.delete()
+        report = finalize_semester(self.semester)
+        self.assertEqual(report['distribution'], {'A': 1})
+        self.assertEqual(
+            StudentGrade.objects.values_list('numeric_value', 'grade').get(),
+            (finalized.numeric_value, finalized.grade_id),
+        )
+
+
+class CohortRegistrationTests(AcademicTestCase):
+    def setUp(self):
+        self.summer = self.make_semester(str(SEMESTER_TYPE.SUMMER))
+        plan = self.make_semester_plan(semester_type=SEMESTER_TYPE.SUMMER)
+        for _ in range(2):
+            self.make_semester_course(credits=3, semester_plan=plan)
+        self.group = StudentGroup.objects.create(name='S', semester=self.summer, program=self.program, level=self.level)
+        self.student = self.make_student()
+        StudentGroupMembership.objects.create(group=self.group, student=self.student)
+        StudentEnrollment.objects.create(student=self.student, program=self.program, study_plan=self.study_plan)
+
+    def test_summer_uses_the_summer_limits(self):
+        # 6 credits: below the regular minimum of 12, within the summer maximum
+        settings = self.program.programsettings
+        settings.max_summer_credits = 6
+        settings.save()
+        result = register_cohort(self.summer, group=self.group)
+        self.assertEqual(result.registered, [self.student.pk])
+        self.assertEqual(SemesterRegistration.objects.get(student=self.student).total_credits, 6)
+
+    def test_summer_maximum(self):
+        settings = self.program.programsettings
+        settings.max_summer_credits = 5
+        settings.save()
+        result = register_cohort(self.summer, group=self.group)
+        self.assertEqual(result.skipped, {self.student.pk: "6 credits above the maximum of 5"})
+
+
+class EligibilityTests(AcademicTestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_grade_bands()
+        scale = GradeScale.objects.create(name='Default', is_default=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pass_grade = Grade.objects.create(scale=scale, Letter='D', description='D', points=1, min_percent=50, max_percent=100)
+            Grade.objects.create(scale=scale, Letter='F', description='F', points=0, min_percent=0,
+                                 max_percent=Decimal('49.99'), is_passing=False)
+            plan = self.make_semester_plan()
+            self.basics, self.advanced = [self.make_semester_course(semester_plan=plan) for _ in range(2)]
+            self.advanced.course.prerequisites.add(self.basics.course)
+        self.student = self.make_student()
+
+    def eligible(self):
+        return eligible_semester_courses(self.student, [self.advanced])
+
+    def pass_basics(self):
+        component = GradeComponent.objects.create(
+            semester_course=self.basics, name='Final', type='Final', weight=Decimal('100'), max_score=Decimal('100'),
+        )
+        # one committed transaction: registration, score and finalization
+        with self.captureOnCommitCallbacks(execute=True):
+            self.register(self.student, self.basics)
+            ComponoentScore.objects.create(student=self.student, component=component, score=Decimal('70'))
+            StudentGrade.finalize_many(self.basics)
+
+    def test_bulk_finalization_refreshes_the_bitsets(self):
+        self.assertEqual(self.eligible(), [])
+        self.pass_basics()
+        self.assertEqual(self.eligible(), [self.advanced.pk])
+
+    def test_grade_bands_refresh_the_bitsets(self):
+        self.pass_basics()
+        self.assertEqual(self.eligible(), [self.advanced.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pass_grade.is_passing = False
+            self.pass_grade.save()
+        self.assertEqual(self.eligible(), [])
+
+    def test_index_is_loaded_once_per_version(self):
+        index = get_prerequisite_index()
+        with mock.patch.object(cache, 'get', wraps=cache.get) as get:
+            self.assertIs(get_prerequisite_index(), index)
+        get.assert_called_once_with(PREREQUISITE_VERSION_KEY)
+
+
+class SeatReservationTests(AcademicTestCase):
+    def setUp(self):
+        self.group = StudentGroup.objects.create(
+            name='A', semester=self.semester, program=self.program, level=self.level, max_students=1,
+        )
+        self.first, self.second = self.make_student(), self.make_student()
+
+    def seats(self):
+        self.group.refresh_from_db(fields=['member_count', 'reserved_seats'])
+        return self.group.member_count, self.group.reserved_seats
+
+    def test_full_groups_queue_requests(self):
+        held = reserve_seat(self.first, self.group)
+        queued = reserve_seat(self.second, self.group)
+        self.assertEqual((held.status, queued.status), (SeatReservation.Status.Held, SeatReservation.Status.Queued))
+        self.assertEqual(queue_position(queued), 1)
+        self.assertEqual(reserve_seat(self.second, self.group), queued)
+        self.assertEqual(self.seats(), (0, 1))
+
+        self.assertTrue(release_seat(held))
+        self.assertEqual(process_seat_queue(self.group.pk), 1)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, SeatReservation.Status.Held)
+        self.assertEqual(self.seats(), (0, 1))
+
+    def test_confirmed_holds_become_memberships(self):
+        held = reserve_seat(self.first, self.group)
+        self.assertTrue(confirm_seat(held))
+        self.assertTrue(StudentGroupMembership.objects.filter(student=self.first, group=self.group).exists())
+        self.assertEqual(self.seats(), (1, 1))
+        self.assertFalse(release_seat(held))
+
+    def test_members_do_not_take_a_second_seat(self):
+        held = reserve_seat(self.first, self.group)
+        self.assertTrue(confirm_seat(held))
+        with self.assertRaises(ValueError):
+            reserve_seat(self.first, self.group)
+        self.assertEqual(self.seats(), (1, 1))
+
+    def test_confirming_after_joining_frees_the_hold(self):
+        self.group.max_students = 2
+        self.group.save()
+        held = reserve_seat(self.first, self.group)
+        StudentGroupMembership.objects.create(group=self.group, student=self.first)
+        self.assertEqual(self.seats(), (1, 2))
+        with mock.patch('universityApps.academic.seats.schedule_seat_queue') as scheduled:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertTrue(confirm_seat(held))
+        scheduled.assert_called_once_with(self.group.pk)
+        self.assertEqual(self.seats(), (1, 1))
+
+    def test_expired_holds_free_their_seats(self):
+        held = reserve_seat(self.first, self.group)
+        later = timezone.now() + datetime.timedelta(days=1)
+        self.assertEqual(expire_holds(later), [self.group.pk])
+        held.refresh_from_db()
+        self.assertEqual(held.status, SeatReservation.Status.Expired)
+        self.assertFalse(confirm_seat(held))
+        self.assertEqual(self.seats(), (0, 0))
+
+    def test_registration_must_be_open(self):
+        closed = self.make_semester('2', registration_open=False)
+        group = StudentGroup.objects.create(name='B', semester=closed, program=self.program, level=self.level)
+        with self.assertRaises(ValueError):
+            reserve_seat(self.first, group)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import get_academic_levels, create_study_plan_view, watch_live,end_session,go_live,export_attendance_csv,upcoming_live_lectures
+from .views import get_academic_levels, create_study_plan_view, watch_live,end_session,go_live,export_attendance_csv,upcoming_live_lectures,exam_paper,exam_autosave,exam_submit,seat_reserve,seat_reservation_status,seat_confirm,seat_release
 
 urlpatterns = [
     path('ajax/get-academic-levels/', get_academic_levels, name='get_academic_levels'),
@@ -10,5 +10,12 @@ urlpatterns = [
     path('instructor/end-session/<int:schedule_id>/', end_session, name='end_session'),
     path('student/upcoming-live/', upcoming_live_lectures, name='upcoming_live_lectures'),
     path('instructor/export-attendance/<int:broadcast_id>/', export_attendance_csv, name='export_attendance'),
+    path('exams/submissions/<int:submission_id>/paper/', exam_paper, name='exam_paper'),
+    path('exams/submissions/<int:submission_id>/autosave/', exam_autosave, name='exam_autosave'),
+    path('exams/submissions/<int:submission_id>/submit/', exam_submit, name='exam_submit'),
+    path('groups/<int:group_id>/reserve/', seat_reserve, name='seat_reserve'),
+    path('seats/<int:reservation_id>/', seat_reservation_status, name='seat_reservation_status'),
+    path('seats/<int:reservation_id>/confirm/', seat_confirm, name='seat_confirm'),
+    path('seats/<int:reservation_id>/release/', seat_release, name='seat_release'),
 
 ]
@@ -12,7 +12,13 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.shortcuts import render, get_object_or_404, redirect
 from .models import LectureBroadcast, GroupSchedule
 import csv
+import json
 from django.http import HttpResponse
+from django.views.decorators.http import require_POST
+from .exams import autosave_answers, is_exam_open, paper_for_student, submit_answers
+from .models import StudentExamSubmission
+from .models import SeatReservation, StudentGroup
+from .seats import confirm_seat, queue_position, release_seat, reserve_seat
 
 @login_required
 @user_passes_test(lambda u: u.groups.filter(name='Instructors').exists())
@@ -204,3 +210,102 @@ def create_study_plan_view(request):
     }
 
     return render(request, 'academic/study_plan_form.html', context)
+
+
+def _student_submission(request, submission_id):
+    return get_object_or_404(
+        StudentExamSubmission.objects.select_related('exam'),
+        id=submission_id,
+        student__user=request.user,
+    )
+
+
+@login_required
+def exam_paper(request, submission_id):
+    """ورقة الامتحان للطالب من الكاش، بترتيب أسئلة وخيارات خاص به"""
+    submission = _student_submission(request, submission_id)
+    if submission.exam.scheduled_date > timezone.now():
+        return JsonResponse({'error': 'exam_not_started'}, status=409)
+    return JsonResponse(paper_for_student(submission.exam_id, submission.student_id))
+
+
+@login_required
+@require_POST
+def exam_autosave(request, submission_id):
+    """حفظ تلقائي لإجابات الطالب أثناء الامتحان (JSON: {"answers": [...]})"""
+    submission = _student_submission(request, submission_id)
+    if submission.submitted_at is not None:
+        return JsonResponse({'error': 'already_submitted'}, status=409)
+    if not is_exam_open(submission.exam):
+        return JsonResponse({'error': 'exam_closed'}, status=409)
+
+    try:
+        payload = json.loads(request.body or b'{}')
+        flushed = autosave_answers(submission, payload.get('answers', []))
+    except (ValueError, KeyError, TypeError) as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse({'saved': True, 'flushed': flushed})
+
+
+@login_required
+@require_POST
+def exam_submit(request, submission_id):
+    """التسليم النهائي: كتابة الإجابات المخزنة مؤقتًا في قاعدة البيانات"""
+    submission = _student_submission(request, submission_id)
+    if not submit_answers(submission):
+        return JsonResponse({'error': 'already_submitted'}, status=409)
+    return JsonResponse({'submitted': True, 'submitted_at': submission.submitted_at.isoformat()})
+
+
+def _reservation_payload(reservation):
+    return {
+        'id': reservation.pk,
+        'group': reservation.group_id,
+        'status': reservation.status,
+        'expires_at': reservation.expires_at.isoformat() if reservation.expires_at else None,
+        'queue_position': queue_position(reservation),
+    }
+
+
+def _student_reservation(request, reservation_id):
+    return get_object_or_404(SeatReservation, id=reservation_id, student__user=request.user)
+
+
+@login_required
+@require_POST
+def seat_reserve(request, group_id):
+    """حجز مقعد في مجموعة: يعيد الحجز (محجوز مؤقتًا أو في قائمة الانتظار)"""
+    group = get_object_or_404(StudentGroup.objects.select_related('semester'), id=group_id)
+    student = getattr(request.user, 'student', None)
+    if student is None:
+        return HttpResponseForbidden()
+    try:
+        reservation = reserve_seat(student, group)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=409)
+    return JsonResponse(_reservation_payload(reservation))
+
+
+@login_required
+def seat_reservation_status(request, reservation_id):
+    return JsonResponse(_reservation_payload(_student_reservation(request, reservation_id)))
+
+
+@login_required
+@require_POST
+def seat_confirm(request, reservation_id):
+    """تأكيد المقعد المحجوز قبل انتهاء مدة الحجز"""
+    reservation = _student_reservation(request, reservation_id)
+    if not confirm_seat(reservation):
+        return JsonResponse({'error': 'hold_expired'}, status=409)
+    reservation.refresh_from_db()
+    return JsonResponse(_reservation_payload(reservation))
+
+
+@login_required
+@require_POST
+def seat_release(request, reservation_id):
+    reservation = _student_reservation(request, reservation_id)
+    release_seat(reservation)
+    reservation.refresh_from_db()
+    return JsonResponse(_reservation_payload(reservation))
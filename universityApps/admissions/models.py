@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -6,6 +6,7 @@ from django.contrib.auth import get_user_model
 from .utils import (
     send_acceptance_email, 
     generate_student_id,
+    generate_student_ids,
     application_document_upload_path,
     send_rejection_email,
     )
@@ -65,8 +66,11 @@ class AdmissionApplication(models.Model):
     
     def generate_username(self):
         base=self.full_name().lower().replace(' ','')
-        shor_code= self.program.department.dept_no[2:]
-        return f"{base[:7]}{int(timezone.now().timestamp()) % 10000}"
+        suffix = int(timezone.now().timestamp()) % 10000
+        # a whole intake is accepted within the same second
+        while User.objects.filter(username=f"{base[:7]}{suffix}").exists():
+            suffix += 1
+        return f"{base[:7]}{suffix}"
     
     def start_review(self, reviewed_by):
         """Starts the application review process"""
@@ -86,8 +90,8 @@ class AdmissionApplication(models.Model):
             return True
         return False
     
-    def accept(self,reviewed_by=None):
-        from users.models import Student,StudentDocument,Roles
+    def accept(self,reviewed_by=None, student_id=None):
+        from universityApps.users.models import Student,StudentDocument,Roles
         username=self.generate_username()
         password=self.national_id
 
@@ -103,7 +107,7 @@ class AdmissionApplication(models.Model):
             phone_number=self.phone_number,
             date_of_birth=self.birth_date,
         )
-        student_id = generate_student_id( self.program )
+        student_id = student_id or generate_student_id( self.program )
         # Create student
         student = Student.objects.create(
             user=user,
@@ -130,7 +134,23 @@ class AdmissionApplication(models.Model):
         self.reviewed_by = reviewed_by
         self.reviewed_date = timezone.now()
         self.save(update_fields=['status', 'reviewed_by', 'reviewed_date'])
-        send_acceptance_email(self.email, self.full_name, self.program.name, username)
+        send_acceptance_email(self.email, self.full_name(), self.program.name, username)
+
+    @classmethod
+    def accept_many(cls, applications, reviewed_by=None):
+        """Accepts a whole intake, reserving the student IDs of each program in one block"""
+        by_program = {}
+        for application in applications:
+            by_program.setdefault(application.program_id, []).append(application)
+
+        accepted = []
+        for group in by_program.values():
+            student_ids = generate_student_ids(group[0].program, len(group))
+            for application, student_id in zip(group, student_ids):
+                with transaction.atomic():
+                    application.accept(reviewed_by=reviewed_by, student_id=student_id)
+                accepted.append(application)
+        return accepted
 
     def reject(self , reviewed_by=None, reason=None):
         """ Rejects the application """
@@ -1,3 +1,57 @@
+import datetime
+
+from django.core import mail
 from django.test import TestCase
 
-# Create your tests here.
+from universityApps.colleges.models import College
+from universityApps.core.models import University
+from universityApps.departments.models import Department
+from universityApps.programs.models import AcademicProgram
+from universityApps.users.models import Student, User
+
+from .models import AdmissionApplication
+from .utils import generate_student_ids
+
+
+class StudentIdTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        university = University.objects.create(name='University')
+        college = College.objects.create(university=university, name='Faculty of Science')
+        cls.department = Department.objects.create(name='Computer Science', type='academic', college=college)
+        cls.program = AcademicProgram.objects.create(department=cls.department)
+
+    def add_student(self, student_id):
+        user = User.objects.create(username=f'u{student_id}', email=f'{student_id}@example.com', phone_number=student_id)
+        return Student.objects.create(user=user, student_id=student_id)
+
+    def apply(self, number):
+        return AdmissionApplication.objects.create(
+            first_name='Applicant', last_name=f'Number{number}', email=f'applicant{number}@example.com',
+            phone_number=f'077{number:04}', birth_date=datetime.date(2005, 1, 1), national_id=f'N{number:06}',
+            program=self.program, status=AdmissionApplication.SatusChoices.UNDER_REVIEW,
+        )
+
+    def test_ids_follow_the_highest_serial_of_the_prefix(self):
+        prefix = f"2025{self.department.dept_no}"
+        self.add_student(f"{prefix}004")
+        # a department whose number starts with this one's, and a longer legacy id
+        self.add_student(f"{prefix}9001")
+        self.assertEqual(generate_student_ids(self.program, 3, year=2025), [f"{prefix}005", f"{prefix}006", f"{prefix}007"])
+        self.assertEqual(generate_student_ids(self.program, 1, year=2025), [f"{prefix}008"])
+
+    def test_ids_start_at_one_for_a_new_prefix(self):
+        self.assertEqual(generate_student_ids(self.program, 2, year=2030), [f"2030{self.department.dept_no}001", f"2030{self.department.dept_no}002"])
+
+    def test_accept_many(self):
+        applications = [self.apply(number) for number in range(3)]
+        accepted = AdmissionApplication.accept_many(applications)
+
+        self.assertEqual(accepted, applications)
+        students = list(Student.objects.filter(program=self.program).order_by('student_id'))
+        self.assertEqual(len({student.student_id for student in students}), 3)
+        self.assertEqual(len({student.user.username for student in students}), 3)
+        self.assertEqual(
+            AdmissionApplication.objects.filter(status=AdmissionApplication.SatusChoices.ACCEPTED).count(), 3,
+        )
+        self.assertEqual(len(mail.outbox), 3)
@@ -1,9 +1,11 @@
 import os
+import re
 from django.utils.timezone import now
 from universityApps.users.models import Student
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.db.models import Max
 from django.utils.translation import gettext_lazy as _
 
 def send_acceptance_email(to_email, full_name, program_name, username, student_portal_url=None):
@@ -64,8 +66,39 @@ def application_document_upload_path(instance, original_filename):
     filename = f"{doc_type}_{name}{ext}"
     return os.path.join('Applications', 'documents', name ,doc_type, date_path, filename)
 
-def generate_student_id(program):
-    current_year = now().year
-    count = Student.objects.filter(program=program, admission_date__year=current_year).count() + 1
+STUDENT_SERIAL_WIDTH = 3
+
+
+def _student_id_prefix(program, year):
+    return f"{year}{program.department.dept_no}"
+
+
+def _student_id_seed(prefix):
+    """Highest serial already issued under `prefix`, read once when its counter is created"""
+    # anchored on the serial width: "20251" is also the start of the IDs of departments 10-19
+    pattern = rf"^{re.escape(prefix)}[0-9]{{{STUDENT_SERIAL_WIDTH}}}$"
+    highest = Student.objects.filter(student_id__regex=pattern).aggregate(
+        highest=Max('student_id')
+    )['highest']
+    return int(highest[len(prefix):]) if highest else 0
+
 
-    return f"{current_year}{program.department.dept_no}{count:03}"
\ No newline at end of file
+def generate_student_ids(program, count, year=None):
+    """
+    حجز أرقام جامعية لدفعة كاملة من المقبولين في برنامج واحد.
+    The serials come from one locked counter row, so concurrent reviewers never share an ID.
+    """
+    from universityApps.core.models import NumberingSequence
+    year = year or now().year
+    prefix = _student_id_prefix(program, year)
+    serials = NumberingSequence.allocate_block(
+        key='users.student.student_id',
+        count=count,
+        scope=prefix,
+        seed=lambda: _student_id_seed(prefix),
+    )
+    return [f"{prefix}{serial:0{STUDENT_SERIAL_WIDTH}}" for serial in serials]
+
+
+def generate_student_id(program):
+    return generate_student_ids(program, 1)[0]
@@ -47,15 +47,21 @@ class College(models.Model):
             models.Index(fields=['college_no', 'name'], name='college_college_no_name_idx'),
         ]
     def save(self, *args, **kwargs):
-        numbering = CollegeNumbering()
-        if not self.college_no:
-            # توليد رقم الكلية إذا كان جديداً
-            self.college_no = numbering.generate_college_no()
+        if not self.college_no or (self.name and not self.code):
+            numbering = CollegeNumbering()
+            if not self.college_no:
+                # توليد رقم الكلية إذا كان جديداً
+                self.college_no = numbering.generate_college_no()
 
-        if  self.name and not self.code:
-            self.code = numbering.generate_code(self.name)
+            if  self.name and not self.code:
+                self.code = numbering.generate_code(self.name)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def prepare_bulk(cls, colleges):
+        """Assign numbers and codes to unsaved colleges so they can be passed to bulk_create"""
+        return CollegeNumbering().assign_numbers(colleges)
+
     def is_dean(self, faculty_member):
         # check if the given faculty member is the dean of this college
         return self.dean == faculty_member
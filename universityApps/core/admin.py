@@ -1,7 +1,20 @@
 from django.contrib import admin
-from .models import University
+from .models import University, NumberingSequence, ReleasedNumber
 
 @admin.register(University)
 class UniversityAdmin(admin.ModelAdmin):
     list_display = ('name', 'code')
-    search_fields = ('name', 'code')
\ No newline at end of file
+    search_fields = ('name', 'code')
+
+@admin.register(NumberingSequence)
+class NumberingSequenceAdmin(admin.ModelAdmin):
+    list_display = ('key', 'scope', 'last_value', 'updated_at')
+    list_filter = ('key',)
+    search_fields = ('key', 'scope')
+    readonly_fields = ('updated_at',)
+
+@admin.register(ReleasedNumber)
+class ReleasedNumberAdmin(admin.ModelAdmin):
+    list_display = ('key', 'scope', 'number', 'released_at')
+    list_filter = ('key',)
+    search_fields = ('key', 'scope')
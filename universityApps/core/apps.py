@@ -7,3 +7,4 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         import universityApps.core.preferences
+        import universityApps.core.signals
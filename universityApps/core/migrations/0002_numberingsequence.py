@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NumberingSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Target model and field, e.g. departments.department.dept_no', max_length=150, verbose_name='Sequence Key')),
+                ('scope', models.CharField(blank=True, default='', help_text='Sub-sequence within the key, e.g. the parent id or the type', max_length=100, verbose_name='Scope')),
+                ('last_value', models.BigIntegerField(default=0, help_text='Last number handed out by this sequence', verbose_name='Last Value')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Numbering Sequence',
+                'verbose_name_plural': 'Numbering Sequences',
+                'unique_together': {('key', 'scope')},
+            },
+        ),
+    ]
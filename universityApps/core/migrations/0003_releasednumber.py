@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_numberingsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReleasedNumber',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=150, verbose_name='Sequence Key')),
+                ('scope', models.CharField(blank=True, default='', max_length=100, verbose_name='Scope')),
+                ('number', models.BigIntegerField(verbose_name='Number')),
+                ('released_at', models.DateTimeField(auto_now_add=True, verbose_name='Released At')),
+            ],
+            options={
+                'verbose_name': 'Released Number',
+                'verbose_name_plural': 'Released Numbers',
+                'ordering': ['key', 'scope', 'number'],
+                'unique_together': {('key', 'scope', 'number')},
+            },
+        ),
+    ]
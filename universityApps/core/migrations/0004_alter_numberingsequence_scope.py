@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_releasednumber'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='numberingsequence',
+            name='scope',
+            field=models.CharField(blank=True, default='', help_text='Sub-sequence within the key, e.g. the parent id, the type or a base slug', max_length=255, verbose_name='Scope'),
+        ),
+    ]
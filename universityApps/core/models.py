@@ -1,4 +1,5 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
 from django.utils.translation import gettext_lazy as _
 class University(models.Model):
     name = models.CharField(max_length=255, verbose_name=_("University Name"))
@@ -23,3 +24,94 @@ class UniversityDetail(models.Model):
 
     def __str__(self):
         return f"{self.title}"
+
+
+class NumberingSequence(models.Model):
+    """Counter row used by the numbering system to hand out numbers without scanning the target table"""
+    key = models.CharField(
+        max_length=150,
+        verbose_name=_("Sequence Key"),
+        help_text=_("Target model and field, e.g. departments.department.dept_no")
+    )
+    scope = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        verbose_name=_("Scope"),
+        help_text=_("Sub-sequence within the key, e.g. the parent id, the type or a base slug")
+    )
+    last_value = models.BigIntegerField(
+        default=0,
+        verbose_name=_("Last Value"),
+        help_text=_("Last number handed out by this sequence")
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        verbose_name = _("Numbering Sequence")
+        verbose_name_plural = _("Numbering Sequences")
+        unique_together = ['key', 'scope']
+
+    def __str__(self):
+        return f"{self.key}[{self.scope}] = {self.last_value}"
+
+    @classmethod
+    def _get_locked(cls, key, scope, seed):
+        """Get the sequence row under a row lock, creating it from `seed` on first use"""
+        sequence = cls.objects.select_for_update().filter(key=key, scope=scope).first()
+        if sequence is not None:
+            return sequence
+        try:
+            with transaction.atomic():
+                return cls.objects.create(
+                    key=key,
+                    scope=scope,
+                    last_value=(seed() if callable(seed) else seed) or 0,
+                )
+        except IntegrityError:
+            # another worker created the row first, wait for its lock
+            return cls.objects.select_for_update().get(key=key, scope=scope)
+
+    @classmethod
+    def allocate(cls, key, scope='', seed=None, min_value=1, max_value=None):
+        """
+        Atomically reserve the next value of the (key, scope) sequence.
+        `seed` (a value or a callable) gives the current maximum the first time the
+        sequence is used, so existing rows are never handed out again.
+        """
+        return cls.allocate_block(key, 1, scope, seed, min_value, max_value)[0]
+
+    @classmethod
+    def allocate_block(cls, key, count, scope='', seed=None, min_value=1, max_value=None):
+        """Atomically reserve `count` contiguous values of the (key, scope) sequence"""
+        if count < 1:
+            raise ValueError("count must be a positive integer.")
+        scope = str(scope)
+        with transaction.atomic():
+            sequence = cls._get_locked(key, scope, seed)
+            first = max(sequence.last_value + 1, min_value)
+            last = first + count - 1
+            if max_value is not None and last > max_value:
+                raise ValidationError(
+                    _("The maximum allowed number (%(max)s) has been reached."),
+                    params={'max': max_value},
+                )
+            cls.objects.filter(pk=sequence.pk).update(last_value=last)
+        return list(range(first, last + 1))
+
+
+class ReleasedNumber(models.Model):
+    """Free-list of numbers given back when a row is deleted, reused before searching for gaps"""
+    key = models.CharField(max_length=150, verbose_name=_("Sequence Key"))
+    scope = models.CharField(max_length=100, blank=True, default='', verbose_name=_("Scope"))
+    number = models.BigIntegerField(verbose_name=_("Number"))
+    released_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Released At"))
+
+    class Meta:
+        verbose_name = _("Released Number")
+        verbose_name_plural = _("Released Numbers")
+        unique_together = ['key', 'scope', 'number']
+        ordering = ['key', 'scope', 'number']
+
+    def __str__(self):
+        return f"{self.key}[{self.scope}] #{self.number}"
@@ -1,5 +1,5 @@
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connection, models, transaction
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 from .patterns import (
@@ -20,7 +20,8 @@ class BaseNumberingSystem:
         min_value=1,
         max_value=999,
         padding=3,
-        ignored_words=None
+        ignored_words=None,
+        reuse_released=False
     ):
         self.pattern = pattern
         self.prefix = prefix
@@ -30,97 +31,217 @@ class BaseNumberingSystem:
         self.max_value = max_value
         self.padding = padding
         self.ignored_words = ignored_words or {'and','in','on', 'of', 'the', 'في', 'من', 'ال', 'و'}
+        self.reuse_released = reuse_released
 
     def generate_number(self, model_class, **kwargs):
         self.target_field = kwargs.get('field', 'number')
 
+        if self.pattern == NumberingPattern.NAME_BASED:
+            return self._generate_name_based(model_class, **kwargs)
+
+        elif self.pattern == NumberingPattern.CUSTOM:
+            return kwargs.get('pattern', '')
+
+        return self.reserve_block(model_class, 1, **kwargs)[0]
+
+    def reserve_block(self, model_class, count, **kwargs):
+        """
+        Reserve `count` numbers in one round trip, e.g. to pre-assign them before bulk_create.
+        Accepts the same keyword arguments as generate_number.
+        """
+        self.target_field = kwargs.get('field', 'number')
+
         if self.pattern == NumberingPattern.NUMERIC:
-            return self._generate_numeric(model_class)
+            return self._generate_numeric(model_class, count)
 
         elif self.pattern == NumberingPattern.AdministrativedepartNumber:
-            return self.generate_Admindepartmentnumber(model_class)
+            return self._free_numbers(model_class, count, kwargs.get('filters', {}))
+
         elif self.pattern == NumberingPattern.ALPHA:
-            return self._generate_alpha(model_class)
+            return self._generate_alpha(model_class, count)
 
         elif self.pattern == NumberingPattern.ALPHANUMERIC:
-            return self._generate_alphanumeric(model_class, **kwargs)
-
-        elif self.pattern == NumberingPattern.NAME_BASED:
-            return self._generate_name_based(model_class, **kwargs)
+            return self._generate_alphanumeric(model_class, count, **kwargs)
 
         elif self.pattern == NumberingPattern.PARENT_BASED:
-            return self._generate_parent_based(model_class, **kwargs)
-
-        elif self.pattern == NumberingPattern.CUSTOM:
-            return kwargs.get('pattern', '')
+            return self._generate_parent_based(model_class, count, **kwargs)
 
         raise ValidationError(f"Unsupported numbering pattern: {self.pattern}")
 
-    def _generate_numeric(self, model_class):
-        max_value = model_class.objects.aggregate(
+    def _sequence_key(self, model_class):
+        return f"{model_class._meta.label_lower}.{self.target_field}"
+
+    def _next_in_sequence(self, model_class, count=1, scope='', seed=None, min_value=1, max_value=None):
+        """Take the next `count` numbers from the counter table instead of scanning the target table"""
+        from universityApps.core.models import NumberingSequence
+        return NumberingSequence.allocate_block(
+            key=self._sequence_key(model_class),
+            count=count,
+            scope=scope,
+            seed=seed,
+            min_value=min_value,
+            max_value=max_value,
+        )
+
+    def _max_of_field(self, model_class, **filters):
+        return model_class.objects.filter(**filters).aggregate(
             max_value=models.Max(self.target_field)
-        )['max_value'] or 0
+        )['max_value']
+
+    def _generate_numeric(self, model_class, count=1):
+        # the aggregate only runs once, to seed the sequence for existing rows
+        return self._next_in_sequence(
+            model_class,
+            count,
+            seed=lambda: self._max_of_field(model_class) or 0,
+            min_value=self.min_value,
+            max_value=self.max_value,
+        )
 
-        new_value = max_value + 1
-        if new_value > self.max_value:
-            raise ValidationError("Maximum allowed number exceeded.")
-        return new_value
     def generate_Admindepartmentnumber(self, model_class, **kwargs):
-        filters = kwargs.get('filters', {})
-        
+        self.target_field = kwargs.get('field', getattr(self, 'target_field', 'number'))
+        return self._free_numbers(model_class, 1, kwargs.get('filters', {}))[0]
+
+    def _gap_scope(self, filters):
+        return ','.join(f"{field}={value}" for field, value in sorted(filters.items()))
+
+    def _free_numbers(self, model_class, count, filters):
+        """Return the `count` lowest unused numbers between min_value and max_value"""
+        from universityApps.core.models import NumberingSequence, ReleasedNumber
+        key = self._sequence_key(model_class)
+        scope = self._gap_scope(filters)
+
+        with transaction.atomic():
+            # the sequence row serialises gap searches of the same scope
+            NumberingSequence._get_locked(key, scope, 0)
+
+            free = []
+            if self.reuse_released:
+                free = self._take_released(model_class, count, key, scope)
+
+            if len(free) < count:
+                if connection.vendor == 'postgresql':
+                    gaps = self._find_gaps_sql(model_class, count - len(free), filters)
+                else:
+                    gaps = self._find_gaps_python(model_class, count - len(free), filters)
+                ReleasedNumber.objects.filter(key=key, scope=scope, number__in=gaps).delete()
+                free = sorted(free + gaps)
+
+        if len(free) < count:
+            raise ValidationError(_(
+                f"The maximum allowed number ({self.max_value}) has been reached."
+            ))
+        return free
+
+    def _take_released(self, model_class, count, key, scope):
+        """Pop the lowest numbers from the free-list, skipping any that were taken meanwhile"""
+        from universityApps.core.models import ReleasedNumber
+        in_use = model_class.objects.filter(**{self.target_field: models.OuterRef('number')})
+        released = list(
+            ReleasedNumber.objects.select_for_update()
+            .filter(key=key, scope=scope, number__gte=self.min_value, number__lte=self.max_value)
+            .exclude(models.Exists(in_use))
+            .order_by('number')
+            .values_list('number', flat=True)[:count]
+        )
+        ReleasedNumber.objects.filter(key=key, scope=scope, number__in=released).delete()
+        return released
+
+    def _find_gaps_sql(self, model_class, count, filters):
+        """Find the lowest gaps with a window function and generate_series in a single query"""
+        column = connection.ops.quote_name(model_class._meta.get_field(self.target_field).column)
+        used = model_class.objects.filter(
+            **filters,
+            **{f"{self.target_field}__gte": self.min_value, f"{self.target_field}__lte": self.max_value}
+        ).values(self.target_field)
+        used_sql, used_params = used.query.sql_with_params()
+
+        sql = f"""
+            SELECT generate_series(gap_start, gap_end) AS number
+            FROM (
+                SELECT value + 1 AS gap_start,
+                       LEAD(value) OVER (ORDER BY value) - 1 AS gap_end
+                FROM (
+                    SELECT %s - 1 AS value
+                    UNION ALL
+                    SELECT used.{column} FROM ({used_sql}) used
+                    UNION ALL
+                    SELECT %s + 1
+                ) bounds
+            ) gaps
+            WHERE gap_start <= gap_end
+            ORDER BY number
+            LIMIT %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [self.min_value, *used_params, self.max_value, count])
+            return [row[0] for row in cursor.fetchall()]
+
+    def _find_gaps_python(self, model_class, count, filters):
+        """Fallback for backends without generate_series (SQLite)"""
         # نجلب الأرقام المستخدمة مرتبة
         used_numbers = model_class.objects.filter(**filters).values_list(self.target_field, flat=True).order_by(self.target_field)
 
+        free = []
         expected = self.min_value
         for num in used_numbers:
-            if num > self.max_value:
+            if num > self.max_value or len(free) == count:
                 break  # تجاوزنا الحد الأعلى المسموح
-            if num > expected:
-                return expected
-            elif num == expected:
+            while expected < num and len(free) < count:
+                free.append(expected)
+                expected += 1
+            if num == expected:
                 expected += 1
 
-        if expected > self.max_value:
-            raise ValidationError(_(
-                f"The maximum allowed number ({self.max_value}) has been reached."
-            ))
-
-        return expected
+        while len(free) < count and expected <= self.max_value:
+            free.append(expected)
+            expected += 1
+        return free
 
-    def _generate_alpha(self, model_class):
-        max_value = model_class.objects.aggregate(
-            max_value=models.Max(self.target_field)
-        )['max_value'] or 0
+    def release_number(self, model_class, number, **kwargs):
+        """Put a number back on the free-list once its row has been deleted"""
+        from universityApps.core.models import ReleasedNumber
+        self.target_field = kwargs.get('field', 'number')
+        if not self.reuse_released or number is None:
+            return
+        ReleasedNumber.objects.get_or_create(
+            key=self._sequence_key(model_class),
+            scope=self._gap_scope(kwargs.get('filters', {})),
+            number=number,
+        )
+
+    def _generate_alpha(self, model_class, count=1):
+        def seed():
+            max_value = self._max_of_field(model_class)
+            if isinstance(max_value, str):
+                return ord(max_value[-1].upper()) - 64 if max_value else 0
+            return max_value or 0
 
-        new_value = max_value + 1
-        if new_value > 26:
+        try:
+            values = self._next_in_sequence(model_class, count, seed=seed, max_value=26)
+        except ValidationError:
             raise ValidationError("Maximum alphabet limit (A-Z) exceeded.")
-        return chr(64 + new_value)  # A=65
+        return [chr(64 + value) for value in values]  # A=65
 
-    def _generate_alphanumeric(self, model_class, **kwargs):
+    def _generate_alphanumeric(self, model_class, count=1, **kwargs):
         prefix = kwargs.get('prefix')
         if not prefix:
             raise ValidationError("Prefix is required for alphanumeric numbering.")
 
-        existing_entries = model_class.objects.filter(
-            **{f"{self.target_field}__startswith": prefix}
-        ).values_list(self.target_field, flat=True)
+        def seed():
+            existing_entries = model_class.objects.filter(
+                **{f"{self.target_field}__startswith": prefix}
+            ).values_list(self.target_field, flat=True)
+            suffixes = [entry[len(prefix):] for entry in existing_entries]
+            return max((int(suffix) for suffix in suffixes if suffix.isdigit()), default=0)
 
-        i = 1
-        while f"{prefix}{str(i).zfill(self.padding)}" in existing_entries:
-            i += 1
+        values = self._next_in_sequence(model_class, count, scope=prefix, seed=seed)
+        return [f"{prefix}{str(i).zfill(self.padding)}" for i in values]
 
-        return f"{prefix}{str(i).zfill(self.padding)}"
     def _generate_name_based(self, model_class, **kwargs):
-        name = kwargs.get('name', '')
-        target_field = kwargs.get('field', 'code')
-        code_format = kwargs.get('code_format', CodeFormatPattern.FIRST_LETTER_EACH_WORD.value)
-        code_length = kwargs.get('code_length', 3)
-        current_type = kwargs.get('type')  # اختياري
-        academic_suffix = kwargs.get('academic_suffix', '-A')
-        admin_suffix = kwargs.get('admin_suffix', '-I')
-        manual_code = kwargs.get('manual_code', '').upper()
+        return self.generate_codes(model_class, [kwargs.get('name', '')], **kwargs)[0]
 
+    def _base_code(self, name, code_format, code_length, manual_code):
         if not name and code_format != CodeFormatPattern.MANUAL.value:
             raise ValidationError("Name is required to generate the code.")
 
@@ -140,31 +261,52 @@ class BaseNumberingSystem:
             base_code = manual_code
         else:
             raise ValidationError(f"Unsupported code format: {code_format}")
+        return base_code
+
+    def generate_codes(self, model_class, names, **kwargs):
+        """
+        Generate name-based codes for a list of names, checking them against the
+        table with two queries whatever the size of the list.
+        """
+        target_field = kwargs.get('field', 'code')
+        code_format = kwargs.get('code_format', CodeFormatPattern.FIRST_LETTER_EACH_WORD.value)
+        code_length = kwargs.get('code_length', 3)
+        current_type = kwargs.get('type')  # اختياري
+        academic_suffix = kwargs.get('academic_suffix', '-A')
+        admin_suffix = kwargs.get('admin_suffix', '-I')
+        manual_code = kwargs.get('manual_code', '').upper()
+
+        base_codes = [self._base_code(name, code_format, code_length, manual_code) for name in names]
 
         # تحقق من وجود النوع الآخر فقط إذا كان الحقل موجودًا
         has_type_field = 'type' in [f.name for f in model_class._meta.fields]
         if has_type_field and current_type:
             other_type = 'administrative' if current_type == 'academic' else 'academic'
-            exists_in_other_type = model_class.objects.filter(name=name, type=other_type).exists()
-            exists_in_same_type = model_class.objects.filter(**{target_field: base_code, 'type': current_type}).exists()
+            names_in_other_type = set(model_class.objects.filter(name__in=names, type=other_type).values_list('name', flat=True))
+            existing_codes = model_class.objects.filter(**{f"{target_field}__in": base_codes, 'type': current_type})
         else:
-            exists_in_other_type = False
-            exists_in_same_type = model_class.objects.filter(**{target_field: base_code}).exists()
-
-        # ممنوع التكرار في نفس النوع
-        if exists_in_same_type:
-            raise ValidationError(f"A code '{base_code}' already exists for this type.")
-
-        # إذا وُجد الاسم في نوع آخر، أضف لاحقة
-        if exists_in_other_type:
-            if current_type == 'academic' and academic_suffix:
-                base_code += academic_suffix
-            elif current_type == 'administrative' and admin_suffix:
-                base_code += admin_suffix
-
-        return base_code
-
-    def _generate_parent_based(self, model_class, **kwargs):
+            names_in_other_type = set()
+            existing_codes = model_class.objects.filter(**{f"{target_field}__in": base_codes})
+        taken_codes = set(existing_codes.values_list(target_field, flat=True))
+
+        codes = []
+        for name, base_code in zip(names, base_codes):
+            # ممنوع التكرار في نفس النوع
+            if base_code in taken_codes:
+                raise ValidationError(f"A code '{base_code}' already exists for this type.")
+            taken_codes.add(base_code)
+
+            # إذا وُجد الاسم في نوع آخر، أضف لاحقة
+            if name in names_in_other_type:
+                if current_type == 'academic' and academic_suffix:
+                    base_code += academic_suffix
+                elif current_type == 'administrative' and admin_suffix:
+                    base_code += admin_suffix
+            codes.append(base_code)
+
+        return codes
+
+    def _generate_parent_based(self, model_class, count=1, **kwargs):
         parent_id = kwargs.get('parent_id')
         parent_field = kwargs.get('parent_field')
 
@@ -184,16 +326,18 @@ class BaseNumberingSystem:
             f"{self.target_field}__lt": prefix + 100
         }
 
-        max_value = model_class.objects.filter(**filter_kwargs).aggregate(
-            max_dep=models.Max(self.target_field)
-        )['max_dep'] or prefix
-
-        new_value = max_value + 1
-        if new_value >= prefix + 100:
+        try:
+            return self._next_in_sequence(
+                model_class,
+                count,
+                scope=parent_id,
+                seed=lambda: self._max_of_field(model_class, **filter_kwargs) or prefix,
+                min_value=prefix + 1,
+                max_value=prefix + 99,
+            )
+        except ValidationError:
             raise ValidationError(f"Maximum number reached for parent ID {parent_id}.")
 
-        return new_value
-
     def format_number(self, number):
         formatted = str(number)
         if self.pattern == NumberingPattern.NUMERIC:
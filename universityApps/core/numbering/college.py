@@ -1,5 +1,6 @@
 import re
 from .base import BaseNumberingSystem
+from .config import get_numbering_config
 from .patterns import (
     NumberingPattern,
     CodeFormatPattern,
@@ -7,9 +8,7 @@ from .patterns import (
 
 class CollegeNumbering:
     def __init__(self):
-        from dynamic_preferences.registries import global_preferences_registry
-
-        global_preferences = global_preferences_registry.manager()
+        global_preferences = get_numbering_config()
 
         self.college_no_config = {
             'pattern': NumberingPattern(global_preferences['numbering__college_pattern']),
@@ -29,21 +28,41 @@ class CollegeNumbering:
 
 
     def generate_college_no(self):
+        return self.reserve_college_nos(1)[0]
+
+    def reserve_college_nos(self, count):
         from universityApps.colleges.models import College
         system = BaseNumberingSystem(**self.college_no_config)
-        number = system.generate_number(
-            model_class=College,
+        numbers = system.reserve_block(
+            College,
+            count,
             field='college_no'
         )
-        return system.format_number(number)
+        return [system.format_number(number) for number in numbers]
 
     def generate_code(self, name):
+        return self.generate_codes([name])[0]
+
+    def generate_codes(self, names):
         from universityApps.colleges.models import College
         system = BaseNumberingSystem(**self.code_config)
-        return system.generate_number(
-            model_class=College,
-            name=name,
+        return system.generate_codes(
+            College,
+            names,
             field='code',
             code_format=self.code_format,
             code_length=self.code_length,
         )
+
+    def assign_numbers(self, colleges):
+        """Fill college_no and code of unsaved colleges, e.g. before bulk_create"""
+        missing_numbers = [college for college in colleges if not college.college_no]
+        if missing_numbers:
+            for college, number in zip(missing_numbers, self.reserve_college_nos(len(missing_numbers))):
+                college.college_no = number
+
+        missing_codes = [college for college in colleges if college.name and not college.code]
+        if missing_codes:
+            for college, code in zip(missing_codes, self.generate_codes([college.name for college in missing_codes])):
+                college.code = code
+        return colleges
@@ -0,0 +1,77 @@
+"""
+Process-wide snapshot of the `numbering` preferences section.
+
+The snapshot is built once and reused by every numbering helper, and is rebuilt
+only after a change to a preference of the section is committed (see core.signals).
+When NUMBERING_CONFIG_CACHE_SYNC is on, a version stamp kept in the cache lets
+the other processes notice the change as well.
+"""
+import threading
+import uuid
+from dataclasses import dataclass
+from types import MappingProxyType
+from django.conf import settings
+from django.core.cache import cache
+
+SECTION = 'numbering'
+VERSION_CACHE_KEY = 'core_numbering_config_version'
+
+_lock = threading.RLock()
+_snapshot = None
+
+
+@dataclass(frozen=True)
+class NumberingConfig:
+    """Read-only view of the numbering preferences, keyed like the preferences manager (numbering__name)"""
+    values: MappingProxyType
+    version: str = None
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+
+def _cache_sync_enabled():
+    return getattr(settings, 'NUMBERING_CONFIG_CACHE_SYNC', False)
+
+
+def _shared_version():
+    if not _cache_sync_enabled():
+        return None
+    return cache.get(VERSION_CACHE_KEY)
+
+
+def _load():
+    from dynamic_preferences.registries import global_preferences_registry
+    prefix = f"{SECTION}__"
+    values = {
+        key: value
+        for key, value in global_preferences_registry.manager().all().items()
+        if key.startswith(prefix)
+    }
+    return MappingProxyType(values)
+
+
+def get_numbering_config():
+    """Return the current snapshot, building it on first use or after an invalidation"""
+    global _snapshot
+    version = _shared_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = NumberingConfig(values=_load(), version=version)
+        return _snapshot
+
+
+def invalidate_numbering_config():
+    """Drop the snapshot of this process, and of the others when cache sync is enabled"""
+    global _snapshot
+    with _lock:
+        _snapshot = None
+    if _cache_sync_enabled():
+        cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
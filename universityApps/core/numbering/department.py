@@ -3,6 +3,7 @@ import code
 import sys
 from django.forms import ValidationError
 from .base import BaseNumberingSystem
+from .config import get_numbering_config
 from .patterns import (
     NumberingPattern,
     CodeFormatPattern,
@@ -10,8 +11,7 @@ from .patterns import (
 
 class DepartmentNumbering:
     def __init__(self):
-        from dynamic_preferences.registries import global_preferences_registry
-        global_preferences = global_preferences_registry.manager()
+        global_preferences = get_numbering_config()
 
         # إعدادات رقم القسم
         self.dept_no_config = {
@@ -39,50 +39,109 @@ class DepartmentNumbering:
         self.academic_max =global_preferences['numbering__department_academic_max_number']
         self.admin_min = global_preferences['numbering__department_admin_min_number']
         self.admin_max = global_preferences['numbering__department_admin_max_number']
+        self.admin_reuse_released = global_preferences['numbering__department_admin_reuse_released']
 
     def generate_dept_no(self, college_id=None, type=None):
+        return self.reserve_dept_nos(1, college_id=college_id, type=type)[0]
+
+    def reserve_dept_nos(self, count, college_id=None, type=None):
         from universityApps.departments.models import Department
         system = BaseNumberingSystem(**self.dept_no_config)
 
         if type == 'academic' and college_id:
             system.min_value =  self.academic_min
             system.max_value = self.academic_max
-            return system.generate_number(
-                model_class=Department,
+            return system.reserve_block(
+                Department,
+                count,
                 parent_field='college',
                 parent_id=college_id,
                 field='dept_no'
             )
 
         elif type == 'administrative':
-            system.pattern =NumberingPattern.numeric2
+            system.pattern = NumberingPattern.AdministrativedepartNumber
             system.min_value = self.admin_min     # 0001
             system.max_value = self.admin_max    # 0999
-            return system.generate_number(
-                model_class=Department,
+            system.reuse_released = self.admin_reuse_released
+            return system.reserve_block(
+                Department,
+                count,
                 field='dept_no',
                 filters={'type': 'administrative'}  # ✅ التصفية حسب النوع
             )
 
         else:
             raise ValidationError("Invalid department type or missing college_id.")
+    def release_dept_no(self, dept_no, type=None):
+        """Give the number of a deleted administrative department back to the free-list"""
+        from universityApps.departments.models import Department
+        if type != 'administrative':
+            return
+        system = BaseNumberingSystem(**self.dept_no_config, reuse_released=self.admin_reuse_released)
+        system.release_number(
+            Department,
+            dept_no,
+            field='dept_no',
+            filters={'type': 'administrative'}
+        )
+
     def generate_code(self, name, type):
+        return self.generate_codes([name], type)[0]
+
+    def generate_codes(self, names, type):
         from universityApps.departments.models import Department
         system = BaseNumberingSystem(**self.code_config)
-        return system.generate_number(
-            model_class=Department,
-            name=name,
+        return system.generate_codes(
+            Department,
+            names,
             type=type,
             field='code',
             academic_suffix=self.academic_suffix,
             admin_suffix=self.admin_suffix
         )
     def generate_program_no(self, department_id=None, type=None):
+        return self.reserve_program_nos(1, department_id=department_id)[0]
+
+    def reserve_program_nos(self, count, department_id=None):
         from universityApps.programs.models import AcademicProgram
         system = BaseNumberingSystem(**self.dept_no_config)
-        return system.generate_number(
-            model_class=AcademicProgram,
+        return system.reserve_block(
+            AcademicProgram,
+            count,
             parent_field='department',
             parent_id=department_id,
             field='program_no'
-        )
\ No newline at end of file
+        )
+
+    def assign_numbers(self, departments):
+        """Fill dept_no and code of unsaved departments, grouped so each scope costs one reservation"""
+        missing_codes = {}
+        missing_numbers = {}
+        for department in departments:
+            if department.name and not department.code:
+                missing_codes.setdefault(department.type, []).append(department)
+            if not department.dept_no:
+                college_id = department.college_id if department.type == 'academic' else None
+                missing_numbers.setdefault((department.type, college_id), []).append(department)
+
+        for type, group in missing_codes.items():
+            for department, code in zip(group, self.generate_codes([department.name for department in group], type)):
+                department.code = code
+
+        for (type, college_id), group in missing_numbers.items():
+            for department, number in zip(group, self.reserve_dept_nos(len(group), college_id=college_id, type=type)):
+                department.dept_no = number
+        return departments
+
+    def assign_program_numbers(self, programs):
+        """Fill program_no of unsaved programs, one reservation per department"""
+        missing_numbers = {}
+        for program in programs:
+            if not program.program_no:
+                missing_numbers.setdefault(program.department_id, []).append(program)
+
+        for department_id, group in missing_numbers.items():
+            for program, number in zip(group, self.reserve_program_nos(len(group), department_id=department_id)):
+                program.program_no = number
+        return programs
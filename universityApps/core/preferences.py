@@ -1,5 +1,5 @@
 from dynamic_preferences.registries import global_preferences_registry
-from dynamic_preferences.types import StringPreference, ChoicePreference, Section, IntegerPreference
+from dynamic_preferences.types import StringPreference, ChoicePreference, Section, IntegerPreference, BooleanPreference
 from django.utils.translation import gettext_lazy as _
 from .numbering.patterns import (NumberingPattern, CodeFormatPattern)
 
@@ -188,3 +188,10 @@ class DepartmentAdminMaxNumber(IntegerPreference):
     name = 'department_admin_max_number'
     default = 999
     verbose_name = _("Administrative Department Max Number")
+
+@global_preferences_registry.register
+class DepartmentAdminReuseReleased(BooleanPreference):
+    section = numbering
+    name = 'department_admin_reuse_released'
+    default = False
+    verbose_name = _("Reuse numbers of deleted administrative departments first")
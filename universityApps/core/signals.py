@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from dynamic_preferences.models import GlobalPreferenceModel
+from .numbering.config import SECTION, invalidate_numbering_config
+
+@receiver(post_save, sender=GlobalPreferenceModel)
+@receiver(post_delete, sender=GlobalPreferenceModel)
+def refresh_numbering_config(sender, instance, **kwargs):
+    if instance.section == SECTION:
+        # after commit, so a concurrent reader cannot rebuild the snapshot from pre-commit rows
+        transaction.on_commit(invalidate_numbering_config)
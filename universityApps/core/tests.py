@@ -0,0 +1,222 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.test import TestCase
+
+from universityApps.colleges.models import College
+from universityApps.departments.models import Department
+
+from .models import NumberingSequence, ReleasedNumber, University
+from .numbering.base import BaseNumberingSystem
+from .numbering.patterns import NumberingPattern
+from .transactions import defer_until_commit
+
+
+class NumberingSequenceTests(TestCase):
+    def test_values_are_consecutive(self):
+        self.assertEqual(NumberingSequence.allocate('tests.number'), 1)
+        self.assertEqual(NumberingSequence.allocate('tests.number'), 2)
+        self.assertEqual(NumberingSequence.allocate_block('tests.number', 3), [3, 4, 5])
+        self.assertEqual(NumberingSequence.objects.get(key='tests.number').last_value, 5)
+
+    def test_seed_is_read_on_first_use_only(self):
+        calls = []
+
+        def seed():
+            calls.append(1)
+            return 41
+
+        self.assertEqual(NumberingSequence.allocate('tests.number', seed=seed), 42)
+        self.assertEqual(NumberingSequence.allocate('tests.number', seed=seed), 43)
+        self.assertEqual(len(calls), 1)
+
+    def test_scopes_are_independent(self):
+        self.assertEqual(NumberingSequence.allocate('tests.number', scope=1), 1)
+        self.assertEqual(NumberingSequence.allocate('tests.number', scope=2), 1)
+        self.assertEqual(NumberingSequence.allocate('tests.number', scope=1), 2)
+
+    def test_min_value(self):
+        self.assertEqual(NumberingSequence.allocate('tests.number', min_value=100), 100)
+        self.assertEqual(NumberingSequence.allocate('tests.number', min_value=100), 101)
+
+    def test_max_value_is_enforced_for_the_whole_block(self):
+        NumberingSequence.allocate_block('tests.number', 8, max_value=10)
+        with self.assertRaises(ValidationError):
+            NumberingSequence.allocate_block('tests.number', 3, max_value=10)
+        # the failed block took nothing
+        self.assertEqual(NumberingSequence.allocate_block('tests.number', 2, max_value=10), [9, 10])
+
+    def test_count_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            NumberingSequence.allocate_block('tests.number', 0)
+
+
+class CollegeAndDepartmentNumberingTests(TestCase):
+    def setUp(self):
+        self.university = University.objects.create(name='University')
+
+    def test_college_numbers_and_codes(self):
+        science = College.objects.create(university=self.university, name='Faculty of Science')
+        arts = College.objects.create(university=self.university, name='Faculty of Arts')
+        self.assertEqual((science.college_no, science.code), ('0001', 'FS'))
+        self.assertEqual((arts.college_no, arts.code), ('0002', 'FA'))
+
+    def test_college_sequence_is_seeded_from_existing_rows(self):
+        College.objects.create(university=self.university, name='Faculty of Science')
+        NumberingSequence.objects.all().delete()
+        arts = College.objects.create(university=self.university, name='Faculty of Arts')
+        self.assertEqual(arts.college_no, '0002')
+
+    def test_prepare_bulk_reserves_one_block(self):
+        colleges = [College(university=self.university, name=name) for name in ('Law', 'Medicine', 'Nursing')]
+        College.prepare_bulk(colleges)
+        self.assertEqual([college.college_no for college in colleges], ['0001', '0002', '0003'])
+        self.assertEqual(len({college.code for college in colleges}), 3)
+
+    def test_department_numbers_follow_the_college(self):
+        college = College.objects.create(university=self.university, name='Faculty of Science')
+        first = Department.objects.create(name='Computer Science', type='academic', college=college)
+        second = Department.objects.create(name='Mathematics', type='academic', college=college)
+        self.assertEqual((first.dept_no, second.dept_no), (101, 102))
+
+
+class NumberingConfigTests(TestCase):
+    def tearDown(self):
+        from .numbering.config import invalidate_numbering_config
+        # the preference and the snapshot are cached past the rolled back test transaction
+        cache.clear()
+        invalidate_numbering_config()
+
+    def test_snapshot_is_dropped_after_commit(self):
+        from dynamic_preferences.registries import global_preferences_registry
+        from .numbering.config import get_numbering_config
+
+        preferences = global_preferences_registry.manager()
+        before = get_numbering_config()
+        with self.captureOnCommitCallbacks(execute=True):
+            preferences['numbering__college_prefix'] = 'C'
+            # still the committed snapshot until the transaction ends
+            self.assertIs(get_numbering_config(), before)
+        self.assertEqual(get_numbering_config()['numbering__college_prefix'], 'C')
+
+
+class AdministrativeNumberingTests(TestCase):
+    key = 'departments.department.dept_no'
+    scope = 'type=administrative'
+
+    def setUp(self):
+        university = University.objects.create(name='University')
+        self.college = College.objects.create(university=university, name='Faculty of Science')
+
+    def tearDown(self):
+        from .numbering.config import invalidate_numbering_config
+        cache.clear()
+        invalidate_numbering_config()
+
+    def reuse_released(self):
+        from dynamic_preferences.registries import global_preferences_registry
+        with self.captureOnCommitCallbacks(execute=True):
+            global_preferences_registry.manager()['numbering__department_admin_reuse_released'] = True
+
+    def create(self, *names):
+        return [
+            Department.objects.create(name=name, type='administrative', college=self.college).dept_no
+            for name in names
+        ]
+
+    def delete(self, *numbers):
+        for department in Department.objects.filter(dept_no__in=numbers):
+            department.delete()
+
+    def system(self, max_value=999):
+        system = BaseNumberingSystem(pattern=NumberingPattern.AdministrativedepartNumber, max_value=max_value)
+        system.target_field = 'dept_no'
+        return system
+
+    def test_python_gap_finder(self):
+        self.assertEqual(self.create('Finance', 'Library', 'Registration', 'Security', 'Transport'), [1, 2, 3, 4, 5])
+        self.delete(2, 4)
+        system = self.system()
+        filters = {'type': 'administrative'}
+        self.assertEqual(system._find_gaps_python(Department, 1, filters), [2])
+        self.assertEqual(system._find_gaps_python(Department, 4, filters), [2, 4, 6, 7])
+        self.assertEqual(self.system(max_value=6)._find_gaps_python(Department, 4, filters), [2, 4, 6])
+
+    @skipUnless(connection.vendor == 'postgresql', 'generate_series is PostgreSQL only')
+    def test_sql_gap_finder_matches_the_fallback(self):
+        self.create('Finance', 'Library', 'Registration', 'Security', 'Transport')
+        self.delete(1, 3)
+        system = self.system(max_value=8)
+        filters = {'type': 'administrative'}
+        for count in (1, 2, 5, 10):
+            self.assertEqual(
+                system._find_gaps_sql(Department, count, filters),
+                system._find_gaps_python(Department, count, filters),
+            )
+
+    def test_gaps_are_reused_lowest_first(self):
+        self.create('Finance', 'Library', 'Registration', 'Security')
+        self.delete(1, 3)
+        departments = Department.prepare_bulk([
+            Department(name=name, type='administrative', college=self.college)
+            for name in ('Human Resources', 'Maintenance', 'Purchasing')
+        ])
+        self.assertEqual([department.dept_no for department in departments], [1, 3, 5])
+
+    def test_delete_releases_the_number_only_when_enabled(self):
+        self.create('Finance', 'Library')
+        self.delete(1)
+        self.assertFalse(ReleasedNumber.objects.exists())
+
+        self.reuse_released()
+        self.delete(2)
+        self.assertEqual(
+            list(ReleasedNumber.objects.values_list('key', 'scope', 'number')),
+            [(self.key, self.scope, 2)],
+        )
+
+    def test_released_numbers_are_taken_before_lower_gaps(self):
+        self.create('Finance', 'Library', 'Registration', 'Security')
+        self.delete(1)
+        self.reuse_released()
+        self.delete(4)
+        self.assertEqual(self.create('Transport'), [4])
+        self.assertFalse(ReleasedNumber.objects.exists())
+        # the free-list is empty again, so the search falls back to the lowest gap
+        self.assertEqual(self.create('Maintenance'), [1])
+
+    def test_released_numbers_in_use_are_skipped(self):
+        self.create('Finance', 'Library')
+        self.reuse_released()
+        ReleasedNumber.objects.create(key=self.key, scope=self.scope, number=2)
+        ReleasedNumber.objects.create(key=self.key, scope=self.scope, number=7)
+        self.assertEqual(self.create('Registration', 'Security'), [7, 3])
+        self.assertEqual(list(ReleasedNumber.objects.values_list('number', flat=True)), [2])
+
+
+class DeferUntilCommitTests(TestCase):
+    def setUp(self):
+        self.flushed = []
+
+    def defer(self, *items):
+        defer_until_commit('tests', items, self.flushed.append)
+
+    def test_items_are_flushed_once_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.defer(3, 1)
+            self.defer(1, 2)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.flushed, [[1, 2, 3]])
+
+    def test_rolled_back_items_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.defer(1)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.defer(2)
+        self.assertEqual(self.flushed, [[2]])
@@ -0,0 +1,47 @@
+"""
+Work deferred to the end of the current transaction, in batches.
+
+Items added during a transaction are collected in one batch per name, and
+the batch is handed to its flush function once, after the commit. A batch
+belongs to the on_commit callback registered with it: when the transaction
+(or the savepoint the callback was registered in) rolls back, Django drops
+the callback and the next item starts a new batch.
+"""
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+_local = threading.local()
+
+
+def _batches():
+    if not hasattr(_local, 'batches'):
+        _local.batches = {}
+    return _local.batches
+
+
+def _registered(connection, callback):
+    return connection.in_atomic_block and any(
+        function is callback for _savepoints, function, *_rest in connection.run_on_commit
+    )
+
+
+def defer_until_commit(name, items, flush, using=None):
+    """Add `items` to the `name` batch of the current transaction; flush(sorted items) runs after the commit"""
+    using = using or DEFAULT_DB_ALIAS
+    batches = _batches()
+    key = (using, name)
+    batch = batches.get(key)
+    if batch is not None and _registered(transaction.get_connection(using), batch[1]):
+        batch[0].update(items)
+        return
+
+    pending = set(items)
+
+    def run():
+        if batches.get(key) is batch:
+            del batches[key]
+        flush(sorted(pending))
+
+    batch = batches[key] = (pending, run)
+    transaction.on_commit(run, using=using)
@@ -1,33 +1,135 @@
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Max, Min, Q
 
 class OrderField(models.PositiveIntegerField):
     """OrderField is an extension of the PositiveIntegerField that allows us to
          specify a field to order by.
+
+       Orders are sparse (spaced by `step`) so that moving an item between two
+       neighbours only rewrites the moved row.
     """
-    def __init__(self, for_fields=None, *args, **kwargs):
+    DEFAULT_STEP = 1024
+
+    def __init__(self, for_fields=None, step=DEFAULT_STEP, *args, **kwargs):
         self.for_fields = for_fields
+        self.step = step
         super().__init__(*args, **kwargs)
 
+    def _scope_of(self, instance):
+        return {
+            field: getattr(instance, field)
+            for field in self.for_fields or []
+        }
+
+    def _scope_key(self, instance):
+        return tuple(
+            getattr(instance, self.model._meta.get_field(field).attname)
+            for field in self.for_fields or []
+        )
+
+    def _scoped(self, scope):
+        qs = self.model._default_manager.all()
+        if scope:
+            qs = qs.filter(**scope)
+        return qs
+
     def  pre_save(self,model_instance,add):
         if getattr(model_instance, self.attname) is None:
-            # No current value
-            try:
-                qs = self.model.objects.all()
-                if self.for_fields:
-                    # Filter by objects with the same field values
-                    # for the fields in `for_fields`
-                    query= {
-                        field: getattr(model_instance, field)
-                        for field in self.for_fields
-                    }
-                    qs = qs.filter(**query)
-                # Get the order of the last item
-                latest_item =qs.latest(self.attname)
-                value = getattr(latest_item,self.attname) + 1
-            except ObjectDoesNotExist:
-                value = 1
+            # No current value: place after the last item of the same scope
+            last = self._scoped(self._scope_of(model_instance)).aggregate(
+                last=Max(self.attname)
+            )['last']
+            value = (last or 0) + self.step
             setattr(model_instance,self.attname,value)
             return value
         else:
-            return super().pre_save(model_instance,add)
\ No newline at end of file
+            return super().pre_save(model_instance,add)
+
+    def position(self, instance):
+        """
+        1-based rank of a saved instance within its scope. Use it wherever the
+        order is shown or baked into an identifier: the raw value is sparse.
+        """
+        return self._scoped(self._scope_of(instance)).filter(
+            **{f"{self.attname}__lte": getattr(instance, self.attname)}
+        ).count()
+
+    def assign_orders(self, instances):
+        """
+        Set the order of unsaved instances (e.g. before bulk_create) with one
+        aggregate query for all the scopes involved.
+        """
+        pending = [obj for obj in instances if getattr(obj, self.attname) is None]
+        if not pending:
+            return instances
+
+        attnames = [self.model._meta.get_field(f).attname for f in self.for_fields or []]
+        keys = {self._scope_key(obj) for obj in pending}
+        if attnames:
+            condition = Q()
+            for key in keys:
+                condition |= Q(**dict(zip(attnames, key)))
+            rows = (
+                self.model._default_manager.filter(condition)
+                .values(*attnames)
+                .annotate(last=Max(self.attname))
+            )
+            last_orders = {
+                tuple(row[name] for name in attnames): row['last'] or 0
+                for row in rows
+            }
+        else:
+            last = self.model._default_manager.aggregate(last=Max(self.attname))['last']
+            last_orders = {(): last or 0}
+
+        for obj in pending:
+            key = self._scope_key(obj)
+            last_orders[key] = last_orders.get(key, 0) + self.step
+            setattr(obj, self.attname, last_orders[key])
+        return instances
+
+    def bulk_reorder(self, scope, ids):
+        """
+        Rewrite the orders of the items of `scope` (a dict of the `for_fields`
+        values) to follow `ids`, with a single bulk_update.
+        """
+        objects = self._scoped(scope).in_bulk(ids)
+        ordered = []
+        for position, pk in enumerate(ids, start=1):
+            obj = objects.get(pk)
+            if obj is None:
+                continue
+            setattr(obj, self.attname, position * self.step)
+            ordered.append(obj)
+        self.model._default_manager.bulk_update(ordered, [self.attname])
+        return ordered
+
+    def move(self, instance, after=None):
+        """
+        Move `instance` right after `after` (or to the top when None).
+        Only the moved row is written unless its neighbours have no gap left,
+        in which case the scope is respaced first.
+        """
+        scope = self._scope_of(instance)
+        with transaction.atomic():
+            siblings = self._scoped(scope).exclude(pk=instance.pk)
+            previous = getattr(after, self.attname) if after is not None else 0
+            following = siblings.filter(
+                **{f"{self.attname}__gt": previous}
+            ).aggregate(next=Min(self.attname))['next']
+
+            if following is None:
+                value = previous + self.step
+            elif following - previous > 1:
+                value = (previous + following) // 2
+            else:
+                ids = list(siblings.order_by(self.attname).values_list('pk', flat=True))
+                position = ids.index(after.pk) + 1 if after is not None else 0
+                ids.insert(position, instance.pk)
+                self.bulk_reorder(scope, ids)
+                instance.refresh_from_db(fields=[self.attname])
+                return instance
+
+            self._scoped(scope).filter(pk=instance.pk).update(**{self.attname: value})
+            setattr(instance, self.attname, value)
+        return instance
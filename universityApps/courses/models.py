@@ -10,8 +10,8 @@ from django.utils.translation import gettext_lazy as _
 from .fields import OrderField
 from .utils import (
     generate_subject_code,
-    generate_unique_code,
     generate_unique_slug,
+    assign_unique_slugs,
     )
 User = get_user_model()
 class Subject_Types(models.TextChoices):
@@ -96,7 +96,6 @@ class Subject(models.Model):
                 instance=self,
                 slug_field_name='slug',
                 slug_from_fields=['code','name'],
-                max_check=10
             )
         super().save(*args, **kwargs)
 
@@ -239,7 +238,6 @@ class Course(models.Model):
                 instance=self,
                 slug_field_name='slug',
                 slug_from_fields=['code','name'],
-                max_check=50
             )
         #total_hours check
         total_hours = self.hours_lecture + self.hours_lab + self.practice_hours
@@ -256,6 +254,16 @@ class Course(models.Model):
         # clean and save
         self.full_clean()
         super().save(*args, **kwargs)
+
+    @classmethod
+    def prepare_bulk(cls, courses):
+        """Assign slugs to unsaved courses so they can be passed to bulk_create"""
+        return assign_unique_slugs(
+            model_class=cls,
+            instances=courses,
+            slug_field_name='slug',
+            slug_from_fields=['code','name'],
+        )
     
     def get_total_hours(self):
         # return total hours
@@ -1,3 +1,32 @@
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Subject
+from .utils import allocate_unique_values
+
+
+class AllocateUniqueValuesTests(TestCase):
+    def allocate(self, base, count=1):
+        return allocate_unique_values(Subject, 'slug', base, count)
+
+    def test_suffixes_follow_the_base(self):
+        self.assertEqual(self.allocate('foo'), ['foo'])
+        self.assertEqual(self.allocate('foo', 3), ['foo-1', 'foo-2', 'foo-3'])
+
+    def test_counter_is_seeded_from_existing_rows(self):
+        Subject.objects.create(name='Foo', code='FOO', slug='foo')
+        Subject.objects.create(name='Foo', code='FOO', slug='foo-4')
+        self.assertEqual(self.allocate('foo'), ['foo-5'])
+
+    def test_values_taken_after_seeding_are_skipped(self):
+        self.assertEqual(self.allocate('foo'), ['foo'])
+        Subject.objects.create(name='Foo', code='FOO', slug='foo')
+        # set by hand, and by the counter of the base "foo-1"
+        Subject.objects.create(name='Foo', code='FOO', slug='foo-2')
+        Subject.objects.create(name='Foo', code='FOO', slug=self.allocate('foo-1')[0])
+        self.assertEqual(self.allocate('foo', 2), ['foo-3', 'foo-4'])
+
+    def test_saving_subjects_never_collides(self):
+        first = Subject.objects.create(name='Algebra', code='ALG')
+        Subject.objects.create(name='Algebra', code='ALG', slug='alg-algebra-1')
+        slugs = [Subject.objects.create(name='Algebra', code='ALG').slug for _ in range(2)]
+        self.assertEqual([first.slug, *slugs], ['alg-algebra', 'alg-algebra-2', 'alg-algebra-3'])
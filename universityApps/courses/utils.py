@@ -30,42 +30,60 @@ def generate_subject_code(model_class, instance, field_name='code', from_field='
             return code
     return base_code
 
-def generate_unique_code(model_class, instance, field_name='code', from_field='name', max_check=20):
-    """
-    توليد رمز (code) فريد بناءً على حقل آخر (الاسم عادة)، مع أداء متوازن.
-    """
-    raw_text = getattr(instance, from_field,)
-    
-    raw_text=raw_text.strip()[:4]
-   
-    base_code = slugify(raw_text).upper()
-
-    code = base_code
+def _suffix_seed(model_class, field_name, base):
+    """Highest suffix already used for `base`, read once when its counter is created"""
+    existing = set(model_class.objects.filter(
+        Q(**{f"{field_name}__startswith": base})
+    ).values_list(field_name, flat=True))
 
-    queryset = model_class.objects.filter(
-        Q(**{f"{field_name}__startswith": base_code})
-    ).exclude(id=instance.id).order_by(field_name)[:max_check]
-
-    existing_codes = set(queryset.values_list(field_name, flat=True))
-
-    if code not in existing_codes:
-        return code
-
-    pattern = re.compile(rf'^{re.escape(base_code)}-(\d+)$')
+    pattern = re.compile(rf'^{re.escape(base)}-(\d+)$')
     numbers = [
-        int(match.group(1)) for c in existing_codes
-        if (match := pattern.match(c))
+        int(match.group(1)) for value in existing
+        if (match := pattern.match(value))
     ]
+    if base in existing or numbers:
+        return max(numbers, default=0) + 1
+    return 0
 
-    next_number = (max(numbers) + 1) if numbers else 1
 
-    return f"{base_code}-{next_number}"
+def allocate_unique_values(model_class, field_name, base, count=1):
+    """
+    حجز قيم فريدة (base, base-1, base-2, ...) من عداد خاص بكل قيمة أساسية.
+    Returns `count` values, usually in one locked round trip whatever the number
+    of siblings. Values already in the table (set by hand, or the suffixed value
+    of another base such as "foo-1") are skipped, so they are checked on every call.
+    """
+    from universityApps.core.models import NumberingSequence
+    values = []
+    while len(values) < count:
+        numbers = NumberingSequence.allocate_block(
+            key=f"{model_class._meta.label_lower}.{field_name}",
+            count=count - len(values),
+            scope=base,
+            seed=lambda: _suffix_seed(model_class, field_name, base),
+        )
+        candidates = [base if number == 1 else f"{base}-{number - 1}" for number in numbers]
+        taken = set(model_class.objects.filter(
+            **{f"{field_name}__in": candidates}
+        ).values_list(field_name, flat=True))
+        values += [value for value in candidates if value not in taken]
+    return values
+
+
+def _base_code(instance, from_field):
+    raw_text = getattr(instance, from_field,)
+    raw_text=raw_text.strip()[:4]
+    return slugify(raw_text).upper()
 
 
-def generate_unique_slug(model_class, instance, slug_field_name='slug', slug_from_fields=None, max_check=100):
+def generate_unique_code(model_class, instance, field_name='code', from_field='name'):
     """
-    توليد سلاج فريد (slug) مع دعم الترجمة الديناميكية حسب اللغة المختارة.
+    توليد رمز (code) فريد بناءً على حقل آخر (الاسم عادة)، مع أداء متوازن.
     """
+    return allocate_unique_values(model_class, field_name, _base_code(instance, from_field))[0]
+
+
+def _base_slug(instance, slug_from_fields):
     if slug_from_fields is None:
         raise ValueError("slug_from_fields is required.")
 
@@ -75,27 +93,29 @@ def generate_unique_slug(model_class, instance, slug_field_name='slug', slug_fro
 
     # حسب اللغة، نقرر كيف نصنع الـ slug
     if lang == 'ar':
-        base_slug = slugify(combined_text, allow_unicode=True)  # يدعم الحروف العربية
-    else:
-        base_slug = slugify(combined_text)  # بدون unicode للإنجليزي
-
-    slug = base_slug
-
-    queryset = model_class.objects.filter(
-        Q(**{f"{slug_field_name}__startswith": base_slug})
-    ).exclude(id=instance.id).order_by(slug_field_name)[:max_check]
-
-    existing_slugs = set(queryset.values_list(slug_field_name, flat=True))
+        return slugify(combined_text, allow_unicode=True)  # يدعم الحروف العربية
+    return slugify(combined_text)  # بدون unicode للإنجليزي
 
-    if slug not in existing_slugs:
-        return slug
 
-    pattern = re.compile(rf'^{re.escape(base_slug)}-(\d+)$')
-    numbers = [
-        int(match.group(1)) for s in existing_slugs
-        if (match := pattern.match(s))
-    ]
+def generate_unique_slug(model_class, instance, slug_field_name='slug', slug_from_fields=None):
+    """
+    توليد سلاج فريد (slug) مع دعم الترجمة الديناميكية حسب اللغة المختارة.
+    """
+    return allocate_unique_values(model_class, slug_field_name, _base_slug(instance, slug_from_fields))[0]
 
-    next_number = (max(numbers) + 1) if numbers else 1
 
-    return f"{base_slug}-{next_number}"
+def assign_unique_slugs(model_class, instances, slug_field_name='slug', slug_from_fields=None):
+    """
+    تعيين slug لكل كائن غير محفوظ في القائمة قبل bulk_create.
+    Instances sharing a base slug take one block from its counter.
+    """
+    groups = {}
+    for instance in instances:
+        if not getattr(instance, slug_field_name):
+            groups.setdefault(_base_slug(instance, slug_from_fields), []).append(instance)
+
+    for base_slug, group in groups.items():
+        slugs = allocate_unique_values(model_class, slug_field_name, base_slug, count=len(group))
+        for instance, slug in zip(group, slugs):
+            setattr(instance, slug_field_name, slug)
+    return instances
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DepartmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'universityApps.departments'
+
+    def ready(self):
+        import universityApps.departments.signals
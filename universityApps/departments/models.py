@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from universityApps.core.numbering.department import DepartmentNumbering
 from .utils import (
@@ -88,8 +88,11 @@ class Department(models.Model):
             models.Index(fields=['type'], name='department_type_index'),
         ]
     def save(self, *args, **kwargs):
-        numbering = DepartmentNumbering()
-        if not self.dept_no:
+        if self.dept_no:
+            return super().save(*args, **kwargs)
+        # the number is chosen and inserted in one transaction so concurrent gap searches cannot pick it too
+        with transaction.atomic():
+            numbering = DepartmentNumbering()
             if not self.code and self.name:
                 self.code = numbering.generate_code(self.name, self.type)
             if self.type == self.DepartmentType.ACADEMIC and self.college:
@@ -98,7 +101,13 @@ class Department(models.Model):
                 
                 # نمرر الاسم للقسم الإداري
                 self.dept_no = numbering.generate_dept_no(type=self.type)
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def prepare_bulk(cls, departments):
+        """Assign numbers and codes to unsaved departments so they can be passed to bulk_create"""
+        return DepartmentNumbering().assign_numbers(departments)
+
     def is_head(self, faculty_member):
         # Check if the given faculty member is the head of the department
         return self.head == faculty_member
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from universityApps.core.numbering.department import DepartmentNumbering
+from .models import Department
+
+@receiver(post_delete, sender=Department)
+def release_department_number(sender, instance, **kwargs):
+    if instance.type == Department.DepartmentType.ADMINISTRATIVE:
+        DepartmentNumbering().release_dept_no(instance.dept_no, type=instance.type)
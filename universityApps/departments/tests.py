@@ -1,3 +1,52 @@
+from django.core.exceptions import ValidationError
 from django.test import TestCase
 
-# Create your tests here.
+from universityApps.colleges.models import College
+from universityApps.core.models import University
+
+from .models import Department
+
+
+class PrepareBulkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        university = University.objects.create(name='University')
+        cls.college = College.objects.create(university=university, name='Faculty of Science')
+
+    def test_academic_departments_get_unique_numbers_and_codes(self):
+        existing = Department.objects.create(name='Computer Science', type='academic', college=self.college)
+        departments = Department.prepare_bulk([
+            Department(name=name, type='academic', college=self.college)
+            for name in ['Applied Mathematics', 'Physics', 'General Chemistry']
+        ])
+        Department.objects.bulk_create(departments)
+
+        numbers = [department.dept_no for department in departments]
+        self.assertEqual(len(set(numbers + [existing.dept_no])), 4)
+        self.assertEqual(sorted(numbers), list(range(existing.dept_no + 1, existing.dept_no + 4)))
+        self.assertEqual([department.code for department in departments], ['AM', 'P', 'GC'])
+        # the next single save continues after the block
+        after = Department.objects.create(name='Geology', type='academic', college=self.college)
+        self.assertEqual(after.dept_no, existing.dept_no + 4)
+
+    def test_administrative_departments_fill_gaps(self):
+        first = Department.objects.create(name='Finance', type='administrative', college=self.college)
+        Department.objects.create(name='Human Resources', type='administrative', college=self.college)
+        released = first.dept_no
+        first.delete()
+
+        departments = Department.prepare_bulk([
+            Department(name=name, type='administrative', college=self.college)
+            for name in ['Library', 'Registration']
+        ])
+        Department.objects.bulk_create(departments)
+        self.assertEqual(sorted(department.dept_no for department in departments), [released, released + 2])
+        self.assertEqual(Department.objects.filter(type='administrative').count(), 3)
+
+    def test_codes_in_one_batch_do_not_collide(self):
+        departments = [
+            Department(name=name, type='academic', college=self.college)
+            for name in ['Physics', 'Pharmacy']
+        ]
+        with self.assertRaises(ValidationError):
+            Department.prepare_bulk(departments)
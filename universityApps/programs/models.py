@@ -108,11 +108,27 @@ class AcademicProgram(models.Model):
         from universityApps.core.numbering.department import DepartmentNumbering
         if not self.program_no:
             self.program_no = DepartmentNumbering().generate_program_no(department_id=self.department.dept_no)
+        self.set_generated_fields()
+        super().save(*args, **kwargs)
+
+    def set_generated_fields(self):
+        """Fill code and name from the department and degree level"""
         if not self.code:
             self.code = f"{self.degree_level[0]}-{self.department.code}"
         if not self.name:
             self.name = f"{self.degree_level} in {self.department.name}"
-        super().save(*args, **kwargs)
+
+    @classmethod
+    def prepare_bulk(cls, programs):
+        """
+        Assign numbers, codes and names to unsaved programs so they can be passed to bulk_create.
+        bulk_create does not send post_save, so settings and levels must be created afterwards.
+        """
+        from universityApps.core.numbering.department import DepartmentNumbering
+        DepartmentNumbering().assign_program_numbers(programs)
+        for program in programs:
+            program.set_generated_fields()
+        return programs
     def __str__(self):
         return f"{self.code} - {self.name}"
 
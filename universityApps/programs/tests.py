@@ -1,3 +1,44 @@
 from django.test import TestCase
 
-# Create your tests here.
+from universityApps.colleges.models import College
+from universityApps.core.models import University
+from universityApps.departments.models import Department
+
+from .models import AcademicProgram
+
+
+class PrepareBulkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        university = University.objects.create(name='University')
+        college = College.objects.create(university=university, name='Faculty of Science')
+        cls.department = Department.objects.create(name='Computer Science', type='academic', college=college)
+        cls.other = Department.objects.create(name='Physics', type='academic', college=college)
+
+    def test_programs_get_unique_numbers_codes_and_names(self):
+        existing = AcademicProgram.objects.create(department=self.department, degree_level='Bachelor')
+        programs = AcademicProgram.prepare_bulk([
+            AcademicProgram(department=self.department, degree_level='Master'),
+            AcademicProgram(department=self.department, degree_level='phD'),
+            AcademicProgram(department=self.other, degree_level='Bachelor'),
+            AcademicProgram(department=self.other, degree_level='Diploma'),
+        ])
+        AcademicProgram.objects.bulk_create(programs)
+
+        rows = list(AcademicProgram.objects.values_list('program_no', 'code', 'name'))
+        self.assertEqual(len(rows), 5)
+        for column in zip(*rows):
+            self.assertEqual(len(set(column)), 5)
+
+        base = self.department.dept_no * 100
+        self.assertEqual(existing.program_no, base + 1)
+        self.assertEqual([program.program_no for program in programs[:2]], [base + 2, base + 3])
+        other_base = self.other.dept_no * 100
+        self.assertEqual([program.program_no for program in programs[2:]], [other_base + 1, other_base + 2])
+        self.assertEqual(programs[0].code, f"M-{self.department.code}")
+        self.assertEqual(programs[3].name, "Diploma in Physics")
+
+    def test_prepare_bulk_keeps_preset_numbers(self):
+        program = AcademicProgram(department=self.department, degree_level='Master', program_no=self.department.dept_no * 100 + 50)
+        AcademicProgram.prepare_bulk([program])
+        self.assertEqual(program.program_no, self.department.dept_no * 100 + 50)
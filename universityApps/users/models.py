@@ -26,6 +26,11 @@ class UserManager(BaseUserManager):
         user.set_password(password)
         user.save(using=self._db)
         return user
+    def create_user(self, email, password=None, **extra_fields):
+        """ Create and save a regular user with the given email and password."""
+        extra_fields.setdefault('is_staff', False)
+        extra_fields.setdefault('is_superuser', False)
+        return self._create_user(email, password, **extra_fields)
     def create_superuser(self, email, password, **extra_fields):
         """ Create and save a SuperUser with the given email and password."""
         extra_fields.setdefault('is_staff', True)
@@ -237,46 +242,41 @@ class Student(models.Model):
     
     def upadate_cgpa(self):
         """ update cgpa of student """
-        StudentsGrade=apps.get_model('universityApps.academic', 'StudentsGrade')
-        #get all the student's grades
-        grades=StudentsGrade.objects.filter(
-            student=self,
-            grade__isnull=False
-        )
-
-        if not grades.exists():
-            return  0.00
-        
-        total_points=0
-        total_credits=0
-        for grade in grades:
-            total_points += grade.grade*grade.course.credits
-            total_credits += grade.course.credits
-        
-        if total_credits >0:
-            gpa=total_points/total_credits
-            precentage= (gpa / 4.0) * 100 
-            self.cgpa=round(precentage,2)
-        else:
-            self.cgpa=0.00
-
-        self.save(update_fields=['cgpa'])
+        Student.recompute_academic_records([self.pk])
+        self.refresh_from_db(fields=['cgpa', 'total_credits_earned'])
         return self.cgpa
     
     def update_credits_earned(self):
         """ update total credits earned by student """
-        StudentsGrade=models.get_model('universityApps.academic', 'StudentsGrade')
-        credits=StudentsGrade.objects.filter(
-            student=self,
-            grade__is__passing=True
-        ).aggregate(
-            total_credits=Sum('course__credits')
-        )['total_credits'] or 0
-
-        self.total_credits_earned=credits
-        self.save(update_fields=['total_credits_earned'])
+        Student.recompute_academic_records([self.pk])
+        self.refresh_from_db(fields=['cgpa', 'total_credits_earned'])
         return self.total_credits_earned
 
+    @classmethod
+    def recompute_academic_records(cls, student_ids):
+        """ recompute the cgpa and the earned credits of many students with two grouped queries """
+        StudentGrade = apps.get_model('academic', 'StudentGrade')
+        student_ids = list(student_ids)
+
+        gpas = StudentGrade.calculate_gpas(students=student_ids)
+        earned = dict(
+            StudentGrade.objects.filter(
+                student_id__in=student_ids,
+                grade__is_passing=True,
+            ).values('student_id').annotate(
+                total=Sum('semester_course__course__credits')
+            ).order_by().values_list('student_id', 'total')
+        )
+
+        students = list(cls.objects.filter(pk__in=student_ids).only('pk', 'cgpa', 'total_credits_earned'))
+        for student in students:
+            gpa = gpas.get(student.pk, {}).get('cgpa', 0.00)
+            # cgpa is stored as a percentage of the 4.0 scale
+            student.cgpa = round((gpa / 4.0) * 100, 2)
+            student.total_credits_earned = earned.get(student.pk) or 0
+        cls.objects.bulk_update(students, ['cgpa', 'total_credits_earned'], batch_size=500)
+        return students
+
 class StudentDocument(models.Model):
     class DocumentType(models.TextChoices):
         NATIONAL_ID = 'national_id', _("National ID")
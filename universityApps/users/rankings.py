@@ -0,0 +1,138 @@
+"""
+Class rank and percentile of the active students, by CGPA.
+
+Ranks are computed in the database with window functions, one query per
+scope, and materialized in the cache as a snapshot: one entry per student
+and one ordered list per partition (a program, a level, or a cohort, i.e.
+a program and an admission year). A snapshot is written under a new version
+and then made current, so readers never see half of a refresh; the
+snapshot it replaces is kept for the readers still using it and deleted by
+the next refresh.
+Recomputations of the students' cgpa ask for a refresh, and the requests of
+CLASS_RANK_REFRESH_DELAY seconds are served by one rebuild (see
+users.tasks). Readers never rebuild: until the first snapshot exists they
+find no rank.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import ExtractYear, PercentRank, Rank
+
+from .models import Student
+
+SCOPES = {
+    'program': [F('program_id')],
+    'level': [F('group__group__level_id')],
+    'cohort': [F('program_id'), ExtractYear('admission_date')],
+}
+
+RANK_VERSION_KEY = 'class_rank_version'
+RANK_RETIRED_KEY = 'class_rank_retired_version'
+RANK_MANIFEST_KEY = 'class_rank_keys:{version}'
+RANK_STUDENT_KEY = 'class_rank:{version}:{scope}:{student_id}'
+RANK_LIST_KEY = 'class_rank_list:{version}:{scope}:{partition}'
+RANK_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def partition_key(*values):
+    """'3' for a program or a level, '3-2024' for the cohort of program 3 admitted in 2024"""
+    return "-".join(str(value) for value in values)
+
+
+def rank_rows(scope):
+    """(student_id, partition, cgpa, rank, percentile) of every ranked student, best first"""
+    expressions = SCOPES[scope]
+    students = Student.objects.filter(status=Student.StudentStatus.ACTIVE)
+    names = []
+    for position, expression in enumerate(expressions):
+        name = f'partition_{position}'
+        students = students.annotate(**{name: expression}).filter(**{f'{name}__isnull': False})
+        names.append(name)
+
+    rows = students.annotate(
+        rank=Window(Rank(), partition_by=expressions, order_by=F('cgpa').desc()),
+        percent_rank=Window(PercentRank(), partition_by=expressions, order_by=F('cgpa').desc()),
+    ).order_by(*names, 'rank', 'pk').values_list('pk', *names, 'cgpa', 'rank', 'percent_rank')
+
+    for student_id, *partition, cgpa, rank, percent_rank in rows:
+        # percent_rank is 0 for the best student of a partition
+        yield student_id, partition_key(*partition), cgpa, rank, round((1 - percent_rank) * 100, 2)
+
+
+def refresh_rank_snapshots():
+    """Rank every scope again, make the new snapshot current and delete the one before the previous"""
+    version = uuid.uuid4().hex
+    manifest = []
+    for scope in SCOPES:
+        entries, lists = {}, {}
+        for student_id, partition, cgpa, rank, percentile in rank_rows(scope):
+            lists.setdefault(partition, []).append((student_id, cgpa, rank, percentile))
+            entries[RANK_STUDENT_KEY.format(version=version, scope=scope, student_id=student_id)] = {
+                'partition': partition, 'cgpa': cgpa, 'rank': rank, 'percentile': percentile,
+            }
+        for partition, ranked in lists.items():
+            size = len(ranked)
+            for student_id, *_rest in ranked:
+                entries[RANK_STUDENT_KEY.format(version=version, scope=scope, student_id=student_id)]['size'] = size
+            entries[RANK_LIST_KEY.format(version=version, scope=scope, partition=partition)] = ranked
+        cache.set_many(entries, RANK_TIMEOUT)
+        manifest.extend(entries)
+    cache.set(RANK_MANIFEST_KEY.format(version=version), manifest, RANK_TIMEOUT)
+
+    previous = cache.get(RANK_VERSION_KEY)
+    cache.set(RANK_VERSION_KEY, version, RANK_TIMEOUT)
+    retired = cache.get(RANK_RETIRED_KEY)
+    if previous is not None:
+        cache.set(RANK_RETIRED_KEY, previous, RANK_TIMEOUT)
+    if retired is not None and retired not in (previous, version):
+        _delete_snapshot(retired)
+    return version
+
+
+def _delete_snapshot(version):
+    manifest_key = RANK_MANIFEST_KEY.format(version=version)
+    cache.delete_many((cache.get(manifest_key) or []) + [manifest_key])
+
+
+def _version():
+    version = cache.get(RANK_VERSION_KEY)
+    if version is None:
+        # expired or never built: rebuilt in the background, not by the reader
+        from .tasks import schedule_rank_refresh
+        schedule_rank_refresh()
+    return version
+
+
+def student_rank(student, scope='program'):
+    """
+    ترتيب الطالب ونسبته المئوية داخل البرنامج أو المستوى أو الدفعة.
+    Returns {'partition', 'cgpa', 'rank', 'percentile', 'size'}, or None when
+    the student is not ranked in that scope or no snapshot exists yet.
+    """
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown ranking scope: {scope}")
+    version = _version()
+    if version is None:
+        return None
+    student_id = getattr(student, 'pk', student)
+    return cache.get(RANK_STUDENT_KEY.format(version=version, scope=scope, student_id=student_id))
+
+
+def _ranked(scope, partition):
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown ranking scope: {scope}")
+    version = _version()
+    if version is None:
+        return []
+    return cache.get(RANK_LIST_KEY.format(version=version, scope=scope, partition=partition)) or []
+
+
+def top_students(scope, partition, n=10):
+    """The first n of a partition as (student_id, cgpa, rank, percentile); ties share a rank"""
+    return _ranked(scope, partition)[:n]
+
+
+def honours_list(scope, partition, min_percentile=90):
+    """Students of a partition at or above `min_percentile`, best first"""
+    return [row for row in _ranked(scope, partition) if row[3] >= min_percentile]
@@ -0,0 +1,79 @@
+"""Deferred recomputation of the students' cgpa, earned credits, semester summaries and class ranks"""
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+
+from universityApps.core.transactions import defer_until_commit
+
+logger = logging.getLogger(__name__)
+
+RANK_REFRESH_PENDING_KEY = 'class_rank_refresh_pending'
+
+
+@shared_task
+def recompute_students(student_ids):
+    """Recompute the academic records and semester summaries of a batch of students, then the class ranks"""
+    from universityApps.academic.models import StudentSemesterSummary
+    from .models import Student
+    Student.recompute_academic_records(student_ids)
+    StudentSemesterSummary.rebuild(students=student_ids)
+    if getattr(settings, 'STUDENT_RECOMPUTE_ASYNC', True):
+        schedule_rank_refresh()
+    else:
+        refresh_class_ranks()
+
+
+@shared_task
+def refresh_class_ranks():
+    """Rebuild the class rank snapshot; requests made from now on schedule the next rebuild"""
+    from .rankings import refresh_rank_snapshots
+    cache.delete(RANK_REFRESH_PENDING_KEY)
+    return refresh_rank_snapshots()
+
+
+def schedule_rank_refresh():
+    """
+    طلب إعادة حساب ترتيب الطلاب.
+    The requests of CLASS_RANK_REFRESH_DELAY seconds share one rebuild, queued
+    by the first of them; the other calls only find the pending marker.
+    """
+    delay = getattr(settings, 'CLASS_RANK_REFRESH_DELAY', 60)
+    # the marker outlives the countdown so a slow worker is not sent a second rebuild
+    if not cache.add(RANK_REFRESH_PENDING_KEY, 1, delay * 10):
+        return
+    try:
+        refresh_class_ranks.apply_async(countdown=delay)
+    except Exception:
+        cache.delete(RANK_REFRESH_PENDING_KEY)
+        logger.exception("Could not queue the refresh of the class ranks")
+
+
+def _flush(student_ids):
+    from universityApps.academic.eligibility import invalidate_passed_courses
+    # after the commit, so the bitsets are never rebuilt from the old grades
+    invalidate_passed_courses(student_ids)
+
+    if not getattr(settings, 'STUDENT_RECOMPUTE_ASYNC', True):
+        recompute_students(student_ids)
+        return
+
+    batch_size = getattr(settings, 'STUDENT_RECOMPUTE_BATCH_SIZE', 500)
+    for start in range(0, len(student_ids), batch_size):
+        batch = student_ids[start:start + batch_size]
+        try:
+            recompute_students.delay(batch)
+        except Exception:
+            # لا نفقد التحديث إذا كان الوسيط (broker) غير متاح
+            logger.exception("Could not queue the recomputation of %s students, running it inline", len(batch))
+            recompute_students(batch)
+
+
+def schedule_student_recompute(*student_ids):
+    """
+    جدولة إعادة حساب المعدل التراكمي والساعات المكتسبة بعد نجاح المعاملة.
+    Students scheduled several times within a transaction are recomputed once;
+    nothing is recomputed for a transaction that rolls back.
+    """
+    defer_until_commit('student_recompute', student_ids, _flush)
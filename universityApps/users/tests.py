@@ -1,3 +1,58 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from universityApps.colleges.models import College
+from universityApps.core.models import University
+from universityApps.departments.models import Department
+from universityApps.programs.models import AcademicProgram
+
+from . import rankings
+from .models import Student, User
+from .tasks import RANK_REFRESH_PENDING_KEY, schedule_rank_refresh
+
+
+class RankSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        university = University.objects.create(name='University')
+        college = College.objects.create(university=university, name='Faculty of Science')
+        department = Department.objects.create(name='Computer Science', type='academic', college=college)
+        cls.program = AcademicProgram.objects.create(name='Computer Science', department=department)
+
+    def setUp(self):
+        cache.clear()
+
+    def make_student(self, number, cgpa):
+        user = User.objects.create(username=f'ranked{number}', email=f'ranked{number}@example.com', phone_number=f'07{number}')
+        return Student.objects.create(user=user, student_id=f'R{number:05d}', cgpa=cgpa, program=self.program)
+
+    def test_readers_never_rebuild(self):
+        self.make_student(1, 3)
+        with mock.patch('universityApps.users.tasks.refresh_class_ranks.apply_async') as queued:
+            self.assertIsNone(rankings.student_rank(1))
+            self.assertEqual(rankings.top_students('program', '1'), [])
+        self.assertIsNone(cache.get(rankings.RANK_VERSION_KEY))
+        queued.assert_called_once()
+
+    def test_superseded_snapshots_are_deleted(self):
+        best, second = self.make_student(1, 3.5), self.make_student(2, 3)
+        versions = [rankings.refresh_rank_snapshots() for _ in range(3)]
+        self.assertEqual(rankings.student_rank(second)['rank'], 2)
+        self.assertEqual([row[0] for row in rankings.top_students('program', str(self.program.pk))], [best.pk, second.pk])
+
+        def stored(version):
+            return cache.get(rankings.RANK_STUDENT_KEY.format(version=version, scope='program', student_id=best.pk))
+        # the first is gone, the previous one is kept for the readers still using it
+        self.assertIsNone(stored(versions[0]))
+        self.assertIsNone(cache.get(rankings.RANK_MANIFEST_KEY.format(version=versions[0])))
+        self.assertIsNotNone(stored(versions[1]))
+
+    @override_settings(CLASS_RANK_REFRESH_DELAY=30)
+    def test_requests_share_one_rebuild(self):
+        with mock.patch('universityApps.users.tasks.refresh_class_ranks.apply_async') as queued:
+            for _ in range(5):
+                schedule_rank_refresh()
+        queued.assert_called_once_with(countdown=30)
+        self.assertTrue(cache.get(RANK_REFRESH_PENDING_KEY))